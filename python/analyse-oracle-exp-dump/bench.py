@@ -0,0 +1,164 @@
+import getopt
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from dumpformat import getInsertSql, readDumpHeader, readFieldTypes
+from dumpgen import TYPE_CODES, generate
+from dumpindex import scanTables
+from dumpreader import DumpReader
+from sinks import RowSink, SqlSink
+
+import dump_analyse
+
+
+class NullSink(RowSink):
+    """丢弃所有记录，只用来测量解码速度"""
+
+    def __init__(self,native:bool):
+        self.native=native
+
+
+def timeTables(fileName:str,native:bool)->List[Dict]:
+    """逐表解析一遍 dump 文件(不输出)，记录每张表的行数、字节数和用时"""
+    results=[]
+    with DumpReader(fileName) as f:
+        charsetName=readDumpHeader(f,printDetail=False).data
+        entries=scanTables(f,charsetName).data
+        for entry in entries:
+            f.seek(entry.metaOffset)
+            fields=readFieldTypes(f).data
+            start=time.perf_counter()
+            dump_analyse.readFieldsData(f,fields,entry.sql,sink=NullSink(native))
+            elapsed=time.perf_counter()-start
+            results.append({"table":entry.tableName,"rows":entry.rowCount,"bytes":entry.dataSize(),"seconds":elapsed})
+    return results
+
+
+def timeEndToEnd(fileName:str)->Dict:
+    """与 dump_analyse 串行模式相同的完整流程: 顺序查找 insert 语句、解析记录、输出 insert 语句"""
+    start=time.perf_counter()
+    with DumpReader(fileName) as f, open(os.devnull,"w",buffering=8*1024*1024) as out:
+        sink=SqlSink(out)
+        charsetName=readDumpHeader(f,printDetail=False).data
+        ret=getInsertSql(f,charsetName,printError=False)
+        while ret.isSuccess():
+            fields=readFieldTypes(f).data
+            dump_analyse.readFieldsData(f,fields,ret.data.sql,sink=sink)
+            ret=getInsertSql(f,charsetName,printError=False)
+        size=f.size
+    elapsed=time.perf_counter()-start
+    return {"bytes":size,"seconds":elapsed}
+
+
+def rate(count:float,seconds:float)->float:
+    return count/seconds if seconds>0 else 0.0
+
+
+def summarize(name:str,rows:int,size:int,seconds:float)->Dict:
+    return {"name":name,"rows":rows,"bytes":size,"seconds":round(seconds,4),
+            "rowsPerSec":round(rate(rows,seconds),1),"mbPerSec":round(rate(size,seconds)/1024/1024,2)}
+
+
+def runBenchmark(workDir:str,rows:int,columns:int,endToEndFile:str=None)->Dict:
+    """
+    :param workDir: 生成合成 dump 的目录
+    :param rows: 每种字段类型的测试表的记录数
+    :param columns: 每种字段类型的测试表的字段数
+    :param endToEndFile: 端到端测试用的 dump 文件，None 时生成一个混合类型的合成 dump
+    :return: 测试结果
+    """
+    report={"python":sys.version.split()[0],"time":time.strftime("%Y-%m-%d %H:%M:%S"),"types":[],"endToEnd":None}
+
+    #每种字段类型一张表，所有字段都是这个类型
+    for fieldType in TYPE_CODES:
+        fileName=os.path.join(workDir,"bench-"+fieldType+".dmp")
+        generate(fileName,1,[fieldType]*columns,[rows],decimals=True)
+        for native in (False,True):
+            tables=timeTables(fileName,native)
+            t=tables[0]
+            item=summarize(fieldType+(" native" if native else " sql"),t["rows"],t["bytes"],t["seconds"])
+            report["types"].append(item)
+            printResult(item)
+
+    if endToEndFile is None:
+        endToEndFile=os.path.join(workDir,"bench-mixed.dmp")
+        generate(endToEndFile,len(TYPE_CODES),list(TYPE_CODES),[rows],decimals=True)
+    tables=timeTables(endToEndFile,False)
+    totalRows=sum(t["rows"] for t in tables)
+    e2e=timeEndToEnd(endToEndFile)
+    report["endToEnd"]=summarize("end-to-end",totalRows,e2e["bytes"],e2e["seconds"])
+    printResult(report["endToEnd"])
+    return report
+
+
+def printResult(item:Dict):
+    print("{:<20}{:>12} 行{:>10.2f} 秒{:>14.1f} 行/秒{:>10.2f} MB/秒".format(
+        item["name"],item["rows"],item["seconds"],item["rowsPerSec"],item["mbPerSec"]))
+
+
+def compareReports(old:Dict,new:Dict):
+    """与之前保存的结果对比行/秒的变化"""
+    oldItems={i["name"]:i for i in old.get("types",[])+[old.get("endToEnd") or {"name":None}]}
+    print("")
+    print("与",old.get("time"),"的结果对比(行/秒):")
+    for item in new["types"]+[new["endToEnd"]]:
+        o=oldItems.get(item["name"])
+        if o is None or o.get("rowsPerSec",0)==0:
+            continue
+        change=(item["rowsPerSec"]-o["rowsPerSec"])*100.0/o["rowsPerSec"]
+        print("{:<20}{:>14.1f} -> {:>14.1f}  {:+.1f}%".format(item["name"],o["rowsPerSec"],item["rowsPerSec"],change))
+
+
+def main():
+    usage="""用法: python bench.py [选项] [dump 文件]
+按字段类型分别测量解码速度，再测量完整解析输出 insert 语句的速度。
+指定 dump 文件时用它做端到端测试，否则生成一个合成 dump。
+  -r, --rows=N          每种字段类型测试表的记录数，默认 200000
+  -c, --columns=N       每种字段类型测试表的字段数，默认 8
+  -o, --output=FILE     把结果保存为 json，用于跨版本对比
+      --compare=FILE    与之前保存的 json 结果对比
+      --work-dir=DIR    合成 dump 的存放目录，默认临时目录，测试完删除"""
+    options,args=getopt.getopt(sys.argv[1:],"hr:c:o:",longopts=['help','rows=','columns=','output=','compare=','work-dir='])
+    rows=200000
+    columns=8
+    outputFile=None
+    compareFile=None
+    workDir=None
+    for opt_name,opt_value in options:
+        if opt_name in ('-h','--help'):
+            print(usage)
+            return
+        if opt_name in ('-r','--rows'):
+            rows=int(opt_value)
+        elif opt_name in ('-c','--columns'):
+            columns=int(opt_value)
+        elif opt_name in ('-o','--output'):
+            outputFile=opt_value
+        elif opt_name=='--compare':
+            compareFile=opt_value
+        elif opt_name=='--work-dir':
+            workDir=opt_value
+    endToEndFile=args[0] if len(args)>0 else None
+
+    if workDir is None:
+        with tempfile.TemporaryDirectory() as tmpDir:
+            report=runBenchmark(tmpDir,rows,columns,endToEndFile)
+    else:
+        os.makedirs(workDir,exist_ok=True)
+        report=runBenchmark(workDir,rows,columns,endToEndFile)
+
+    if outputFile is not None:
+        with open(outputFile,"w",encoding="utf-8") as out:
+            json.dump(report,out,ensure_ascii=False,indent=2)
+        print("结果已保存到",os.path.abspath(outputFile))
+    if compareFile is not None:
+        with open(compareFile,"r",encoding="utf-8") as f:
+            compareReports(json.load(f),report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from typing import Dict, List, Sequence, Tuple
+
+from datebatch import decodeDateColumn, decodeDateValues, np
+from dumpformat import OracleField
+from sinks import OutputOptions, RowSink, sinkTableName, tableFileName
+from sqltemplate import parseColumnNames
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def arrowType(field:OracleField,numberScale:int):
+    """根据字段定义取得对应的 Arrow 类型"""
+    if field.type=="number":
+        return pa.decimal128(38,numberScale)
+    if field.type=="date":
+        return pa.timestamp("s")
+    if field.type=="timestamp":
+        return pa.timestamp("us")
+    return pa.string()
+
+
+class ColumnarSink(RowSink):
+    """把记录按列组织成 record batch，写成 Parquet 或 Arrow IPC 文件，每张表一个文件
+
+    每攒够 rowGroupSize 行写出一个 row group(Arrow 为一个 record batch)。
+    DATE/TIMESTAMP 按原始字节收集，写出前按列转换(datebatch)，安装了 numpy 时整列一次转换，否则逐个值转换，
+    两种方式的结果相同，值不合法时都按 null 输出并提示。
+    """
+    native=True
+    numberType="decimal"
+    dateType="raw"
+    concatenable=False
+
+    def __init__(self,options:OutputOptions,fileName:str=None,resumeState:Dict=None):
+        """
+        :param options: 输出配置
+        :param fileName: 指定时所有记录都写入这个文件(并行模式下的一个表分片)，
+                         否则每张表在 options.outDir 下单独生成文件
+        :param resumeState: 断点续传时为检查点的 checkpointState，parquet/arrow 文件写完才完整，只能从表开始续传
+        """
+        if pa is None:
+            raise ImportError("parquet/arrow 输出需要先安装 pyarrow: pip install pyarrow")
+        self.options=options
+        self.fileName=fileName
+        #当前表在 dump 文件中的顺序号
+        self.tableSeq=0
+        self.schema=None
+        self.writer=None
+        self.outfile=None
+        self.decimalColumns:List[int]=[]
+        #(字段下标, 时间单位, 原始值字节数)
+        self.dateColumns:List[Tuple[int,str,int]]=[]
+        #decimal(38,numberScale) 的精度，小数位数超出的值四舍五入
+        self.quantum=Decimal(1).scaleb(-options.numberScale)
+        self.rows=[]
+        if resumeState is not None:
+            self.tableSeq=resumeState["tableSeq"]
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        self.tableSeq=seq if seq>0 else self.tableSeq+1
+        fileName=self.fileName
+        if fileName is None:
+            fileName=tableFileName(self.options.outDir,self.tableSeq,sinkTableName(sql,self.tableSeq),self.options.fileSuffix())
+
+        names=parseColumnNames(sql)
+        if len(names)!=len(fields):
+            names=["C"+str(i+1) for i in range(len(fields))]
+        types=[arrowType(field,self.options.numberScale) for field in fields]
+        self.schema=pa.schema([pa.field(name,t) for name,t in zip(names,types)])
+        self.decimalColumns=[i for i,field in enumerate(fields) if field.type=="number"]
+        self.dateColumns=[(i,types[i].unit,7 if field.type=="date" else 11)
+                          for i,field in enumerate(fields) if field.type in ("date","timestamp")]
+
+        if self.options.format=="parquet":
+            self.writer=pq.ParquetWriter(fileName,self.schema)
+        else:
+            self.outfile=pa.OSFile(fileName,"wb")
+            self.writer=pa.ipc.new_file(self.outfile,self.schema)
+        self.rows=[]
+
+    def writeRow(self,values:Sequence):
+        self.rows.append(values)
+        if len(self.rows)>=self.options.rowGroupSize:
+            self.flush()
+
+    def flush(self):
+        if len(self.rows)==0:
+            return
+        #按行攒的数据一次转置成按列
+        columns=[list(c) for c in zip(*self.rows)] if len(self.schema)>0 else []
+        quantum=self.quantum
+        #默认的 decimal 上下文只有28位精度，NUMBER 最多38位有效数字，超过28位时 quantize 会抛 InvalidOperation
+        with localcontext() as ctx:
+            ctx.prec=38+max(0,self.options.numberScale)
+            for i in self.decimalColumns:
+                columns[i]=[None if v is None else v.quantize(quantum,ROUND_HALF_UP) for v in columns[i]]
+        masks={}
+        for i,unit,width in self.dateColumns:
+            if np is not None:
+                columns[i],masks[i]=decodeDateColumn(columns[i],unit,width)
+            else:
+                columns[i]=decodeDateValues(columns[i])
+        arrays=[pa.array(column,type=field.type,mask=masks.get(i)) for i,(column,field) in enumerate(zip(columns,self.schema))]
+        batch=pa.RecordBatch.from_arrays(arrays,schema=self.schema)
+        if self.options.format=="parquet":
+            self.writer.write_table(pa.Table.from_batches([batch]),row_group_size=len(self.rows))
+        else:
+            self.writer.write_batch(batch)
+        self.rows=[]
+
+    def endTable(self):
+        self.flush()
+        self.writer.close()
+        self.writer=None
+        if self.outfile is not None:
+            self.outfile.close()
+            self.outfile=None
+
+    def checkpointState(self)->Dict:
+        #表中间不能续传，只在两张表之间记录检查点
+        if self.writer is not None:
+            return None
+        return {"tableSeq":self.tableSeq}
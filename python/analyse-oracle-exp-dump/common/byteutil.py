@@ -1,40 +1,30 @@
 import io
-import operator
 import common.result as result
 from common.result import  Result
 
+#按块查找时默认每次读取的字节数
+DEFAULT_WINDOW = 64 * 1024
+
 class ByteUtil:
     @classmethod
-    def readBytes(cls,f: io.BufferedReader, endFlagBytes: bytes, maxLen: int = 8192) -> Result:
+    def readBytes(cls,f: io.BufferedReader, endFlagBytes: bytes, maxLen: int = 8192, window: int = DEFAULT_WINDOW) -> Result:
         """读取字节直到指定的中止标记为止
 
-        :param f: 要读取的文件
+        :param f: 要读取的文件，也可以是带 find 方法的 DumpReader
         :param endFlagBytes: 中止标记，可以是一到多个字节数据
         :param maxLen: 最大读取字节数，超过这个字节数返回错误（result.Result包装）
-        :return: 结果，由result.Result包装
+        :param window: 按块查找时每次读取的字节数
+        :return: 结果，由result.Result包装，data 为包含中止标记在内的 memoryview
         """
-        idx = 0
-        findList = list(endFlagBytes)
-        findLen = len(findList);
-        firstread=f.read(findLen);
-        targetList = list(firstread)
-        if len(targetList) != findLen:
-            return result.Result(result.ResultCode.ERROR,
-                                "已不能从文件中获取指定长度数据,file offset=" + f.tell() + ",当前仅获取" + len(targetList) + "字节数据")
-        if operator.eq(findList, targetList):
-            return result.successResult(data=targetList)
-
-        while idx < maxLen:
-            nextByte = f.read(1)
-            if len(nextByte) == 0:
-                return result.errorResult(msg="读取到文件尾部，还未匹配到相应数据,file offset=" + hex(f.tell()))
+        start = f.tell()
+        ret = cls.findByte(f, start, endFlagBytes, maxLen, window)
+        if ret.isError():
+            return ret
 
-            idx += 1
-            targetList.append(nextByte[0])
-            if operator.eq(findList, targetList[idx:]):
-                return result.successResult(data=targetList)
+        f.seek(start)
+        data = f.read(ret.data + len(endFlagBytes))
+        return result.successResult(data=memoryview(data))
 
-        return result.errorResult(msg="到达读取最大字节数(" + str(maxLen) + ")，还未匹配到相应数据,file offset=" + hex(f.tell()))
     @classmethod
     def littleOrderBytes2UnsignedInt(cls,bs:bytes)->int:
         return int.from_bytes(bs,byteorder='little',signed=False);
@@ -52,35 +42,48 @@ class ByteUtil:
         return int.from_bytes(bs,byteorder='big',signed=True);
     
 
-    def findByte(cls,f: io.BufferedReader, start: int, findbytes: bytes, maxLen: int = 8192) -> Result:
-        """
+    @classmethod
+    def findByte(cls,f: io.BufferedReader, start: int, findbytes: bytes, maxLen: int = 8192, window: int = DEFAULT_WINDOW) -> Result:
+        """从 start 开始查找 findbytes
+
+        带 find 方法的读取器(如基于 mmap 的 DumpReader)直接在映射区中查找，
+        普通文件按 window 大小分块读取后用 bytes.find 查找。
 
-        :param f:
-        :param start:
-        :param findbytes:
-        :param maxLen:
-        :return:
+        :param f: 要查找的文件
+        :param start: 查找起始位置
+        :param findbytes: 要查找的字节数据
+        :param maxLen: 最多向后查找的字节数
+        :param window: 分块读取时每块的字节数
+        :return: 结果，由result.Result包装，data 为匹配位置相对 start 的偏移
         """
-        f.seek(start)
-        idx = 0
-        findList = list(findbytes)
-        findLen = len(findList);
-        targetList = list(f.read(findLen))
-        if len(targetList) != findLen:
-            return result.Result(result.ResultCode.ERROR,
-                                "已不能从文件中获取指定长度数据,file offset=" + (start + idx) + ",当前仅获取" + len(targetList) + "字节数据")
-        if operator.eq(findList, targetList):
-            return result.successResult(data=idx)
+        findLen = len(findbytes)
+        limit = start + maxLen + findLen
 
-        while (idx < maxLen):
-            nextByte = f.read(1)
-            if (len(nextByte) == 0):
-                return result.errorResult(msg="读取到文件尾部，还未匹配到相应数据,file offset=" + (start + idx))
+        if hasattr(f, "find"):
+            idx = f.find(findbytes, start, limit)
+            if idx >= 0:
+                return result.successResult(data=idx - start)
+            f.seek(min(limit, f.size))
+            if limit < f.size:
+                return result.errorResult(msg="到达读取最大字节数(" + str(maxLen) + ")，还未匹配到相应数据,file offset=" + hex(limit))
+            return result.errorResult(msg="读取到文件尾部，还未匹配到相应数据,file offset=" + hex(f.size))
 
-            idx += 1
-            targetList.pop(0)
-            targetList.append(nextByte)
-            if operator.eq(findList, targetList):
-                return result.successResult(data=idx)
+        f.seek(start)
+        # 上一块末尾保留 findLen-1 个字节，防止标记跨块
+        keep = findLen - 1
+        tail = b''
+        tailStart = start
+        remaining = limit - start
+        while remaining > 0:
+            chunk = f.read(min(window, remaining))
+            if len(chunk) == 0:
+                return result.errorResult(msg="读取到文件尾部，还未匹配到相应数据,file offset=" + hex(f.tell()))
+            remaining -= len(chunk)
+            data = tail + chunk
+            idx = data.find(findbytes)
+            if idx >= 0:
+                return result.successResult(data=tailStart + idx - start)
+            tail = data[max(0, len(data) - keep):] if keep > 0 else b''
+            tailStart += len(data) - len(tail)
 
-        return result.errorResult(msg="到达读取最大字节数(" + (maxLen) + ")，还未匹配到相应数据,file offset=" + (start + idx))
\ No newline at end of file
+        return result.errorResult(msg="到达读取最大字节数(" + str(maxLen) + ")，还未匹配到相应数据,file offset=" + hex(f.tell()))
@@ -0,0 +1,100 @@
+import datetime
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_DATE_LEN=7
+_TIMESTAMP_LEN=11
+#7 字节的 TIMESTAMP(没有小数秒)补齐成 11 字节，纳秒为0
+_FRACTION_PAD=b'\x00\x00\x00\x00'
+#null 位置的占位值，世纪字节为0(正常值至少为100)，转换时据此得到 null 掩码
+_NULL_DATE=b'\x00'*_DATE_LEN
+_NULL_TIMESTAMP=b'\x00'*_TIMESTAMP_LEN
+
+#各时间单位每秒的计数
+_UNIT_SCALES={"s":1,"ms":1000,"us":1000000,"ns":1000000000}
+
+
+def _monthDays():
+    #平年各月天数，下标为月份字节，0 和 13 以上为不合法的月份
+    return np.array([0,31,28,31,30,31,30,31,31,30,31,30,31]+[0]*243,dtype=np.int64)
+
+
+def decodeDateColumn(values:Sequence[Optional[bytes]],unit:str="us",width:int=_TIMESTAMP_LEN)->Tuple["np.ndarray","np.ndarray"]:
+    """把一列 DATE/TIMESTAMP 原始值(decodeRawAt 的结果)一次转换成 numpy datetime64 数组
+
+    整列原始字节拼成一个二维数组，按列做整数向量运算得到距 1970-01-01 的计数，
+    没有逐个值的 datetime 构造。值不合法(如月份为0)的位置当作 null，并输出提示。
+
+    :param values: 原始值，null 为 None
+    :param unit: 结果的时间单位: s / ms / us / ns
+    :param width: 7 为 DATE，11 为 TIMESTAMP(其中没有小数秒的值为 7 字节)
+    :return: (datetime64[unit] 数组, null 掩码)
+    """
+    count=len(values)
+    if width==_DATE_LEN:
+        data=b"".join([v or _NULL_DATE for v in values])
+    else:
+        data=b"".join([_NULL_TIMESTAMP if v is None else (v if len(v)==_TIMESTAMP_LEN else v+_FRACTION_PAD) for v in values])
+    raw=np.frombuffer(data,dtype=np.uint8).reshape(count,width)
+    century=raw[:,0]
+    mask=century==0
+    year=century.astype(np.int64)*100+raw[:,1]-10100
+    month=raw[:,2].astype(np.int64)
+    day=raw[:,3]
+    hour=raw[:,4]
+    minute=raw[:,5]
+    second=raw[:,6]
+
+    #公历日期到 1970-01-01 的天数(按 3 月为一年之始，闰日在年末)
+    y=year-(month<=2)
+    era=y//400
+    yearOfEra=y-era*400
+    days=era*146097+yearOfEra*365+yearOfEra//4-yearOfEra//100+(153*((month+9)%12)+2)//5+day-719469
+    #时分秒字节都比实际值大1
+    seconds=days*86400+hour.astype(np.int64)*3600+minute.astype(np.int64)*60+second-3661
+    scale=_UNIT_SCALES[unit]
+    value=seconds*scale
+    valid=((year>=1)&(year<=9999)&(day>=1)&(hour>=1)&(hour<=24)&(minute>=1)&(minute<=60)&(second>=1)&(second<=60))
+    if width==_TIMESTAMP_LEN:
+        nanos=raw[:,7:].copy().view(">u4").reshape(count)
+        value+=nanos//(1000000000//scale)
+        valid&=nanos<1000000000
+    leap=(year%4==0)&((year%100!=0)|(year%400==0))
+    valid&=day<=_monthDays()[month]+((month==2)&leap)
+
+    invalid=~valid&~mask
+    if invalid.any():
+        print("date/timestamp 值不正确,按 null 输出:",int(invalid.sum()),"个")
+        mask|=invalid
+    return value.view("datetime64["+unit+"]"),mask
+
+
+def decodeDateValues(values:Sequence[Optional[bytes]])->List[Optional[datetime.datetime]]:
+    """没有 numpy 时逐个值转换一列 DATE/TIMESTAMP 原始值，结果与 decodeDateColumn 相同:
+    值不合法的位置当作 null，并输出同样的提示
+
+    :param values: 原始值(7 或 11 字节)，null 为 None
+    :return: datetime 列表，null 为 None
+    """
+    result=[]
+    invalid=0
+    for v in values:
+        if v is None:
+            result.append(None)
+            continue
+        nanos=int.from_bytes(v[7:],"big") if len(v)==_TIMESTAMP_LEN else 0
+        try:
+            #时分秒字节都比实际值大1，纳秒超过 999999999 时微秒越界同样不合法
+            value=datetime.datetime((v[0]-100)*100+v[1]-100,v[2],v[3],v[4]-1,v[5]-1,v[6]-1,nanos//1000)
+        except ValueError:
+            invalid+=1
+            value=None
+        result.append(value)
+    if invalid>0:
+        print("date/timestamp 值不正确,按 null 输出:",invalid,"个")
+    return result
@@ -0,0 +1,169 @@
+import abc
+import datetime
+import queue
+import re
+import sqlite3
+import threading
+from decimal import Decimal
+from typing import List, Sequence
+
+from dumpformat import OracleField
+from sinks import OutputOptions, RowSink, sinkTableName
+from sqltemplate import parseColumnNames
+
+try:
+    import cx_Oracle
+except ImportError:
+    cx_Oracle = None
+
+
+class DbAdapter(abc.ABC):
+    """目标数据库的 DB-API 适配，屏蔽各驱动在连接方式和绑定变量写法上的差异"""
+
+    @abc.abstractmethod
+    def connect(self):
+        """打开一个新的 DB-API 连接，每个写入线程各用一个"""
+
+    def prepareSql(self,sql:str)->str:
+        """把 getInsertSql 得到的 :1..:N 绑定变量语句转换成驱动支持的写法"""
+        return sql
+
+    def prepareTable(self,conn,sql:str,fields:List[OracleField]):
+        """表开始导入前调用，默认目标表已存在"""
+        pass
+
+
+class OracleAdapter(DbAdapter):
+    """用 cx_Oracle 连接 Oracle，dsn 格式同 cx_Oracle.connect: 用户/密码@主机:端口/服务名"""
+
+    def __init__(self,dsn:str):
+        if cx_Oracle is None:
+            raise ImportError("db 输出到 oracle 需要先安装 cx_Oracle: pip install cx_Oracle")
+        self.dsn=dsn
+
+    def connect(self):
+        return cx_Oracle.connect(self.dsn)
+
+
+#引号内的内容原样保留，只替换引号外的 :N
+_BIND_PATTERN = re.compile(r'"[^"]*"|\'[^\']*\'|:(\d+)')
+
+
+class SqliteAdapter(DbAdapter):
+    """用标准库 sqlite3 写入本地文件，用来在没有 Oracle 的环境下测试导入流程
+
+    目标表不存在时按 insert 语句的字段名建一张不带类型的表。
+    """
+
+    def __init__(self,database:str):
+        self.database=database
+        sqlite3.register_adapter(datetime.datetime,lambda v:v.isoformat(" "))
+        sqlite3.register_adapter(Decimal,str)
+
+    def connect(self):
+        #多个线程/进程同时写一个文件时等锁，不直接报 database is locked
+        return sqlite3.connect(self.database,timeout=600,check_same_thread=False)
+
+    def prepareSql(self,sql:str)->str:
+        #sqlite 的编号绑定变量写作 ?N
+        return _BIND_PATTERN.sub(lambda m:m.group(0) if m.group(1) is None else "?"+m.group(1),sql.strip())
+
+    def prepareTable(self,conn,sql:str,fields:List[OracleField]):
+        names=parseColumnNames(sql)
+        conn.execute('CREATE TABLE IF NOT EXISTS "'+sinkTableName(sql,0)+'" ('+", ".join('"'+n+'"' for n in names)+")")
+        conn.commit()
+
+
+DB_ADAPTERS={
+    "oracle":OracleAdapter,
+    "sqlite":SqliteAdapter,
+}
+
+
+def createAdapter(options:OutputOptions)->DbAdapter:
+    return DB_ADAPTERS[options.dbType](options.dbDsn)
+
+
+class DbSink(RowSink):
+    """把解析出的记录直接用 executemany 批量写入目标数据库，不生成中间文件
+
+    解析线程把每 dbBatchSize 行放进有界队列，dbPoolSize 个写入线程各持有一个连接，
+    从队列取批次执行 executemany，每执行 dbCommitBatches 批提交一次。
+    队列满时解析线程等待，内存中最多只有 dbQueueSize 批数据。
+    """
+    native=True
+    concatenable=False
+
+    def __init__(self,options:OutputOptions,adapter:DbAdapter=None):
+        self.options=options
+        self.numberType=options.numberType
+        self.adapter=adapter or createAdapter(options)
+        self.queue=queue.Queue(maxsize=max(1,options.dbQueueSize))
+        self.sql:str=None
+        self.rows:List[Sequence]=[]
+        self.rowCount=0
+        self.error:BaseException=None
+        self.connections=[self.adapter.connect() for i in range(max(1,options.dbPoolSize))]
+        self.workers=[]
+        for conn in self.connections:
+            worker=threading.Thread(target=self.writeBatches,args=(conn,),daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        self.adapter.prepareTable(self.connections[0],sql,fields)
+        self.sql=self.adapter.prepareSql(sql)
+        self.rows=[]
+
+    def writeRow(self,values:Sequence):
+        self.rows.append(values)
+        if len(self.rows)>=self.options.dbBatchSize:
+            self.flush()
+
+    def flush(self):
+        if len(self.rows)==0:
+            return
+        if self.error is not None:
+            raise self.error
+        self.queue.put((self.sql,self.rows))
+        self.rowCount+=len(self.rows)
+        self.rows=[]
+
+    def endTable(self):
+        self.flush()
+
+    def writeBatches(self,conn):
+        """写入线程: 从队列取批次执行，收到 None 时提交并退出"""
+        cursor=conn.cursor()
+        batches=0
+        while True:
+            item=self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                #已经出错，只消费队列，避免解析线程一直阻塞
+                continue
+            sql,rows=item
+            try:
+                cursor.executemany(sql,rows)
+                batches+=1
+                if self.options.dbCommitBatches>0 and batches%self.options.dbCommitBatches==0:
+                    conn.commit()
+            except BaseException as e:
+                self.error=e
+        try:
+            if self.error is None:
+                conn.commit()
+        except BaseException as e:
+            self.error=e
+        cursor.close()
+
+    def close(self):
+        for i in range(len(self.workers)):
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        for conn in self.connections:
+            conn.close()
+        if self.error is not None:
+            raise self.error
@@ -13,13 +13,33 @@ import getopt
 import enum
 from typing import Any
 import logging
+import multiprocessing
+import shutil
+import time
 from logging.handlers import RotatingFileHandler
 from typing import List, Tuple, Dict
 
-from common.byteutil import ByteUtil
 from common.properties import Properties
 from common.result import  Result
-
+from dumpreader import DumpReader, compressionSupported, dumpCompression, openDumpReader
+from dumpformat import (INVALID, OracleField, getInsertSql, readDumpHeader,
+                        readFieldTypes)
+from dumpindex import (TableIndexEntry, TableShard, indexFileName, loadIndex,
+                       saveIndex, scanTables, skipTableRows, splitShards)
+from rowdecoder import compileRowDecoder, maxRowSize
+from sqltemplate import InsertSqlTemplate, parseTableName, projectInsertSql
+from tablefilter import TableFilter, splitNames
+from tableschema import TableSchema
+from progress import Progress
+from resume import ResumeCheckpointer, ResumeState, loadResumeState
+from runreport import PROFILE_LEVELS, RunReport
+from verify import verifyDump
+from sinks import (OutputOptions, RowSink, checkOutputOptions, createSerialSink,
+                   createSink, tableFileName)
+
+
+#没有进度输出时每解析多少行向预读线程报告一次位置
+READ_AHEAD_CHECK_ROWS=4096
 
 # Create a formatter.
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -60,370 +80,322 @@ insertLogger.addHandler(insertLoggerHandler)
 
 
 
-########## 常量 #########################
-
-DEFAULT_CHARSET="ascii"
-oracleCharsetCodeMapDict={
-    b'\x54\x03':"gbk",
-    b'\x69\x03':"utf-8",
-    b'\x01\x00':"ascii"
-    
-}
- 
-############# 类定义 ######################
-
- 
-
-
-
-class InsertSqlSegment:
-    sql:str
-    startidx:int
-
-
-
-class OracleField:
-    type:str=None
-    #这是定义长度，实际数据不一定会有这么长
-    defineLen:int=0
-    charset:str=None
-   
-    
-    def readMetaInfo(self,f:io.BufferedReader)->bool:
-        return False
-    
-    def readData(self,f:io.BufferedReader)->str:
-        return None
-
-class OracleVarchar2Field(OracleField):
-    def readMetaInfo(self, f: io.BufferedReader)->bool:
-        self.type="varchar2"
-        self.defineLen= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2))
-        #编码
-        self.charset= oracleCharsetCodeMapDict.get(f.read(2),DEFAULT_CHARSET)
-        #这2个字节不知道是啥
-        f.read(2)
-        return True
-    
-    def readData(self, f: io.BufferedReader)->str: 
-        bsize= f.read(2)
-        #null
-        if(bsize==b'\xfe\xff'):
-            return 'null'
-             
-        
-        size= ByteUtil.littleOrderBytes2Int(bsize)
-        if size>self.defineLen:
-            print("读取数据错误,实际长度大于定义长度, file offset=",hex(f.tell()))
-            return None   
-                
-        return  "'"+f.read(size).decode(self.charset, 'ignore')+"'"
-         
-        
-class OracleCharField(OracleField):
-    def readMetaInfo(self, f: io.BufferedReader)->bool:
-        self.type="varchar2"
-        self.defineLen= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2))
-        #编码
-        self.charset= oracleCharsetCodeMapDict.get(f.read(2),DEFAULT_CHARSET)
-        #这2个字节不知道是啥
-        f.read(2)
-        return True
-    
-    def readData(self, f: io.BufferedReader)->str:
-        bsize= f.read(2)
-        #null
-        if(bsize==b'\xfe\xff'):
-            return 'null'
-             
-        
-        size= ByteUtil.littleOrderBytes2Int(bsize)
-        
-        if size>self.defineLen:
-            print("读取数据错误,实际长度大于定义长度, file offset=",hex(f.tell()))
-            return None    
-        
-        return  "'"+f.read(size).decode(self.charset, 'ignore')+"'"
-
-class OracleNumberField(OracleField):
-    def readMetaInfo(self, f: io.BufferedReader)->bool:
-        self.type="number"
-        self.defineLen= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2))
-        return True
-
-    def readData(self, f: io.BufferedReader)->str:
-        bsize= f.read(2)
-        #data is null
-        if(bsize==b'\xfe\xff'):
-            return 'null'
-             
-        
-        size= ByteUtil.littleOrderBytes2Int(bsize)
-        
-        #data is 0
-        if size==1 :
-            if f.read(1)==b'\x80':
-                return '0' 
-                
-            else:
-                print("data read error,file offset=",hex(f.tell()))
-                return None
-        
-        if size>self.defineLen:
-            print("读取数据错误,实际长度大于定义长度, file offset=",hex(f.tell()))
-            return None            
-       
-        high=f.read(1)[0]
-         #data > 0   
-        if high> 0x80:
-            bdata=f.read(size-1)
-            idata=0
-            power=high-0xc1
-            for d in bdata:
-                idata+=(d-1)*(100**power)
-                power=power-1
-            
-            return str(idata)
-        else:
-            #data < 0   
-            bdata=f.read(size-2)
-            signed=f.read(1)
-            
-            idata=0
-            power=0x3e-high
-            for d in bdata:
-                idata+=(d-0x65)*(100**(power))
-                power=power-1
-            return str(idata)            
-         
-
-class OracleDateField(OracleField):
-    def readMetaInfo(self, f: io.BufferedReader)->bool:
-        self.type="date"
-        self.defineLen= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2))
-        return True
-
-    def readData(self, f: io.BufferedReader)->str:
-        bsize= f.read(2)
-        #data is null
-        if(bsize==b'\xfe\xff'):
-            return 'null'
-            
-        
-        size= ByteUtil.littleOrderBytes2Int(bsize)
-
-        # format error
-        if size!=7:
-            print("date 长度不正确,预期7,实际:",size,",file offset:",hex(f.tell()))
-            return None
-
-        data="to_date('"
-        # century
-        data+=str((f.read(1)[0]-100))
-        # year
-        data+="{:0>2d}".format(f.read(1)[0]-100)    
-        # month
-        data+="-{:0>2d}".format(f.read(1)[0])  
-        # day
-        data+="-{:0>2d}".format(f.read(1)[0])  
-        #hour
-        data+=" {:0>2d}:".format(f.read(1)[0]-1)  
-        #minute
-        data+="{:0>2d}:".format(f.read(1)[0]-1)  
-        #second
-        data+="{:0>2d}".format(f.read(1)[0]-1)  
-        
-        data+="', 'yyyy-MM-dd HH24:MI:ss')"
-        return data
-                        
-    
-
-class OracleTimestampField(OracleField):
-    def readMetaInfo(self, f: io.BufferedReader)->bool:
-        self.type="timestamp"
-        self.defineLen= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2))
-        return True
-
-    def readData(self, f: io.BufferedReader)->str:
-        bsize= f.read(2)
-        #data is null
-        if(bsize==b'\xfe\xff'):
-            return 'null'
-          
-        
-        size= ByteUtil.littleOrderBytes2Int(bsize)
-
-        # format error
-        if size!=7 and size!=11:
-            print("date 长度不正确,预期7,实际:",size,",file offset:",hex(f.tell()))
-            return None
-
-        data="to_timestamp('"
-        # century
-
-        data+=str((f.read(1)[0]-100))
-        # year
-        data+="{:0>2d}".format(f.read(1)[0]-100)    
-        # month
-        data+="-{:0>2d}".format(f.read(1)[0])  
-        # day
-        data+="-{:0>2d}".format(f.read(1)[0])  
-        #hour
-        data+=" {:0>2d}:".format(f.read(1)[0]-1)  
-        #minute
-        data+="{:0>2d}:".format(f.read(1)[0]-1)  
-        #second
-        data+="{:0>2d}".format(f.read(1)[0]-1)  
-        
-        if size==7:
-            data+="', 'yyyy-MM-dd HH24:MI:ss')"
-            return data
-        data+="."
-        data+=str(ByteUtil.bigOrderBytes2UnsignedInt(f.read(4)))[0:3]   
-        data+="', 'yyyy-MM-dd HH24:MI:ss.ff')"
-        
-        return data
- 
-
- 
-
-
-        
-FIELD_TYPES={
-    b'\x01\x00':OracleVarchar2Field,
-    b'\x02\x00':OracleNumberField,
-    b'\x0c\x00':OracleDateField,
-    b'\xb4\x00':OracleTimestampField,
-    b'\x60\x00':OracleCharField
-    
-}
-
-
-def getInsertSql(f:io.BufferedReader,charsetName:str)->Result:
-    startidx=f.tell()
-    exitNum=0
-    ret=ByteUtil.readBytes(f, b'\x0a',2048)
-    while ret.isSuccess():
-        insertSql=bytes(ret.data).decode(charsetName, 'ignore');
-        #print(insertSql)
-        if insertSql.strip().startswith("INSERT INTO"):
-            break
-        startidx=f.tell()
-        ret=ByteUtil.readBytes(f, b'\x0a')
-    
-    if ret.isError():
-        print("获取 insert sql 语句时发生错误(可能已经没有更多的insert sql了)：",ret.msg,",file start index=",hex(startidx))
-        return Result.errorResult(data=ret.data ,msg=ret.msg)
-    if exitNum==2:
-        return Result.errorResult(msg="读取到EXIT指定，文件已结束。")
-    
-    sqlseg= InsertSqlSegment()
-    sqlseg.sql=insertSql
-    sqlseg.startidx=startidx
-    return Result.successResult(data=sqlseg);
-        
-        
+def readFieldsData(f:DumpReader,fieldtypes:List[OracleField],sql:str,printDetail:bool=False,sink:RowSink=None,progress:Progress=None,maxRows:int=0,columns:List[int]=None,report:RunReport=None,
+                   checkpointer:ResumeCheckpointer=None,tableSeq:int=0)->bool:
+    """解析一张表的记录，输出到 sink
 
-def readFieldInfo(f: io.BufferedReader)->OracleField:
-    fieldTypeBytes=f.read(2);
-    field=FIELD_TYPES.get(fieldTypeBytes,OracleField)()
-    success=field.readMetaInfo(f);
-    if success:
-        return field
+    maxRows 大于0时只解析从当前位置开始的 maxRows 行(用于按检查点分片)，
+    不要求读到表结束标记。
+    columns 指定只输出哪些字段(下标从0开始)，其余字段只按长度跳过，不解码。
+    printDetail 为 True 或日志级别为 DEBUG(trace) 时逐行输出记录位置和内容，
+    否则解析循环中没有任何逐行的输出和日志，进度由 progress 按间隔输出。
+    report 启用时统计本表的解码和输出用时，fields 级别时还统计每种字段类型的解码用时。
+    checkpointer 不为 None 时按间隔记录断点续传的检查点，调用前要先用 checkpointer.beginTable 设置当前表。
+    tableSeq 为表在 dump 文件中的顺序号，传给 sink 用于每张表的输出文件名。
+    """
+    decoderFields=fieldtypes
+    if report is not None and report.isEnabled():
+        report.beginTable(parseTableName(sql) or "")
+        decoderFields=report.wrapFields(fieldtypes)
+        sink=report.wrapSink(sink)
+        startTime=time.perf_counter()
+        startPos=f.tell()
     else:
-        return None
-    
-    
-def readFieldTypes(f:io.BufferedReader,printDetail:bool=False)->Result:
-    colCount= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2))
-    if printDetail==True:
-        print("字段总数：",colCount)
-    tableFields=[]
-    for i in range(colCount):
-        theFieldInfo=readFieldInfo(f)
-        if(theFieldInfo==None):
-            return Result.errorResult(msg="field "+str(i)+" type unknown,exit. file offset="+hex(f.tell()))
-
-        if printDetail==True:        
-            print("field ",i,"type:", theFieldInfo.type,",len:",theFieldInfo.defineLen,",charset:",theFieldInfo.charset)
-        tableFields.append(theFieldInfo);
-
-    #字段定义与记录之间的四字节0的分隔符
-    spearate=  f.read(4)
-    if spearate!=b'\x00\x00\x00\x00':
-        print("预期的字段定义与数据值中间的分隔符未出现，程序退出。file offset=",hex(f.tell()))
-        return Result.errorResult(msg="预期的字段定义与数据值中间的分隔符未出现，程序退出。file offset="+hex(f.tell()))
-    
-    return Result.successResult(data=tableFields)    
+        report=None
+    native=sink is not None and sink.native
+    decodeRow=compileRowDecoder(decoderFields,columns,native,sink.numberType if native else "auto",
+                                sink.dateType if native else "datetime")
+    rowBytes=maxRowSize(len(fieldtypes))
+    #sql 字面值解码失败时为 None，原生类型解码失败时为 INVALID
+    invalidValue=INVALID if native else None
+    if columns is not None:
+        sql=projectInsertSql(sql,columns)
+        fieldtypes=[fieldtypes[i] for i in columns]
+
+    if sink is not None:
+        sink.beginTable(sql,fieldtypes,tableSeq)
+    if progress is not None:
+        progress.beginTable(parseTableName(sql) or "",f.tell())
+    try:
+        if printDetail or rootLogger.isEnabledFor(logging.DEBUG):
+            ok,recCount=readRowsDetail(f,decodeRow,rowBytes,invalidValue,InsertSqlTemplate(sql),printDetail,sink,maxRows)
+        else:
+            ok,recCount=readRows(f,decodeRow,rowBytes,invalidValue,sink,maxRows,progress,checkpointer)
+    finally:
+        if sink is not None:
+            sink.endTable()
+    if progress is not None:
+        progress.endTable(recCount,f.tell())
+    if checkpointer is not None:
+        checkpointer.endTable(recCount,f.tell())
+    if report is not None:
+        report.addTextCacheStats(sql,fieldtypes)
+        report.endTable(recCount,f.tell()-startPos,time.perf_counter()-startTime)
+    return ok
+
+
+def readRows(f:DumpReader,decodeRow,rowBytes:int,invalidValue,sink:RowSink,maxRows:int,progress:Progress,checkpointer:ResumeCheckpointer=None)->Tuple[bool,int]:
+    """逐行解析到表结束标记或 maxRows 行
+
+    :return: (是否成功, 解析的记录数)
+    """
+    global fileStartIdx
+    #压缩文件只有一个数据窗口，解析位置超过 limit 后要移动窗口，文件位置为 base+pos
+    limit=f.fill(rowBytes)
+    buf=f.buf
+    pos=f.pos
+    base=f.base
+    recCount=0
+    writeRow=sink.writeRow if sink is not None else None
+    readAhead=f.readAhead
+    if readAhead is not None:
+        readAhead.advance(pos)
+    #每解析 checkRows 行才调用一次 progress.update 和 readAhead.advance
+    checkRows=progress.checkRows if progress is not None else READ_AHEAD_CHECK_ROWS
+    nextCheck=checkRows
 
-       
-def readFieldsData(f:io.BufferedReader,fieldtypes:List[OracleField],sql:str,printDetail:bool=False,outfile:io.TextIOWrapper=None)->bool:
+    #没有记录的情况
+    if buf[pos:pos+2]==b'\xff\xff':
+        f.pos=pos+2
+        return True,0
+
+    rowStart=pos
+    try:
+        while True:
+            if pos>limit:
+                f.pos=pos
+                limit=f.fill(rowBytes)
+                buf=f.buf
+                pos=f.pos
+                base=f.base
+            rowStart=pos
+            fieldValues,pos=decodeRow(buf,pos)
+            if invalidValue in fieldValues:
+                print("")
+                print("第",recCount+1,"条记录有字段解析失败，record offset=",hex(base+rowStart))
+                return False,recCount
+            recCount+=1
+            if writeRow is not None:
+                writeRow(fieldValues)
+
+            #判断是否结束
+            if buf[pos:pos+2]!=b'\x00\x00':
+                print("")
+                print("没有记录中止标记，file offset=",hex(base+pos))
+                return False,recCount
+            pos+=2
+            if recCount==maxRows:
+                return True,recCount
+            if buf[pos:pos+2]==b'\xff\xff':
+                pos+=2
+                return True,recCount
+            if recCount==nextCheck:
+                if progress is not None:
+                    progress.update(recCount,base+pos)
+                if readAhead is not None:
+                    readAhead.advance(pos)
+                if checkpointer is not None and checkpointer.isDue():
+                    f.pos=pos
+                    checkpointer.saveRow(recCount,base+pos)
+                nextCheck+=checkRows
+    finally:
+        f.pos=min(pos,len(buf))
+        fileStartIdx=base+rowStart
+
+
+def readRowsDetail(f:DumpReader,decodeRow,rowBytes:int,invalidValue,template:InsertSqlTemplate,printDetail:bool,sink:RowSink,maxRows:int)->Tuple[bool,int]:
+    """与 readRows 相同，但逐行输出记录位置(trace 日志)和内容(debug)，用于排查解析问题"""
     global fileStartIdx
     recCount=1;
-    
+
     #没有记录的情况
-    blen=f.read(2)
     fileStartIdx = f.tell();
-    if blen==b'\xff\xff':
-        print("0条记录")
-        return True
-    else:
-        f.seek(f.tell()-2)
-        fileStartIdx = f.tell();
-    
-    
+    if f.peek(2)==b'\xff\xff':
+        f.skip(2)
+        return True,0
+
     while True:
-        # print("\b"*100,end="")
-        #print("\r读取第",recCount,"条记录:",end="") 
         if printDetail==True:
             print("读取第",recCount,"条记录:",hex(f.tell()))
-        else:
-           # print("\b"*2000,end="")
-            print("\r读取第",recCount,"条记录(",hex(f.tell()),"):",end="")
-            rootLogger.info("读取第"+str(recCount)+"条记录("+hex(f.tell())+"):")
-        currSql=sql        
-        fieldIdx=1;    
-        for ft in fieldtypes:
-            fileStartIdx = f.tell();
-            if(printDetail==False):
-                #print(" >",fieldIdx,"(",hex(fileStartIdx),")",end="")
-                rootLogger.info(" >>>"+str(fieldIdx)+"("+hex(fileStartIdx)+")")                  
-            fieldValue=ft.readData(f)
-            currSql=currSql.replace(":"+str(fieldIdx),fieldValue,1)
-           
-            fieldIdx+=1
-            #print(ft.readData(f),"\t")
-        
-        if printDetail==True:
+        rootLogger.debug("读取第"+str(recCount)+"条记录("+hex(f.tell())+")")
+        fileStartIdx = f.tell();
+        f.fill(rowBytes)
+        fieldValues,f.pos=decodeRow(f.buf,f.pos)
+        if invalidValue in fieldValues:
             print("")
-            print(currSql)
+            print("第",recCount,"条记录有字段解析失败，record offset=",hex(fileStartIdx))
+            return False,recCount-1
+
+        if printDetail==True:
+            print(fieldValues if invalidValue is INVALID else template.render(fieldValues))
+
+        if sink!=None:
+            sink.writeRow(fieldValues)
 
- 
-        if outfile!=None:
-            outfile.write(currSql)
-            
-        
         fileStartIdx = f.tell();
         blen=f.read(2)
         #判断是否结束
         if blen==b'\x00\x00':
             fileStartIdx = f.tell();
-            blen=f.read(2)
-            if blen==b'\xff\xff':
-                return True
-            else:
-                f.seek(f.tell()-2)
-                fileStartIdx = f.tell();
+            if recCount==maxRows:
+                return True,recCount
+            if f.peek(2)==b'\xff\xff':
+                f.skip(2)
+                return True,recCount
         else:
             print("")
-            print("没有记录中止标记，file offset=",hex(f.tell()))  
-            return False
-        
+            print("没有记录中止标记，file offset=",hex(f.tell()))
+            return False,recCount
+
         recCount+=1
-                          
-        
 
 
+def extractTable(task:Tuple[str,TableShard,str,List[int],OutputOptions,str,int])->Tuple[TableShard,bool,Dict]:
+    """并行模式下的工作进程入口，每个进程自己打开 dump 文件，把一个表分片输出到单独的文件
+
+    :param task: (dump 文件名, 表分片, 输出文件名, 输出的字段下标, 输出配置, 统计级别, 预读 MB)
+    :return: (表分片, 是否成功, 分片的统计，没有启用统计时为 None)
+    """
+    fileName,shard,outfileName,columns,options,profile,readAheadMb=task
+    entry=shard.entry
+    report=RunReport(profile)
+    tableFile=tableFileName(options.outDir,entry.seq,entry.tableName,options.fileSuffix())
+    sink=createSink(options,outfileName,tableFile,shard.shardNo==1)
+    try:
+        with DumpReader(fileName) as f:
+            f.seek(shard.startOffset)
+            if readAheadMb>0:
+                f.startReadAhead(readAheadMb*1024*1024)
+            ok=readFieldsData(f,entry.schema.createFields(),sql=entry.sql,sink=sink,maxRows=shard.rowCount,columns=columns,report=report,tableSeq=entry.seq)
+    finally:
+        sink.close()
+    if not report.isEnabled():
+        return shard,ok,None
+    return shard,ok,report.tables[0].toDict()
+
+
+def extractParallel(fileName:str,entries:List[TableIndexEntry],options:OutputOptions,processes:int,shardRows:int,tableFilter:TableFilter,report:RunReport,readAheadMb:int=0):
+    """用进程池并行解析预扫描得到的各表，每张表写入 out-dir 下单独的文件
+
+    行数多的表按检查点切成多个分片并行解析，分片各自输出，全部完成后按顺序合并；
+    parquet/arrow 这类不能按字节拼接的格式保留各分片文件，db 格式各分片直接写入数据库。
+    """
+    if not options.isDatabase():
+        os.makedirs(options.outDir,exist_ok=True)
+    tasks=[]
+    tableFiles={}
+    partFiles={}
+    for entry in entries:
+        outfileName=tableFileName(options.outDir,entry.seq,entry.tableName,options.fileSuffix())
+        tableFiles[entry.seq]=outfileName
+        columns=tableFilter.columnIndexes(entry.tableName,entry.schema.names())
+        shards=splitShards(entry,shardRows)
+        if len(shards)==1:
+            tasks.append((fileName,shards[0],outfileName,columns,options,report.level,readAheadMb))
+            continue
+        partFiles[entry.seq]=[]
+        for shard in shards:
+            partName="{}.part{:04d}".format(outfileName,shard.shardNo)
+            if not options.isConcatenable():
+                #分片文件保持原后缀，作为同一张表的多个数据文件
+                root,suffix=os.path.splitext(outfileName)
+                partName="{}.part{:04d}{}".format(root,shard.shardNo,suffix)
+            partFiles[entry.seq].append(partName)
+            tasks.append((fileName,shard,partName,columns,options,report.level,readAheadMb))
+
+    #数据量大的分片先开始，避免最后只剩一个大表在跑
+    tasks.sort(key=lambda t:t[1].rowCount*t[1].entry.dataSize()//max(t[1].entry.rowCount,1),reverse=True)
+
+    failed=set()
+    progress=Progress(sum(e.dataSize() for e in entries))
+    with multiprocessing.Pool(processes=processes) as pool:
+        for shard,ok,stats in pool.imap_unordered(extractTable,tasks):
+            entry=shard.entry
+            if stats is not None:
+                report.addTableStats(stats)
+            if not ok:
+                failed.add(entry.seq)
+                print("")
+                print("表",entry.tableName,"分片",shard.shardNo,"解析出错")
+            progress.advance(shard.rowCount,entry.dataSize()*shard.rowCount//max(entry.rowCount,1),entry.tableName+" 分片 "+str(shard.shardNo))
+            rootLogger.info("table "+entry.tableName+" shard "+str(shard.shardNo)+" done, rows="+str(shard.rowCount)+", ok="+str(ok))
+
+    print("")
+    progress.finish()
+
+    #分片输出按顺序合并成一个表文件
+    if not options.isConcatenable():
+        partFiles={}
+    for seq,parts in partFiles.items():
+        with open(tableFiles[seq],'wb') as out:
+            for partName in parts:
+                with open(partName,'rb') as part:
+                    shutil.copyfileobj(part,out,16*1024*1024)
+                os.remove(partName)
+    if len(failed)>0:
+        print("有",len(failed),"张表解析出错,请查看日志")
+
+
+def getTableIndex(f:DumpReader,fileName:str,charsetName:str,scanStart:int,checkpointRows:int,useIndex:bool)->List[TableIndexEntry]:
+    """取得各表在 dump 文件中的位置
+
+    优先使用 dump 文件旁有效的 .dmpidx 索引，没有或已失效时从当前位置预扫描，
+    扫描完整时写入索引供下次使用。
+    """
+    if useIndex:
+        idx_ret=loadIndex(fileName,scanStart,checkpointRows)
+        if idx_ret.isSuccess():
+            print("使用索引文件:",indexFileName(fileName))
+            return idx_ret.data
+        print(idx_ret.msg)
+
+    print("预扫描表位置...")
+    scan_ret=scanTables(f,charsetName,checkpointRows)
+    if scan_ret.isError():
+        print(scan_ret.msg)
+    elif useIndex:
+        saveIndex(fileName,charsetName,scanStart,checkpointRows,scan_ret.data)
+        print("已写入索引文件:",indexFileName(fileName))
+    return scan_ret.data
+
+
+def runVerify(fileName:str,insertSqlIndex:int,readAheadMb:int,reportFile:str)->bool:
+    """校验 dump 文件结构，输出每张表的行数、超出定义长度的字段和第一个损坏的位置，报告写入 reportFile
+
+    :return: 文件是否完整
+    """
+    with openDumpReader(fileName) as f:
+        header_ret=readDumpHeader(f)
+        if header_ret.isError():
+            return False
+        if insertSqlIndex>0:
+            f.seek(insertSqlIndex)
+        progress=Progress(0 if f.streaming else f.size-f.tell())
+        if readAheadMb>0:
+            f.startReadAhead(readAheadMb*1024*1024)
+        print("校验 dump 文件结构...")
+        report=verifyDump(f,fileName,header_ret.data,progress)
+        progress.finish()
+
+    for table in report.tables:
+        for overflow in sorted(table.overflows.values(),key=lambda o:o.index):
+            print("表",table.tableName,"字段",overflow.name,"有",overflow.count,"个值超出定义长度",overflow.defineLen,
+                  ",最长",overflow.maxLen,",第一个位置",hex(overflow.firstOffset))
+    if report.isOk():
+        print("校验通过:",len(report.tables),"张表,",report.totalRows(),"条记录")
+    else:
+        print("")
+        print("dump 文件已损坏:"+("" if report.errorTable is None else " 表 "+report.errorTable+" ,"),report.errorMsg)
+        if report.errorRowOffset is not None:
+            print("损坏的记录起始位置:",hex(report.errorRowOffset),",在此之前的",report.totalRows(),"条记录完整")
+    report.save(reportFile)
+    return report.isOk()
+
+
+def saveReport(report:RunReport,fileName:str):
+    if report.isEnabled():
+        report.save(fileName)
+
 
 #--------------------------------
 global fileStartIdx
@@ -461,91 +433,249 @@ def main():
     
     
     
+    parallel:int=int(pros.get("parallel","0"))
+    print("parallel=",parallel)
+
+    outputOptions=OutputOptions.fromProperties(pros)
+    checkpointRows:int=int(pros.get("checkpoint-rows","100000"))
+    shardRows:int=int(pros.get("shard-rows","1000000"))
+
     outfileName=pros.get("out-file",None)
+
+    #要解析的表和字段
+    tableFilter=TableFilter.fromProperties(pros)
+    useIndex:bool=pros.get("use-index","true").lower()=="true"
+    #trace 为 true 时把每条记录的文件位置写入日志(很慢，只用于排查问题)
+    trace:bool=pros.get("trace","false").lower()=="true"
+    #分阶段统计用时，结束时输出 json 运行报告
+    profile:str=pros.get("profile","off").lower()
+    profileReport:str=pros.get("profile-report","dump-analyse-report.json")
+    sampleInterval:float=float(pros.get("profile-sample-interval","0"))
+    #解析位置之前预读多少 MB 到页缓存，0 表示不预读
+    readAheadMb:int=int(pros.get("read-ahead-mb","64"))
+    #断点续传: 每隔多少秒记录一次检查点，0 表示不记录
+    resumeInterval:float=float(pros.get("resume-interval","60"))
+    resumeFile:str=pros.get("resume-file","dump-analyse.resume.json")
+    resume:bool=False
+    #只校验 dump 文件结构，不解码、不输出
+    verify:bool=pros.get("verify","false").lower()=="true"
+    verifyReport:str=pros.get("verify-report","dump-analyse-verify.json")
+
+    options, args = getopt.getopt(sys.argv[1:], "do:i:r:p:t:x:c:", longopts=['debug','outfile=','insertsqlidx=','rowidx=','parallel=','table=','exclude=','columns=','no-index','trace','profile=','sample=','resume','verify'])
+    if len(args)>0:
+        fileName=args[0]
+        print("dump-file=",fileName)
+
+    for opt_name,opt_value in options:
+        if opt_name in ('-d','--debug'):
+            printDetail =True
+            continue
+        if opt_name in ('-r','--rowidx'):
+            rowIndex=int(opt_value,16)
+            continue
+        if opt_name in ('-i','--insertsqlidx'):
+            insertSqlIndex=int(opt_value,16)
+            continue
+        if opt_name in ('-o','--outfile'):
+            outfileName=opt_value
+            continue
+        if opt_name in ('-p','--parallel'):
+            parallel=int(opt_value)
+            continue
+        if opt_name in ('-t','--table'):
+            tableFilter.includes.extend(n.upper() for n in splitNames(opt_value))
+            continue
+        if opt_name in ('-x','--exclude'):
+            tableFilter.excludes.extend(n.upper() for n in splitNames(opt_value))
+            continue
+        if opt_name in ('-c','--columns'):
+            # 表名:字段1,字段2
+            tableName,_,columnNames=opt_value.partition(":")
+            tableFilter.columns[tableName.strip().upper()]=[n.upper() for n in splitNames(columnNames)]
+            continue
+        if opt_name=='--no-index':
+            useIndex=False
+            continue
+        if opt_name=='--trace':
+            trace=True
+            continue
+        if opt_name=='--profile':
+            profile=opt_value.lower()
+            continue
+        if opt_name=='--sample':
+            sampleInterval=float(opt_value)
+            continue
+        if opt_name=='--resume':
+            resume=True
+            continue
+        if opt_name=='--verify':
+            verify=True
+            continue
+
+    if trace:
+        rootLogger.setLevel(logging.DEBUG)
+        rootLoggerHandler.setLevel(logging.DEBUG)
+
     print("out-file=",outfileName)
-    outfile=None
-    if outfileName!=None:
-        outfile:io.TextIOWrapper=open(outfileName,'w')
-    
-    
-    
-    # options, args = getopt.getopt(sys.argv[1:], "-d-o:-i:-r:", longopts=['debug','outfile=','insertsqlidx=','rowidx=',])
-    # if len(args)>0:
-    #     fileName=args[0]
-    # else:
-        #fileName= "20220216-1105.dmp"
-        # fileName= "house.dmp"
-
-    # for opt_name,opt_value in options:
-    #     if opt_name in ('-d','--debug'):
-    #         printDetail =True
-    #         continue
-    #     if opt_name in ('-r','--rowidx'):
-    #         rowIndex=int(opt_value,16)
-    #         continue
-    #     if opt_name in ('-i','--insertsqlidx'):
-    #         insertSqlIndex=int(opt_value,16)
-    #         continue
-             
-    #     if opt_name in ('-o','--outfile'):
-    #         print("outfilename=",opt_value)
-    #         outfile = open(opt_value,'w')
+    print("tables=",tableFilter.includes,"exclude-tables=",tableFilter.excludes)
+    print("out-format=",outputOptions.format)
+    check_ret=checkOutputOptions(outputOptions)
+    if check_ret.isError():
+        print(check_ret.msg)
+        return
+    if profile not in PROFILE_LEVELS:
+        print("不支持的 profile:",profile,",可选:",PROFILE_LEVELS)
+        return
+    if sampleInterval>0 and profile=="off":
+        profile="stages"
+    report=RunReport(profile)
+    report.dumpFile=fileName
+    if sampleInterval>0:
+        report.startSampler(sampleInterval)
     if os.path.exists(fileName)==False:
         print("dump 文件",fileName,"不存在")
         exit(1)
-        
-    with open(fileName, "rb") as f:
+
+    #压缩的 dump 文件边解压边顺序解析，不支持需要随机访问的预扫描索引和并行解析
+    compression=dumpCompression(fileName)
+    if compression is not None:
+        print("dump 文件为",compression,"压缩格式，顺序解析")
+        if not compressionSupported(compression):
+            print("解压",compression,"需要安装 zstandard: pip install zstandard")
+            return
+        if parallel>1:
+            print("压缩的 dump 文件不能并行解析，parallel 不生效")
+            parallel=0
+
+    if verify:
+        if not runVerify(fileName,insertSqlIndex,readAheadMb,verifyReport):
+            exit(1)
+        return
+
+    if rowIndex>0 and parallel>1:
+        print("并行模式不支持 row-start-index，只能串行解析")
+        return
+
+    #影响输出内容的配置，续传时必须与断点记录的一致
+    resumeConfig={"format":outputOptions.format,"outFile":outfileName,"outDir":outputOptions.outDir,
+                  "outLayout":outputOptions.outLayout,"outCompress":outputOptions.outCompress,"insertMode":outputOptions.insertMode,
+                  "tables":tableFilter.includes,"excludeTables":tableFilter.excludes,"columns":tableFilter.columns}
+    resumeState:ResumeState=None
+    if resume:
+        if parallel>1:
+            print("并行模式不支持断点续传")
+            return
+        resume_ret=loadResumeState(resumeFile,fileName,resumeConfig)
+        if resume_ret.isError():
+            print(resume_ret.msg)
+            return
+        resumeState=resume_ret.data
+        print("从断点续传: 已输出",resumeState.totalRows,"条记录，dump 文件位置",hex(resumeState.offset),
+              "" if not resumeState.isInTable() else "(表 "+resumeState.tableName+" 第 "+str(resumeState.tableRows+1)+" 条记录)")
+
+    sink=None
+    checkpointer:ResumeCheckpointer=None
+    if parallel<=1:
+        sink=createSerialSink(outputOptions,outfileName,resumeState.output if resumeState is not None else None)
+        if sink is not None and resumeInterval>0:
+            checkpointer=ResumeCheckpointer(resumeFile,resumeInterval,fileName,sink,resumeConfig,resumeState)
+
+    with openDumpReader(fileName) as f:
         
         try:
             
-            a = f.read(1);
-
-            if (a[0] != 0x03):
-                print("第一个字节不是预期值，文件可能不是dump文件。：", a)
+            header_ret=readDumpHeader(f)
+            if header_ret.isError():
+                return
+            currentCharsetName=header_ret.data
             fileStartIdx = f.tell();
 
-            thecharsetCode=f.read(2)
-            fileStartIdx = f.tell();
-            
-            currentCharsetName=oracleCharsetCodeMapDict.get(thecharsetCode[::-1]);
-            print("dump 文件字符集:",currentCharsetName)
-
-            ret: Result = None
-            for num in range(4):
-                ret = ByteUtil.readBytes(f, b'\x0a')
-                if (ret.isError()):
-                    print(ret.msg)
-                    return
-                print((bytes(ret.data[0:-1]).decode(currentCharsetName, 'ignore')))
-            entityOffset=bytes(ret.data).decode(currentCharsetName, 'ignore');
-            
-            print("获取到dump数据进入点位置:",entityOffset)
-            f.seek(int(entityOffset));
-            fileStartIdx = f.tell();
-            #读第一段带长度字节 到 +00：00        
-            nextLen=  ByteUtil.littleOrderBytes2UnsignedInt(f.read(2));
-            while(nextLen>0):
-                f.read(nextLen);
-                fileStartIdx = f.tell();
-                nextLen=  ByteUtil.littleOrderBytes2UnsignedInt(f.read(2));
-
-            #读第二段带长度字节到 DISABLE:ALL
-            nextLen= ByteUtil.littleOrderBytes2UnsignedInt(f.read(2));
-            while(nextLen>0):
-                f.read(nextLen);
-                fileStartIdx = f.tell();
-                nextLen=  ByteUtil.littleOrderBytes2UnsignedInt(f.read(2));
-            
-            if insertSqlIndex>0  :
+            if insertSqlIndex>0 and resumeState is None:
                 f.seek(insertSqlIndex)
                 fileStartIdx = f.tell();
                 print("insertSqlIndex=",hex(insertSqlIndex))
+            #压缩文件解压完之前不知道总大小，不显示百分比
+            progress=Progress(0 if f.streaming else f.size-f.tell())
+            if readAheadMb>0:
+                f.startReadAhead(readAheadMb*1024*1024)
+
+            if parallel>1 or (tableFilter.hasTableFilter() and not f.streaming):
+                entries=report.timedRun("scan",getTableIndex,f,fileName,currentCharsetName,insertSqlIndex,checkpointRows,useIndex)
+                if tableFilter.hasTableFilter():
+                    #没选中的表直接跳过，连字段定义都不用读
+                    entries=[e for e in entries if tableFilter.accept(e.tableName)]
+                    print("匹配到",len(entries),"张表:",[e.tableName for e in entries])
+                #指定的字段都不存在的表没有可输出的字段
+                entries=[e for e in entries if tableFilter.acceptColumns(e.tableName,e.schema.names())]
+                report.bytesScanned=sum(e.dataSize() for e in entries)
+                if parallel>1:
+                    print("共",len(entries),"张表,输出目录:",os.path.abspath(outputOptions.outDir))
+                    extractParallel(fileName,entries,outputOptions,parallel,shardRows,tableFilter,report,readAheadMb)
+                    saveReport(report,profileReport)
+                    return
+                if rowIndex>0 and resumeState is None:
+                    #只有第一张选中的表从指定的记录位置开始
+                    if len(entries)==0 or not entries[0].dataOffset<=rowIndex<entries[0].endOffset:
+                        print("row-start-index=",hex(rowIndex),"不在第一张选中的表的记录范围内")
+                        if sink!=None:
+                            sink.close()
+                        return
+                progress=Progress(sum(e.dataSize() for e in entries))
+                for entry in entries:
+                    startOffset=entry.dataOffset
+                    startRows=0
+                    if rowIndex>0 and resumeState is None:
+                        startOffset=rowIndex
+                        print("rowIndex=",hex(rowIndex))
+                        rowIndex=0
+                    if resumeState is not None:
+                        if resumeState.isInTable() and entry.insertOffset==resumeState.insertOffset:
+                            startOffset=resumeState.offset
+                            startRows=resumeState.tableRows
+                        elif entry.insertOffset<resumeState.offset:
+                            #检查点之前已经完成的表
+                            continue
+                    print("--------------------------------")
+                    print("insert sql start index:",hex(entry.insertOffset))
+                    print(entry.sql)
+                    f.seek(startOffset)
+                    fileStartIdx = f.tell();
+                    if checkpointer is not None:
+                        checkpointer.beginTable(entry.seq,entry.sql,entry.insertOffset,entry.schema,startRows)
+                    columns=tableFilter.columnIndexes(entry.tableName,entry.schema.names())
+                    readFieldsData(f,entry.schema.createFields(),sql=entry.sql, printDetail=printDetail,sink=sink,progress=progress,columns=columns,report=report,
+                                   checkpointer=checkpointer,tableSeq=entry.seq)
+                progress.finish()
+                saveReport(report,profileReport)
+                if sink!=None:
+                    sink.close()
+                if checkpointer is not None:
+                    checkpointer.finish()
+                return
+
+            tableSeq=0
+            if resumeState is not None:
+                f.seek(resumeState.offset)
+                progress=Progress(0 if f.streaming else f.size-f.tell())
+                tableSeq=resumeState.tableSeq
+                if resumeState.isInTable():
+                    #接着解析检查点所在的表，字段定义取检查点记录的
+                    print("--------------------------------")
+                    print("接着解析表",resumeState.tableName,"从第",resumeState.tableRows+1,"条记录开始")
+                    print(resumeState.sql)
+                    fileStartIdx = f.tell();
+                    if checkpointer is not None:
+                        checkpointer.beginTable(tableSeq,resumeState.sql,resumeState.insertOffset,resumeState.schema,resumeState.tableRows)
+                    columns=tableFilter.columnIndexes(resumeState.schema.tableName,resumeState.schema.names())
+                    readFieldsData(f,resumeState.schema.createFields(),sql=resumeState.sql, printDetail=printDetail,sink=sink,progress=progress,columns=columns,report=report,
+                                   checkpointer=checkpointer,tableSeq=tableSeq)
 
             # 接下来是一段找不到长度定义的字节了,直接强行读到insert算了
-            ret=getInsertSql(f,currentCharsetName)
+            ret=report.timed("getInsertSql",getInsertSql,f,currentCharsetName)
             
             while ret.isSuccess():
                 sdata=ret.data
+                tableSeq+=1
                 print("--------------------------------")
                 print("insert sql start index:",hex(sdata.startidx))
                 print(sdata.sql)
@@ -554,7 +684,7 @@ def main():
                 insertLogger.info("(offset="+hex(sdata.startidx)+") "+sdata.sql)
  
                 
-                ft_ret=readFieldTypes(f)
+                ft_ret=report.timed("readFieldTypes",readFieldTypes,f)
                 fileStartIdx = f.tell();
                 
                 if(ft_ret.isError()):
@@ -562,22 +692,42 @@ def main():
                     return
                 tableFields=ft_ret.data
                 if rowIndex>0:
+                    #只有第一张表从指定的记录位置开始
                     f.seek(rowIndex)
                     print("insertSqlIndex=",hex(rowIndex))
-                readFieldsData(f,tableFields,sql=sdata.sql, printDetail=printDetail,outfile=outfile)
-                print("");
+                    rowIndex=0
+                schema=TableSchema.fromFields(sdata.sql,tableFields)
+                if not tableFilter.accept(schema.tableName) or not tableFilter.acceptColumns(schema.tableName,schema.names()):
+                    #顺序解析时没选中的表只按长度跳过
+                    print("跳过表",schema.tableName)
+                    rows_ret=skipTableRows(f,len(tableFields))
+                    if rows_ret.isError():
+                        print(rows_ret.msg)
+                        return
+                    ret=report.timed("getInsertSql",getInsertSql,f,currentCharsetName)
+                    continue
+                if checkpointer is not None:
+                    checkpointer.beginTable(tableSeq,sdata.sql,sdata.startidx,schema)
+                columns=tableFilter.columnIndexes(schema.tableName,schema.names())
+                readFieldsData(f,tableFields,sql=sdata.sql, printDetail=printDetail,sink=sink,progress=progress,columns=columns,report=report,
+                               checkpointer=checkpointer,tableSeq=tableSeq)
                 insertSqlIndex=0
-                ret=getInsertSql(f,currentCharsetName)
+                ret=report.timed("getInsertSql",getInsertSql,f,currentCharsetName)
             
-
-            if outfile!=None:
-                outfile.close()
+            progress.finish()
+            report.bytesScanned=f.tell()
+            saveReport(report,profileReport)
+
+            if sink!=None:
+                sink.close()
+            if checkpointer is not None:
+                checkpointer.finish()
                 
         except Exception as e:
             print("catch Exception: fileStart offset=",hex(fileStartIdx),",file offset=",hex(f.tell()))   
             rootLogger.error("catch Exception: fileStart offset="+hex(fileStartIdx),",file end offset=",hex(f.tell()))
-            if outfile!=None:
-                outfile.close()
+            if sink!=None:
+                sink.close()
             raise e
         
             
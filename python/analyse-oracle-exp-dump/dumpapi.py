@@ -0,0 +1,105 @@
+from typing import Any, Iterator, List, Tuple
+
+from dumpformat import INVALID, OracleField, getInsertSql, readDumpHeader, readFieldTypes
+from dumpindex import skipTableRows
+from dumpreader import DumpReader
+from rowdecoder import compileRowDecoder
+from sqltemplate import parseTableName
+from tablefilter import TableFilter
+from tableschema import TableSchema
+
+
+class DumpTable:
+    """iterTables 返回的表描述"""
+    #表在 dump 文件中的顺序号，从1开始
+    seq:int
+    name:str
+    sql:str
+    columnNames:List[str]
+    schema:TableSchema
+    fields:List[OracleField]
+    dataOffset:int
+    #表数据读完(iterRows 遍历结束或被跳过)之后才有值
+    endOffset:int=None
+    rowCount:int=None
+
+    def __init__(self,reader:DumpReader,seq:int,sql:str,fields:List[OracleField],dataOffset:int):
+        self.reader=reader
+        self.seq=seq
+        self.sql=sql
+        self.name=parseTableName(sql) or ("TABLE"+str(seq))
+        self.schema=TableSchema.fromFields(sql,fields,self.name)
+        self.columnNames=self.schema.names()
+        self.fields=fields
+        self.dataOffset=dataOffset
+
+
+def iterTables(fileName:str,tableFilter:TableFilter=None)->Iterator[DumpTable]:
+    """按顺序遍历 dump 文件中的表
+
+    dump 文件在遍历期间保持打开，每张表的记录要在取下一张表之前用 iterRows 读取，
+    没读或没读完的记录在取下一张表时只按长度前缀跳过。
+
+    :param fileName: dump 文件名
+    :param tableFilter: 只返回匹配的表，None 表示全部表
+    :return: DumpTable 生成器
+    """
+    with DumpReader(fileName) as f:
+        header_ret=readDumpHeader(f,printDetail=False)
+        if header_ret.isError():
+            raise ValueError(header_ret.msg)
+        charsetName=header_ret.data
+
+        seq=0
+        ret=getInsertSql(f,charsetName,printError=False)
+        while ret.isSuccess():
+            seq+=1
+            ft_ret=readFieldTypes(f)
+            if ft_ret.isError():
+                raise ValueError(ft_ret.msg)
+            table=DumpTable(f,seq,ret.data.sql,ft_ret.data,f.tell())
+            if tableFilter is None or tableFilter.accept(table.name):
+                yield table
+
+            if table.endOffset is None:
+                f.seek(table.dataOffset)
+                rows_ret=skipTableRows(f,len(table.fields))
+                if rows_ret.isError():
+                    raise ValueError("表 "+table.name+" "+rows_ret.msg)
+                table.rowCount=rows_ret.data
+                table.endOffset=f.tell()
+            f.seek(table.endOffset)
+            ret=getInsertSql(f,charsetName,printError=False)
+
+
+def iterRows(table:DumpTable,columns:List[int]=None,numberType:str="auto")->Iterator[Tuple[Any,...]]:
+    """逐行读取表的记录，每行是 Python 原生类型值的 tuple
+
+    NUMBER 整数为 int、有小数时为 Decimal(可由 numberType 指定)，VARCHAR2/CHAR 为 str，
+    DATE/TIMESTAMP 为 datetime，null 为 None。
+    数据直接从映射区解码，不生成 sql 文本，内存占用与表大小无关。
+
+    :param table: iterTables 返回的表
+    :param columns: 只返回这些字段(下标从0开始)，其余字段不解码，None 表示全部字段
+    :param numberType: NUMBER 值的类型: auto / decimal / int / str，见 numbercodec.NUMBER_CONVERTERS
+    :return: 行生成器
+    """
+    decodeRow=compileRowDecoder(table.fields,columns,native=True,numberType=numberType)
+    buf=table.reader.buf
+    pos=table.dataOffset
+    rowCount=0
+    if buf[pos:pos+2]!=b'\xff\xff':
+        while True:
+            rowStart=pos
+            values,pos=decodeRow(buf,pos)
+            if INVALID in values:
+                raise ValueError("表 "+table.name+" 第"+str(rowCount+1)+"条记录解析失败, record offset="+hex(rowStart))
+            if buf[pos:pos+2]!=b'\x00\x00':
+                raise ValueError("表 "+table.name+" 没有记录中止标记, file offset="+hex(pos))
+            pos+=2
+            rowCount+=1
+            yield values
+            if buf[pos:pos+2]==b'\xff\xff':
+                break
+    table.rowCount=rowCount
+    table.endOffset=pos+2
@@ -0,0 +1,491 @@
+import datetime
+import struct
+from decimal import Decimal
+from typing import Any, Callable, Tuple
+
+from common.byteutil import ByteUtil
+from common.result import  Result
+from dumpreader import DumpReader
+from numbercodec import NUMBER_CONVERTERS, decodeNumber
+from textcodec import TextDecodeCache
+
+
+########## 常量 #########################
+
+DEFAULT_CHARSET="ascii"
+oracleCharsetCodeMapDict={
+    b'\x54\x03':"gbk",
+    b'\x69\x03':"utf-8",
+    b'\x01\x00':"ascii"
+
+}
+
+#字段值长度为 0xfffe 表示 null
+NULL_LEN=-2
+
+_I16=struct.Struct('<h')
+#date 固定 7 字节：世纪、年、月、日、时、分、秒
+_DATE=struct.Struct('7B')
+#timestamp 在 date 之后多 4 字节大端纳秒
+_TIMESTAMP=struct.Struct('>7BI')
+
+#decodeValueAt 解析失败时返回的值，null 用 None 表示，所以不能再用 None 表示失败
+INVALID=object()
+
+############# 类定义 ######################
+
+
+class InsertSqlSegment:
+    sql:str
+    startidx:int
+
+
+
+class OracleField:
+    type:str=None
+    #字段定义中的两字节类型码，见 FIELD_TYPES
+    typeCode:bytes=None
+    #这是定义长度，实际数据不一定会有这么长
+    defineLen:int=0
+    charset:str=None
+    #VARCHAR2/CHAR 字段的解码缓存
+    textCache:TextDecodeCache=None
+
+
+    def readMetaInfo(self,f:DumpReader)->bool:
+        return False
+
+    def setMetaInfo(self,defineLen:int,charset:str=None):
+        """设置字段定义，readMetaInfo 读出定义后调用，由 TableSchema 重建字段时直接调用"""
+        self.defineLen=defineLen
+        self.charset=charset
+
+    def readData(self,f:DumpReader)->str:
+        value,f.pos=self.decodeAt(f.buf,f.pos)
+        return value
+
+    def decodeAt(self,buf:memoryview,pos:int)->Tuple[str,int]:
+        """从 buf 的 pos 位置解码一个字段值
+
+        压缩文件的 buf 只是解压窗口，pos 不是文件位置，所以字段解码出错时不输出位置，由调用者输出记录的文件位置。
+        :param buf: dump 文件映射出的缓冲区，或压缩文件的解压窗口
+        :param pos: 字段值(含两字节长度)在 buf 中的起始位置
+        :return: (字段值, 下一个字段的起始位置)
+        """
+        return None,pos
+
+    def decodeValueAt(self,buf:memoryview,pos:int)->Tuple[Any,int]:
+        """从 buf 的 pos 位置解码一个字段值，返回 Python 原生类型的值，null 为 None
+
+        :param buf: dump 文件映射出的缓冲区
+        :param pos: 字段值(含两字节长度)的起始位置
+        :return: (字段值, 下一个字段的起始位置)，解析失败时字段值为 INVALID
+        """
+        return INVALID,pos
+
+    def valueDecoder(self,numberType:str,dateType:str="datetime")->Callable[[memoryview,int],Tuple[Any,int]]:
+        """取得解码原生值的函数，NUMBER 字段按 numberType 返回 int/Decimal/str，
+        DATE/TIMESTAMP 字段 dateType 为 raw 时返回原始字节(由 datebatch 按列批量转换)，其他类型即为 decodeValueAt
+
+        :param numberType: numbercodec.NUMBER_TYPES 之一
+        :param dateType: datetime / raw
+        """
+        return self.decodeValueAt
+
+class OracleVarchar2Field(OracleField):
+    type="varchar2"
+
+    def readMetaInfo(self, f: DumpReader)->bool:
+        defineLen= f.readU16()
+        #编码
+        charset= oracleCharsetCodeMapDict.get(bytes(f.read(2)),DEFAULT_CHARSET)
+        #这2个字节不知道是啥
+        f.skip(2)
+        self.setMetaInfo(defineLen,charset)
+        return True
+
+    def setMetaInfo(self,defineLen:int,charset:str=None):
+        self.defineLen=defineLen
+        self.charset=charset or DEFAULT_CHARSET
+        self.textCache=TextDecodeCache(self.charset)
+        self.decodeText=self.textCache.decode
+
+    def decodeAt(self, buf: memoryview, pos: int)->Tuple[str,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        #null
+        if size==NULL_LEN:
+            return 'null',pos
+
+        if size>self.defineLen:
+            print("读取数据错误,实际长度",size,"大于定义长度",self.defineLen)
+            return None,pos
+
+        return  "'"+self.decodeText(buf[pos:pos+size])+"'",pos+size
+
+    def decodeValueAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        if size==NULL_LEN:
+            return None,pos
+        if size>self.defineLen:
+            print("读取数据错误,实际长度",size,"大于定义长度",self.defineLen)
+            return INVALID,pos
+        return self.decodeText(buf[pos:pos+size]),pos+size
+
+
+class OracleCharField(OracleField):
+    type="varchar2"
+
+    def readMetaInfo(self, f: DumpReader)->bool:
+        defineLen= f.readU16()
+        #编码
+        charset= oracleCharsetCodeMapDict.get(bytes(f.read(2)),DEFAULT_CHARSET)
+        #这2个字节不知道是啥
+        f.skip(2)
+        self.setMetaInfo(defineLen,charset)
+        return True
+
+    def setMetaInfo(self,defineLen:int,charset:str=None):
+        self.defineLen=defineLen
+        self.charset=charset or DEFAULT_CHARSET
+        self.textCache=TextDecodeCache(self.charset)
+        self.decodeText=self.textCache.decode
+
+    def decodeAt(self, buf: memoryview, pos: int)->Tuple[str,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        #null
+        if size==NULL_LEN:
+            return 'null',pos
+
+        if size>self.defineLen:
+            print("读取数据错误,实际长度",size,"大于定义长度",self.defineLen)
+            return None,pos
+
+        return  "'"+self.decodeText(buf[pos:pos+size])+"'",pos+size
+
+    def decodeValueAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        if size==NULL_LEN:
+            return None,pos
+        if size>self.defineLen:
+            print("读取数据错误,实际长度",size,"大于定义长度",self.defineLen)
+            return INVALID,pos
+        return self.decodeText(buf[pos:pos+size]),pos+size
+
+class OracleNumberField(OracleField):
+    type="number"
+
+    def readMetaInfo(self, f: DumpReader)->bool:
+        self.setMetaInfo(f.readU16())
+        return True
+
+    def decodeAt(self, buf: memoryview, pos: int)->Tuple[str,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        #data is null
+        if size==NULL_LEN:
+            return 'null',pos
+
+        if size>self.defineLen:
+            print("读取数据错误,实际长度",size,"大于定义长度",self.defineLen)
+            return None,pos
+
+        value=decodeNumber(buf,pos,size)
+        if value is None:
+            print("data read error,number 值不正确:",bytes(buf[pos:pos+size]).hex())
+        return value,pos+size
+
+    def decodeValueAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        value,pos=self.decodeAt(buf,pos)
+        if value is None:
+            return INVALID,pos
+        if value=='null':
+            return None,pos
+        if "." in value:
+            return Decimal(value),pos
+        return int(value),pos
+
+    def valueDecoder(self,numberType:str,dateType:str="datetime")->Callable[[memoryview,int],Tuple[Any,int]]:
+        if numberType=="auto":
+            return self.decodeValueAt
+        convert=NUMBER_CONVERTERS[numberType]
+        decodeAt=self.decodeAt
+
+        def decodeValueAt(buf:memoryview,pos:int)->Tuple[Any,int]:
+            value,pos=decodeAt(buf,pos)
+            if value is None:
+                return INVALID,pos
+            if value=='null':
+                return None,pos
+            return convert(value),pos
+        return decodeValueAt
+
+
+class OracleDateField(OracleField):
+    type="date"
+
+    def readMetaInfo(self, f: DumpReader)->bool:
+        self.setMetaInfo(f.readU16())
+        return True
+
+    def decodeAt(self, buf: memoryview, pos: int)->Tuple[str,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        #data is null
+        if size==NULL_LEN:
+            return 'null',pos
+
+        # format error
+        if size!=7:
+            print("date 长度不正确,预期7,实际:",size)
+            return None,pos
+
+        century,year,month,day,hour,minute,second=_DATE.unpack_from(buf,pos)
+        data="to_date('{}{:0>2d}-{:0>2d}-{:0>2d} {:0>2d}:{:0>2d}:{:0>2d}', 'yyyy-MM-dd HH24:MI:ss')".format(
+            century-100,year-100,month,day,hour-1,minute-1,second-1)
+        return data,pos+7
+
+    def decodeValueAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        if size==NULL_LEN:
+            return None,pos
+        if size!=7:
+            print("date 长度不正确,预期7,实际:",size)
+            return INVALID,pos
+        century,year,month,day,hour,minute,second=_DATE.unpack_from(buf,pos)
+        try:
+            value=datetime.datetime((century-100)*100+year-100,month,day,hour-1,minute-1,second-1)
+        except ValueError:
+            print("date 值不正确:",bytes(buf[pos:pos+7]).hex())
+            return INVALID,pos+7
+        return value,pos+7
+
+    def decodeRawAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        """只检查长度，返回 7 字节原始值，null 为 None"""
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        if size==NULL_LEN:
+            return None,pos
+        if size!=7:
+            print("date 长度不正确,预期7,实际:",size)
+            return INVALID,pos
+        return bytes(buf[pos:pos+7]),pos+7
+
+    def valueDecoder(self,numberType:str,dateType:str="datetime")->Callable[[memoryview,int],Tuple[Any,int]]:
+        return self.decodeRawAt if dateType=="raw" else self.decodeValueAt
+
+
+
+class OracleTimestampField(OracleField):
+    type="timestamp"
+
+    def readMetaInfo(self, f: DumpReader)->bool:
+        self.setMetaInfo(f.readU16())
+        return True
+
+    def decodeAt(self, buf: memoryview, pos: int)->Tuple[str,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        #data is null
+        if size==NULL_LEN:
+            return 'null',pos
+
+        # format error
+        if size!=7 and size!=11:
+            print("date 长度不正确,预期7,实际:",size)
+            return None,pos
+
+        if size==7:
+            century,year,month,day,hour,minute,second=_DATE.unpack_from(buf,pos)
+        else:
+            century,year,month,day,hour,minute,second,nanos=_TIMESTAMP.unpack_from(buf,pos)
+        data="to_timestamp('{}{:0>2d}-{:0>2d}-{:0>2d} {:0>2d}:{:0>2d}:{:0>2d}".format(
+            century-100,year-100,month,day,hour-1,minute-1,second-1)
+
+        if size==7:
+            data+="', 'yyyy-MM-dd HH24:MI:ss')"
+            return data,pos+7
+        #纳秒取前3位即毫秒，不足9位时前面补零(5000000 纳秒为 .005)
+        data+=".{:03d}".format(nanos//1000000)
+        data+="', 'yyyy-MM-dd HH24:MI:ss.ff')"
+
+        return data,pos+11
+
+    def decodeValueAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        if size==NULL_LEN:
+            return None,pos
+        if size==7:
+            century,year,month,day,hour,minute,second=_DATE.unpack_from(buf,pos)
+            nanos=0
+        elif size==11:
+            century,year,month,day,hour,minute,second,nanos=_TIMESTAMP.unpack_from(buf,pos)
+        else:
+            print("date 长度不正确,预期7,实际:",size)
+            return INVALID,pos
+        try:
+            value=datetime.datetime((century-100)*100+year-100,month,day,hour-1,minute-1,second-1,nanos//1000)
+        except ValueError:
+            print("timestamp 值不正确:",bytes(buf[pos:pos+size]).hex())
+            return INVALID,pos+size
+        return value,pos+size
+
+    def decodeRawAt(self, buf: memoryview, pos: int)->Tuple[Any,int]:
+        """只检查长度，返回 7 或 11 字节原始值，null 为 None"""
+        size=_I16.unpack_from(buf,pos)[0]
+        pos+=2
+        if size==NULL_LEN:
+            return None,pos
+        if size!=7 and size!=11:
+            print("date 长度不正确,预期7,实际:",size)
+            return INVALID,pos
+        return bytes(buf[pos:pos+size]),pos+size
+
+    def valueDecoder(self,numberType:str,dateType:str="datetime")->Callable[[memoryview,int],Tuple[Any,int]]:
+        return self.decodeRawAt if dateType=="raw" else self.decodeValueAt
+
+
+FIELD_TYPES={
+    b'\x01\x00':OracleVarchar2Field,
+    b'\x02\x00':OracleNumberField,
+    b'\x0c\x00':OracleDateField,
+    b'\xb4\x00':OracleTimestampField,
+    b'\x60\x00':OracleCharField
+
+}
+
+
+def readDumpHeader(f:DumpReader,printDetail:bool=True)->Result:
+    """读取 dump 文件头，完成后文件位置停在 insert 语句之前那段没有长度定义的字节处
+
+    :param f: dump 文件
+    :param printDetail: 是否打印文件头信息
+    :return: 结果，由Result包装，data 为 dump 文件字符集
+    """
+    a = f.read(1);
+
+    if (a[0] != 0x03):
+        print("第一个字节不是预期值，文件可能不是dump文件。：", bytes(a))
+
+    thecharsetCode=f.read(2)
+
+    currentCharsetName=oracleCharsetCodeMapDict.get(bytes(thecharsetCode)[::-1]);
+    if printDetail:
+        print("dump 文件字符集:",currentCharsetName)
+
+    ret: Result = None
+    for num in range(4):
+        ret = ByteUtil.readBytes(f, b'\x0a')
+        if (ret.isError()):
+            print(ret.msg)
+            return ret
+        if printDetail:
+            print((bytes(ret.data[0:-1]).decode(currentCharsetName, 'ignore')))
+    entityOffset=bytes(ret.data).decode(currentCharsetName, 'ignore');
+
+    if printDetail:
+        print("获取到dump数据进入点位置:",entityOffset)
+    f.seek(int(entityOffset));
+    #读第一段带长度字节 到 +00：00
+    nextLen=  f.readU16();
+    while(nextLen>0):
+        f.skip(nextLen);
+        nextLen=  f.readU16();
+
+    #读第二段带长度字节到 DISABLE:ALL
+    nextLen= f.readU16();
+    while(nextLen>0):
+        f.skip(nextLen);
+        nextLen=  f.readU16();
+
+    return Result.successResult(data=currentCharsetName)
+
+
+#getInsertSql 读到 dump 文件末尾的两行 EXIT 时返回的错误信息，表示文件完整地结束了
+DUMP_END_MSG="读取到EXIT指定，文件已结束。"
+
+
+def getInsertSql(f:DumpReader,charsetName:str,printError:bool=True)->Result:
+    """从当前位置查找下一条 insert 语句
+
+    :return: 结果，由Result包装，data 为 InsertSqlSegment；读到文件末尾的两行 EXIT 时返回错误，msg 为 DUMP_END_MSG，
+             没有 EXIT 就到了文件尾(文件可能被截断)时返回读取的错误
+    """
+    startidx=f.tell()
+    exitNum=0
+    ret=ByteUtil.readBytes(f, b'\x0a',2048)
+    while ret.isSuccess():
+        line=bytes(ret.data).strip()
+        #只有匹配到的那一行才需要解码
+        if line.startswith(b"INSERT INTO"):
+            insertSql=bytes(ret.data).decode(charsetName, 'ignore');
+            break
+        if line==b"EXIT":
+            exitNum+=1
+            if exitNum==2:
+                break
+        startidx=f.tell()
+        ret=ByteUtil.readBytes(f, b'\x0a')
+
+    if exitNum==2:
+        return Result.errorResult(msg=DUMP_END_MSG)
+    if ret.isError():
+        if printError:
+            print("获取 insert sql 语句时发生错误(可能已经没有更多的insert sql了)：",ret.msg,",file start index=",hex(startidx))
+        return Result.errorResult(data=ret.data ,msg=ret.msg)
+
+    sqlseg= InsertSqlSegment()
+    sqlseg.sql=insertSql
+    sqlseg.startidx=startidx
+    return Result.successResult(data=sqlseg);
+
+
+
+def createField(typeCode:bytes,defineLen:int,charset:str=None)->OracleField:
+    """不读文件，按已知的字段定义创建字段，类型码不认识时返回 None"""
+    fieldClass=FIELD_TYPES.get(typeCode)
+    if fieldClass is None:
+        return None
+    field=fieldClass()
+    field.typeCode=typeCode
+    field.setMetaInfo(defineLen,charset)
+    return field
+
+
+def readFieldInfo(f: DumpReader)->OracleField:
+    fieldTypeBytes=bytes(f.read(2));
+    field=FIELD_TYPES.get(fieldTypeBytes,OracleField)()
+    field.typeCode=fieldTypeBytes
+    success=field.readMetaInfo(f);
+    if success:
+        return field
+    else:
+        return None
+
+
+def readFieldTypes(f:DumpReader,printDetail:bool=False)->Result:
+    colCount= f.readU16()
+    if printDetail==True:
+        print("字段总数：",colCount)
+    tableFields=[]
+    for i in range(colCount):
+        theFieldInfo=readFieldInfo(f)
+        if(theFieldInfo==None):
+            return Result.errorResult(msg="field "+str(i)+" type unknown,exit. file offset="+hex(f.tell()))
+
+        if printDetail==True:
+            print("field ",i,"type:", theFieldInfo.type,",len:",theFieldInfo.defineLen,",charset:",theFieldInfo.charset)
+        tableFields.append(theFieldInfo);
+
+    #字段定义与记录之间的四字节0的分隔符
+    spearate=  f.read(4)
+    if spearate!=b'\x00\x00\x00\x00':
+        print("预期的字段定义与数据值中间的分隔符未出现，程序退出。file offset=",hex(f.tell()))
+        return Result.errorResult(msg="预期的字段定义与数据值中间的分隔符未出现，程序退出。file offset="+hex(f.tell()))
+
+    return Result.successResult(data=tableFields)
@@ -0,0 +1,295 @@
+import datetime
+import getopt
+import io
+import os
+import random
+import struct
+import sys
+from decimal import Decimal
+from typing import List, Tuple
+
+from dumpformat import oracleCharsetCodeMapDict
+
+
+#各字段类型在字段定义中的类型码
+TYPE_CODES={
+    "varchar2":b'\x01\x00',
+    "number":b'\x02\x00',
+    "date":b'\x0c\x00',
+    "timestamp":b'\xb4\x00',
+    "char":b'\x60\x00',
+}
+#字段定义长度
+_DEFINE_LENS={"varchar2":200,"char":10,"number":22,"date":7,"timestamp":11}
+
+_U16=struct.Struct('<H')
+_I16=struct.Struct('<h')
+#null 值的长度标记
+_NULL=_I16.pack(-2)
+
+#每种类型预先生成的候选值个数，生成记录时从中随机挑选，避免逐行编码拖慢生成速度
+POOL_SIZE=4096
+
+
+def encodeNumber(value)->bytes:
+    """把整数或 Decimal 编码成 Oracle NUMBER 的内部格式(百进制，带指数字节)"""
+    value=Decimal(value)
+    if value==0:
+        return b'\x80'
+    sign,digits,exponent=value.as_tuple()
+    s="".join(str(d) for d in digits)
+    #小数点前的位数，补齐成偶数位，按两位一组成为百进制的一位
+    point=len(s)+exponent
+    if point<0:
+        s="0"*(-point)+s
+        point=0
+    elif point>len(s):
+        s=s+"0"*(point-len(s))
+    if point%2==1:
+        s="0"+s
+        point+=1
+    if len(s)%2==1:
+        s=s+"0"
+    pairs=[int(s[i:i+2]) for i in range(0,len(s),2)]
+    exp=point//2-1
+    while pairs[0]==0:
+        pairs.pop(0)
+        exp-=1
+    while pairs[-1]==0:
+        pairs.pop()
+    pairs=pairs[:20]
+    if sign==0:
+        return bytes([0xc1+exp]+[d+1 for d in pairs])
+    data=bytes([0x3e-exp]+[101-d for d in pairs])
+    if len(pairs)<20:
+        data+=b'\x66'
+    return data
+
+
+def encodeDate(value:datetime.datetime)->bytes:
+    return bytes([value.year//100+100,value.year%100+100,value.month,value.day,value.hour+1,value.minute+1,value.second+1])
+
+
+def encodeTimestamp(value:datetime.datetime)->bytes:
+    if value.microsecond==0:
+        return encodeDate(value)
+    return encodeDate(value)+struct.pack('>I',value.microsecond*1000)
+
+
+def randomDatetime(rnd:random.Random)->datetime.datetime:
+    return datetime.datetime(rnd.randint(1900,2099),rnd.randint(1,12),rnd.randint(1,28),
+                             rnd.randint(0,23),rnd.randint(0,59),rnd.randint(0,59))
+
+
+_TEXTS=["abc","中文测试","O'Brien","a:1b","tab\tnew\nline","逗号,引号\""]
+
+
+def valuePool(fieldType:str,charset:str,rnd:random.Random,decimals:bool=False)->List[bytes]:
+    """生成一种类型的候选字段值(含两字节长度前缀)
+
+    :param decimals: NUMBER 是否包含小数
+    """
+    pool=[]
+    for i in range(POOL_SIZE):
+        if fieldType=="varchar2":
+            text=rnd.choice(_TEXTS+["x"*rnd.randint(1,60),str(rnd.randint(0,10**9))])
+            data=text.encode(charset,"replace")[:_DEFINE_LENS["varchar2"]]
+        elif fieldType=="char":
+            data=rnd.choice(["Y","N","0","1"]).encode(charset)
+        elif fieldType=="number":
+            kind=rnd.randint(0,4)
+            if kind==0:
+                value=rnd.choice([0,1,-1,100,-100,10**18,-(10**18)])
+            elif kind==1:
+                value=rnd.randint(-10**12,10**12)
+            elif kind==2 and decimals:
+                value=Decimal(rnd.randint(-10**8,10**8)).scaleb(-rnd.randint(1,6))
+            else:
+                value=rnd.randint(0,10**6)
+            data=encodeNumber(value)
+        elif fieldType=="date":
+            data=encodeDate(randomDatetime(rnd))
+        else:
+            value=randomDatetime(rnd)
+            if rnd.random()<0.7:
+                value=value.replace(microsecond=rnd.randint(0,999999))
+            data=encodeTimestamp(value)
+        pool.append(_I16.pack(len(data))+data)
+    return pool
+
+
+def parseColumnMix(spec:str)->List[str]:
+    """解析字段组合，如 varchar2*3,number*2,date,timestamp,char"""
+    types=[]
+    for item in spec.split(","):
+        item=item.strip().lower()
+        if item=="":
+            continue
+        name,_,count=item.partition("*")
+        if name not in TYPE_CODES:
+            raise ValueError("不支持的字段类型: "+name)
+        types.extend([name]*int(count or "1"))
+    return types
+
+
+def parseSize(value:str)->int:
+    """解析 100M / 20G 这样的大小"""
+    value=value.strip().upper()
+    units={"K":1024,"M":1024**2,"G":1024**3,"T":1024**4}
+    if value[-1:] in units:
+        return int(float(value[:-1])*units[value[-1]])
+    return int(value)
+
+
+class DumpGenerator:
+    """生成 dump_analyse 能解析的合成 exp dump 文件
+
+    文件头、字符集、数据入口位置、每张表的 insert 语句、字段定义和记录都按 dump 格式写出，
+    记录中包含 null、负数、小数、date 和带/不带小数秒的 timestamp。
+    """
+
+    def __init__(self,out:io.BufferedWriter,charset:str="utf-8",nullRatio:float=0.1,seed:int=1,decimals:bool=False):
+        self.out=out
+        self.charset=charset
+        self.nullRatio=nullRatio
+        self.rnd=random.Random(seed)
+        self.charsetCode=[code for code,name in oracleCharsetCodeMapDict.items() if name==charset][0]
+        self.pools={t:valuePool(t,charset,self.rnd,decimals) for t in TYPE_CODES}
+        self.size=0
+        self.tableCount=0
+        self.rowCount=0
+
+    def write(self,data:bytes):
+        self.out.write(data)
+        self.size+=len(data)
+
+    def writeHeader(self):
+        head=b'\x03'+self.charsetCode[::-1]
+        lines=b'TEXPORT:V11.02.00\nDSCOTT\nRTABLES\n'
+        #第4行是数据入口位置，本身占10字节
+        entityOffset=len(head)+len(lines)+10
+        self.write(head+lines+str(entityOffset).encode().ljust(9)+b'\n')
+        #入口处两段带长度的字节，各以长度0结束
+        for chunk in (b'+00:00',b'DISABLE:ALL'):
+            self.write(_U16.pack(len(chunk))+chunk+_U16.pack(0))
+
+    def writeTable(self,tableName:str,types:List[str],rows:int):
+        self.tableCount+=1
+        names=["C{}_{}".format(i+1,t.upper()) for i,t in enumerate(types)]
+        self.write(('CREATE TABLE "'+tableName+'" ('+", ".join('"'+n+'" '+t.upper() for n,t in zip(names,types))+")\n").encode(self.charset))
+        sql='INSERT INTO "{}" ({}) VALUES ({})\n'.format(
+            tableName,", ".join('"'+n+'"' for n in names),", ".join(":"+str(i+1) for i in range(len(types))))
+        self.write(sql.encode(self.charset))
+
+        meta=[_U16.pack(len(types))]
+        for t in types:
+            meta.append(TYPE_CODES[t]+_U16.pack(_DEFINE_LENS[t]))
+            if t in ("varchar2","char"):
+                meta.append(self.charsetCode+b'\x00\x00')
+        meta.append(b'\x00\x00\x00\x00')
+        self.write(b''.join(meta))
+
+        pools=[self.pools[t] for t in types]
+        choice=self.rnd.choice
+        rand=self.rnd.random
+        nullRatio=self.nullRatio
+        batch=[]
+        for r in range(rows):
+            for pool in pools:
+                batch.append(_NULL if rand()<nullRatio else choice(pool))
+            batch.append(b'\x00\x00')
+            if len(batch)>=65536:
+                self.write(b''.join(batch))
+                batch=[]
+        batch.append(b'\xff\xff')
+        self.write(b''.join(batch))
+        self.rowCount+=rows
+
+    def writeTrailer(self):
+        self.write(b'EXIT\nEXIT\n')
+
+
+def generate(fileName:str,tables:int,types:List[str],rows:List[int],charset:str="utf-8",
+             nullRatio:float=0.1,seed:int=1,targetSize:int=0,decimals:bool=False,trailer:bool=True)->Tuple[int,int,int]:
+    """生成合成 dump 文件
+
+    :param fileName: 输出文件名
+    :param tables: 表数量，targetSize 大于0时至少生成这么多张表
+    :param types: 每张表的字段类型
+    :param rows: 各表的记录数，按表循环使用
+    :param charset: dump 字符集: utf-8 / gbk / ascii
+    :param nullRatio: 字段值为 null 的比例
+    :param seed: 随机数种子，相同参数生成相同的文件
+    :param targetSize: 大于0时一直生成表直到文件达到这个字节数
+    :param decimals: NUMBER 是否包含小数
+    :param trailer: 是否写文件末尾的 EXIT，False 时模拟在两张表之间被截断的 dump 文件
+    :return: (文件字节数, 表数量, 记录数)
+    """
+    with open(fileName,"wb",buffering=16*1024*1024) as out:
+        gen=DumpGenerator(out,charset,nullRatio,seed,decimals)
+        gen.writeHeader()
+        i=0
+        while i<tables or (targetSize>0 and gen.size<targetSize):
+            gen.writeTable("T{:04d}".format(i+1),types,rows[i%len(rows)])
+            i+=1
+        if trailer:
+            gen.writeTrailer()
+    return gen.size,gen.tableCount,gen.rowCount
+
+
+DEFAULT_COLUMNS="varchar2*3,number*3,date,timestamp,char"
+
+
+def main():
+    usage="""用法: python dumpgen.py [选项] 输出文件
+  -t, --tables=N        表数量，默认 5
+  -r, --rows=N[,N...]   每张表的记录数，多个值按表循环使用，默认 100000
+  -c, --columns=MIX     字段组合，默认 """+DEFAULT_COLUMNS+"""
+  -s, --size=SIZE       一直生成表直到文件达到这个大小，如 500M、20G
+      --charset=NAME    dump 字符集 utf-8 / gbk / ascii，默认 utf-8
+      --null-ratio=R    null 值比例，默认 0.1
+      --seed=N          随机数种子，默认 1
+      --decimals        NUMBER 中包含小数
+      --no-trailer      不写文件末尾的 EXIT，模拟在表之间被截断的文件"""
+    options,args=getopt.getopt(sys.argv[1:],"ht:r:c:s:",longopts=['help','tables=','rows=','columns=','size=','charset=','null-ratio=','seed=','decimals','no-trailer'])
+    tables=5
+    rows=[100000]
+    columns=DEFAULT_COLUMNS
+    targetSize=0
+    charset="utf-8"
+    nullRatio=0.1
+    seed=1
+    decimals=False
+    trailer=True
+    for opt_name,opt_value in options:
+        if opt_name in ('-h','--help'):
+            print(usage)
+            return
+        if opt_name in ('-t','--tables'):
+            tables=int(opt_value)
+        elif opt_name in ('-r','--rows'):
+            rows=[int(n) for n in opt_value.split(",")]
+        elif opt_name in ('-c','--columns'):
+            columns=opt_value
+        elif opt_name in ('-s','--size'):
+            targetSize=parseSize(opt_value)
+        elif opt_name=='--charset':
+            charset=opt_value.lower()
+        elif opt_name=='--null-ratio':
+            nullRatio=float(opt_value)
+        elif opt_name=='--seed':
+            seed=int(opt_value)
+        elif opt_name=='--decimals':
+            decimals=True
+        elif opt_name=='--no-trailer':
+            trailer=False
+    if len(args)!=1:
+        print(usage)
+        exit(1)
+
+    size,tableCount,rowCount=generate(args[0],tables,parseColumnMix(columns),rows,charset,nullRatio,seed,targetSize,decimals,trailer)
+    print("已生成",os.path.abspath(args[0]),":",tableCount,"张表,",rowCount,"条记录,",size,"字节")
+
+
+if __name__ == '__main__':
+    main()
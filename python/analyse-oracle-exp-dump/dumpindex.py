@@ -0,0 +1,229 @@
+import json
+import os
+import struct
+from typing import List, Tuple
+
+from common.result import  Result
+from dumpformat import getInsertSql, readFieldTypes
+from dumpreader import DumpReader
+from rowdecoder import compileRowSkipper, maxRowSize
+from sqltemplate import parseTableName
+from tableschema import TableSchema
+
+
+class TableIndexEntry:
+    """预扫描得到的一张表在 dump 文件中的位置"""
+    #表在 dump 文件中的顺序号，从1开始
+    seq:int
+    tableName:str
+    sql:str
+    #insert 语句所在行的起始位置
+    insertOffset:int
+    #字段定义(字段数)的起始位置
+    metaOffset:int
+    #第一条记录的起始位置
+    dataOffset:int
+    #表数据结束标记 \xff\xff 之后的位置
+    endOffset:int
+    colCount:int
+    rowCount:int
+    #字段名和字段定义，并行解析时工作进程直接用它生成字段，不再读字段定义
+    schema:TableSchema
+    #稀疏的行边界检查点 (记录起始位置, 行号)，行号从0开始
+    checkpoints:List[Tuple[int,int]]
+
+    def dataSize(self)->int:
+        return self.endOffset-self.dataOffset
+
+
+class TableShard:
+    """一张表中从某个行边界开始的一段连续记录，可以交给单独的进程解析"""
+    entry:TableIndexEntry
+    #分片序号，从1开始
+    shardNo:int
+    startOffset:int
+    startRow:int
+    rowCount:int
+
+    def __init__(self,entry:TableIndexEntry,shardNo:int,startOffset:int,startRow:int,rowCount:int):
+        self.entry=entry
+        self.shardNo=shardNo
+        self.startOffset=startOffset
+        self.startRow=startRow
+        self.rowCount=rowCount
+
+
+def splitShards(entry:TableIndexEntry,shardRows:int)->List[TableShard]:
+    """按检查点把一张表切分成若干分片，每片大约 shardRows 行
+
+    分片只能从检查点开始，实际行数取决于检查点间隔。没有检查点或表不够大时只有一片。
+    """
+    starts=[(entry.dataOffset,0)]
+    nextRow=shardRows
+    for offset,rowNo in entry.checkpoints:
+        if rowNo>=nextRow:
+            starts.append((offset,rowNo))
+            nextRow=rowNo+shardRows
+
+    shards=[]
+    for i,(offset,rowNo) in enumerate(starts):
+        endRow=starts[i+1][1] if i+1<len(starts) else entry.rowCount
+        shards.append(TableShard(entry,i+1,offset,rowNo,endRow-rowNo))
+    return shards
+
+
+def skipTableRows(f:DumpReader,colCount:int,checkpointRows:int=0,checkpoints:List[Tuple[int,int]]=None)->Result:
+    """只按长度前缀跳过一张表的全部记录，结束后文件位置停在表结束标记之后
+
+    :param f: dump 文件，位置在第一条记录处
+    :param colCount: 表的字段数
+    :param checkpointRows: 每隔多少行记录一个行边界检查点，0 表示不记录
+    :param checkpoints: 检查点 (记录起始位置, 行号) 追加到这个列表中
+    :return: 结果，由Result包装，data 为记录数
+    """
+    skipRow=compileRowSkipper(colCount)
+    rowBytes=maxRowSize(colCount)
+    limit=f.fill(rowBytes)
+    buf=f.buf
+    pos=f.pos
+    end=len(buf)
+    rowCount=0
+    if checkpoints is None:
+        checkpointRows=0
+    countdown=checkpointRows
+    try:
+        if buf[pos:pos+2]==b'\xff\xff':
+            f.pos=pos+2
+            return Result.successResult(data=0)
+
+        while True:
+            if pos>limit:
+                #压缩文件的数据窗口快用完了，向前移动窗口
+                f.pos=pos
+                limit=f.fill(rowBytes)
+                buf=f.buf
+                pos=f.pos
+                end=len(buf)
+            pos=skipRow(buf,pos)
+            if pos+2>end or buf[pos:pos+2]!=b'\x00\x00':
+                f.pos=min(pos,end)
+                return Result.errorResult(data=rowCount,msg="没有记录中止标记，file offset="+hex(f.tell()))
+            pos+=2
+            rowCount+=1
+            if buf[pos:pos+2]==b'\xff\xff':
+                f.pos=pos+2
+                return Result.successResult(data=rowCount)
+            if checkpointRows>0:
+                countdown-=1
+                if countdown==0:
+                    checkpoints.append((f.base+pos,rowCount))
+                    countdown=checkpointRows
+    except struct.error:
+        f.pos=end
+        return Result.errorResult(data=rowCount,msg="记录长度超出文件范围，file offset="+hex(f.base+pos))
+
+
+def scanTables(f:DumpReader,charsetName:str,checkpointRows:int=0)->Result:
+    """从当前位置开始预扫描所有表，只记录各表位置，不解码字段值
+
+    :param f: dump 文件，位置在 readDumpHeader 之后或 insert-sql-index 处
+    :param charsetName: dump 文件字符集
+    :param checkpointRows: 每隔多少行记录一个行边界检查点，0 表示不记录
+    :return: 结果，由Result包装，data 为 TableIndexEntry 列表；
+             中途出错时返回错误，data 仍为出错前已扫描到的表
+    """
+    entries:List[TableIndexEntry]=[]
+    ret=getInsertSql(f,charsetName,printError=False)
+    while ret.isSuccess():
+        sdata=ret.data
+        entry=TableIndexEntry()
+        entry.seq=len(entries)+1
+        entry.sql=sdata.sql
+        entry.tableName=parseTableName(sdata.sql) or ("TABLE"+str(entry.seq))
+        entry.insertOffset=sdata.startidx
+        entry.metaOffset=f.tell()
+
+        ft_ret=readFieldTypes(f)
+        if ft_ret.isError():
+            return Result.errorResult(data=entries,msg=ft_ret.msg)
+        entry.colCount=len(ft_ret.data)
+        entry.schema=TableSchema.fromFields(sdata.sql,ft_ret.data,entry.tableName)
+        entry.dataOffset=f.tell()
+        entry.checkpoints=[]
+
+        rows_ret=skipTableRows(f,entry.colCount,checkpointRows,entry.checkpoints)
+        if rows_ret.isError():
+            return Result.errorResult(data=entries,msg="表 "+entry.tableName+" "+rows_ret.msg)
+        entry.rowCount=rows_ret.data
+        entry.endOffset=f.tell()
+        entries.append(entry)
+
+        ret=getInsertSql(f,charsetName,printError=False)
+
+    return Result.successResult(data=entries)
+
+
+#索引文件格式版本，格式变化时递增，旧索引自动失效
+INDEX_VERSION=2
+INDEX_SUFFIX=".dmpidx"
+
+
+def indexFileName(fileName:str)->str:
+    return fileName+INDEX_SUFFIX
+
+
+def saveIndex(fileName:str,charsetName:str,scanStart:int,checkpointRows:int,entries:List[TableIndexEntry]):
+    """把预扫描结果写入 dump 文件旁的 .dmpidx 索引文件
+
+    :param fileName: dump 文件名
+    :param charsetName: dump 文件字符集
+    :param scanStart: 预扫描的起始位置
+    :param checkpointRows: 预扫描时的检查点间隔
+    :param entries: 预扫描得到的表位置
+    """
+    st=os.stat(fileName)
+    data={
+        "version":INDEX_VERSION,
+        "size":st.st_size,
+        "mtime":st.st_mtime_ns,
+        "charset":charsetName,
+        "scanStart":scanStart,
+        "checkpointRows":checkpointRows,
+        "tables":[dict(e.__dict__,schema=e.schema.toDict()) for e in entries],
+    }
+    idxName=indexFileName(fileName)
+    tmpName=idxName+".tmp"
+    with open(tmpName,'w',encoding='utf-8') as idx:
+        json.dump(data,idx,ensure_ascii=False)
+    os.replace(tmpName,idxName)
+
+
+def loadIndex(fileName:str,scanStart:int,checkpointRows:int)->Result:
+    """读取 dump 文件旁的 .dmpidx 索引文件
+
+    dump 文件大小、修改时间、扫描起始位置或检查点间隔与索引记录的不一致时索引失效。
+
+    :return: 结果，由Result包装，data 为 TableIndexEntry 列表
+    """
+    idxName=indexFileName(fileName)
+    if not os.path.exists(idxName):
+        return Result.errorResult(msg="索引文件不存在:"+idxName)
+    try:
+        with open(idxName,'r',encoding='utf-8') as idx:
+            data=json.load(idx)
+    except (OSError,ValueError) as e:
+        return Result.errorResult(msg="索引文件读取失败:"+str(e))
+
+    st=os.stat(fileName)
+    if (data.get("version")!=INDEX_VERSION or data.get("size")!=st.st_size or data.get("mtime")!=st.st_mtime_ns
+            or data.get("scanStart")!=scanStart or data.get("checkpointRows")!=checkpointRows):
+        return Result.errorResult(msg="索引文件已失效:"+idxName)
+
+    entries=[]
+    for t in data["tables"]:
+        entry=TableIndexEntry()
+        entry.__dict__.update(t)
+        entry.checkpoints=[tuple(c) for c in entry.checkpoints]
+        entry.schema=TableSchema.fromDict(entry.schema)
+        entries.append(entry)
+    return Result.successResult(data=entries)
@@ -0,0 +1,312 @@
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+import struct
+
+from pipeline import BackgroundReader, ReadAhead
+
+try:
+    #Python 3.14 起标准库自带 zstd
+    from compression import zstd as _stdZstd
+except ImportError:
+    _stdZstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+_U16 = struct.Struct('<H')
+_I16 = struct.Struct('<h')
+
+
+class DumpReader:
+    """基于 mmap 的 dump 文件读取器
+
+    整个文件映射到内存，通过 pos 游标定位，read/peek 返回 memoryview 切片，
+    数据在真正需要转换成值(字符串、数字)之前不会发生拷贝。
+    字段解码直接使用 buf 和 pos，避免每个字节一次方法调用。
+    buf 中位置 pos 对应的文件位置为 base+pos，整个文件映射时 base 始终为 0。
+    """
+    # 是否只能顺序读取(压缩文件)，见 StreamDumpReader
+    streaming = False
+    base = 0
+
+    def __init__(self, fileName: str):
+        self.fileName = fileName
+        self._file = open(fileName, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # 空文件不能做 mmap
+        if self.size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buf = memoryview(self._mmap)
+        else:
+            self._mmap = None
+            self.buf = memoryview(b'')
+        self.pos = 0
+        # 预读线程，见 startReadAhead
+        self.readAhead = None
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, pos: int) -> int:
+        self.pos = pos
+        return self.pos
+
+    def read(self, size: int) -> memoryview:
+        """读取 size 个字节，返回 memoryview 切片，到达文件尾时返回的数据可能不足 size"""
+        start = self.pos
+        end = min(start + size, self.size)
+        self.pos = end
+        return self.buf[start:end]
+
+    def peek(self, size: int) -> memoryview:
+        """读取 size 个字节但不移动游标，用于替代 read 后再 seek 回退"""
+        return self.buf[self.pos:min(self.pos + size, self.size)]
+
+    def skip(self, size: int) -> int:
+        self.pos += size
+        return self.pos
+
+    def readU16(self) -> int:
+        """读取两字节小端无符号整数"""
+        value = _U16.unpack_from(self.buf, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def readI16(self) -> int:
+        """读取两字节小端有符号整数"""
+        value = _I16.unpack_from(self.buf, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def find(self, sub: bytes, start: int = None, end: int = None) -> int:
+        """在映射区中查找 sub，找不到返回 -1"""
+        if self._mmap is None:
+            return -1
+        if start is None:
+            start = self.pos
+        if end is None:
+            end = self.size
+        return self._mmap.find(sub, start, end)
+
+    def fill(self, rowBytes: int) -> int:
+        """保证当前位置之后有一整行数据可以直接用 buf 解码
+
+        :param rowBytes: 一行最多多少字节，见 rowdecoder.maxRowSize
+        :return: buf 中的位置上限，解析位置不超过它时下一行一定完整地在 buf 中，
+                 超过后要更新 f.pos 再调用一次 fill，并重新取 buf 和 pos。整个文件映射时不需要再调用
+        """
+        return self.size
+
+    def startReadAhead(self, windowBytes: int):
+        """启动预读线程，在当前位置之前预先读入至多 windowBytes 字节，解析时通过 readAhead.advance 报告位置"""
+        self.readAhead = ReadAhead(self.fileName, windowBytes)
+        self.readAhead.start(self.pos)
+
+    def close(self):
+        if self.readAhead is not None:
+            self.readAhead.stop()
+        self.buf.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 还有外部持有的 memoryview 切片，交给 gc 回收
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+#每次从压缩流读取(解压)多少字节
+STREAM_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def _openZstd(fileName: str):
+    if _stdZstd is not None:
+        return _stdZstd.open(fileName, "rb")
+    # 一个文件可能由多个 zstd 帧组成
+    return zstandard.ZstdDecompressor().stream_reader(open(fileName, "rb"), read_across_frames=True, closefd=True)
+
+
+# 压缩格式: (文件头, 打开函数)
+_COMPRESSIONS = {
+    "gzip": (b'\x1f\x8b', gzip.open),
+    "bz2": (b'BZh', bz2.open),
+    "xz": (b'\xfd7zXZ\x00', lzma.open),
+    "zstd": (b'\x28\xb5\x2f\xfd', _openZstd),
+}
+
+
+def dumpCompression(fileName: str) -> str:
+    """按文件头判断 dump 文件的压缩格式，返回 gzip/bz2/xz/zstd，没有压缩时返回 None"""
+    with open(fileName, "rb") as f:
+        head = f.read(6)
+    for name, (magic, _) in _COMPRESSIONS.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def compressionSupported(compression: str) -> bool:
+    """zstd 需要 Python 3.14 以上的标准库或安装 zstandard，其他格式标准库都支持"""
+    return compression != "zstd" or _stdZstd is not None or zstandard is not None
+
+
+class StreamDumpReader:
+    """压缩 dump 文件的顺序读取器，接口与 DumpReader 相同
+
+    不用先解压到磁盘，边解压边解析。buf 只是解压数据的一个窗口，buf[pos] 对应文件位置 base+pos，
+    窗口向前滑动时丢弃 pos 之前的数据，所以只能在窗口内回退，不能回到已经丢弃的位置。
+    size 为目前已解压的数据量，到文件尾时才是整个文件的大小。
+    """
+    streaming = True
+
+    def __init__(self, fileName: str, compression: str = None):
+        """
+        :param fileName: dump 文件名
+        :param compression: 压缩格式，None 表示按文件头判断
+        """
+        self.fileName = fileName
+        self.compression = compression or dumpCompression(fileName)
+        self._stream = _COMPRESSIONS[self.compression][1](fileName)
+        self._data = b''
+        self.buf = memoryview(self._data)
+        self.base = 0
+        self.pos = 0
+        self.eof = False
+        # 后台解压线程，见 startReadAhead
+        self.readAhead = None
+        self._reader = None
+
+    @property
+    def size(self) -> int:
+        return self.base + len(self._data)
+
+    def _nextBlock(self) -> bytes:
+        if self._reader is not None:
+            return self._reader.read()
+        return self._stream.read(STREAM_BLOCK_SIZE)
+
+    def _fill(self, need: int):
+        """保证 pos 之后至少有 need 字节(到文件尾时可能不足)，窗口移动到从 pos 开始"""
+        available = len(self._data) - self.pos
+        if available >= need or self.eof:
+            return
+        parts = [self.buf[self.pos:]]
+        while available < need:
+            block = self._nextBlock()
+            if not block:
+                self.eof = True
+                break
+            parts.append(block)
+            available += len(block)
+        # 外面可能还持有旧窗口的切片，不能原地修改，换成新的窗口
+        self._data = b''.join(parts)
+        self.buf = memoryview(self._data)
+        self.base += self.pos
+        self.pos = 0
+
+    def fill(self, rowBytes: int) -> int:
+        """见 DumpReader.fill，一次多解压 STREAM_BLOCK_SIZE，避免每行都移动窗口"""
+        self._fill(rowBytes + STREAM_BLOCK_SIZE)
+        if self.eof:
+            return len(self._data)
+        return len(self._data) - rowBytes
+
+    def tell(self) -> int:
+        return self.base + self.pos
+
+    def seek(self, pos: int) -> int:
+        """只能在窗口内回退，向前超出窗口时解压并丢弃中间的数据"""
+        if pos < self.base:
+            raise io.UnsupportedOperation("压缩的 dump 文件只能顺序读取，不能回到 " + hex(pos))
+        while pos > self.size and not self.eof:
+            self.base = self.size
+            self._data = self._nextBlock()
+            self.buf = memoryview(self._data)
+            if not self._data:
+                self.eof = True
+        self.pos = min(pos, self.size) - self.base
+        return self.tell()
+
+    def read(self, size: int) -> memoryview:
+        self._fill(size)
+        start = self.pos
+        self.pos = min(start + size, len(self._data))
+        return self.buf[start:self.pos]
+
+    def peek(self, size: int) -> memoryview:
+        self._fill(size)
+        return self.buf[self.pos:self.pos + size]
+
+    def skip(self, size: int) -> int:
+        return self.seek(self.tell() + size)
+
+    def readU16(self) -> int:
+        self._fill(2)
+        value = _U16.unpack_from(self.buf, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def readI16(self) -> int:
+        self._fill(2)
+        value = _I16.unpack_from(self.buf, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def find(self, sub: bytes, start: int = None, end: int = None) -> int:
+        """查找 sub，返回文件位置，找不到返回 -1。不指定 end 时一直解压到找到或文件尾"""
+        if start is None:
+            start = self.tell()
+        if start < self.base:
+            raise io.UnsupportedOperation("压缩的 dump 文件只能顺序读取，不能回到 " + hex(start))
+        if end is not None:
+            self._fill(end - self.tell())
+            idx = self._data.find(sub, start - self.base, end - self.base)
+            return -1 if idx < 0 else self.base + idx
+        searched = start
+        while True:
+            idx = self._data.find(sub, searched - self.base)
+            if idx >= 0:
+                return self.base + idx
+            if self.eof:
+                return -1
+            # 标记可能跨块，保留末尾 len(sub)-1 个字节重新查找
+            searched = max(start, self.size - len(sub) + 1)
+            self._fill(len(self._data) - self.pos + STREAM_BLOCK_SIZE)
+
+    def startReadAhead(self, windowBytes: int):
+        """启动后台解压线程，最多提前解压 windowBytes 字节"""
+        if self._reader is None and not self.eof:
+            self._reader = BackgroundReader(self._stream.read, STREAM_BLOCK_SIZE, windowBytes // STREAM_BLOCK_SIZE)
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.stop()
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def openDumpReader(fileName: str):
+    """打开 dump 文件，压缩文件(gzip/bz2/xz/zstd)返回顺序读取的 StreamDumpReader，否则返回 mmap 的 DumpReader"""
+    compression = dumpCompression(fileName)
+    if compression is None:
+        return DumpReader(fileName)
+    return StreamDumpReader(fileName, compression)
@@ -0,0 +1,96 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+
+
+#Oracle NUMBER 内部格式: 第一个字节为符号和百进制指数，之后每个字节是一位百进制数字。
+#正数: 指数字节 = 0xc1 + 指数，数字字节 = 数字 + 1
+#负数: 指数字节 = 0x3e - 指数，数字字节 = 101 - 数字，不满 20 位时末尾有 0x66 结束字节
+#零只有一个字节 0x80，指数字节同为 0x80 但有尾数的是指数为 -65 的正数
+
+#N 位百进制数字全为 1 时的值(1+100+...+100**(N-1))，正数每位数字字节比数字大 1，负数每位为 101-数字，
+#把数字字节按百进制整体累加后减去/被减这个偏移量即得尾数，不必逐位先减再乘
+_ONES=[sum(100**i for i in range(n)) for n in range(64)]
+_NEGATIVE_ONES=[101*v for v in _ONES]
+
+_NEGATIVE_END=0x66
+
+
+def decodeNumber(buf:memoryview,pos:int,size:int)->Optional[str]:
+    """把 NUMBER 内部格式解码成十进制字符串，如 "123"、"-0.05"
+
+    尾数按百进制累加成一个整数(只有小整数乘加，没有 100**power 的乘方)，再按指数补零或放小数点，
+    小数部分按字符串处理，结果是精确值。
+
+    :param buf: dump 数据
+    :param pos: NUMBER 第一个字节(指数字节)的位置，不含两字节长度
+    :param size: NUMBER 的字节数
+    :return: 十进制字符串，格式不正确时返回 None
+    """
+    if size<=0:
+        return None
+    head=buf[pos]
+    #只有单独一个字节的 0x80 是零，0x80 后面有尾数时是最小的正指数(-65，约 1e-130)
+    if head==0x80 and size==1:
+        return "0"
+    end=pos+size
+    if head>=0x80:
+        negative=False
+        exponent=head-0xc1
+    else:
+        negative=True
+        exponent=0x3e-head
+        if buf[end-1]==_NEGATIVE_END:
+            end-=1
+    count=end-pos-1
+    if count<=0:
+        return None
+
+    value=0
+    for d in buf[pos+1:end]:
+        value=value*100+d
+    if negative:
+        value=_NEGATIVE_ONES[count]-value
+    else:
+        value-=_ONES[count]
+    if value<=0:
+        return None
+
+    #尾数最低位的百进制权: 值 = 尾数 * 100**shift
+    shift=exponent+1-count
+    text=str(value)
+    if shift>0:
+        text+="00"*shift
+    elif shift<0:
+        scale=-2*shift
+        if len(text)<=scale:
+            text="0."+"0"*(scale-len(text))+text
+        else:
+            text=text[:-scale]+"."+text[-scale:]
+        text=text.rstrip("0").rstrip(".")
+    return "-"+text if negative else text
+
+
+def _toAuto(text:str)->Any:
+    if "." in text:
+        return Decimal(text)
+    return int(text)
+
+
+def _toInt(text:str)->int:
+    if "." in text:
+        return int(Decimal(text))
+    return int(text)
+
+
+#NUMBER 原生值的类型:
+#  auto    整数为 int，有小数时为 Decimal(默认，都是精确值)
+#  decimal 全部为 Decimal
+#  int     全部为 int，小数部分截断，只适合确定没有小数的字段
+#  str     十进制字符串
+NUMBER_CONVERTERS:Dict[str,Callable[[str],Any]]={
+    "auto":_toAuto,
+    "decimal":Decimal,
+    "int":_toInt,
+    "str":str,
+}
+NUMBER_TYPES=tuple(NUMBER_CONVERTERS.keys())
@@ -0,0 +1,336 @@
+import io
+import os
+import queue
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+try:
+    #Python 3.14 起标准库自带 zstd
+    from compression import zstd as _stdZstd
+except ImportError:
+    _stdZstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ReadAhead:
+    """读取线程: 在解析位置之前预先把 dump 文件读进系统页缓存
+
+    dump 文件是 mmap 映射的，解析读到还不在页缓存中的位置时会在缺页中断里同步等待磁盘(网络存储上更慢)，
+    这段时间解析线程什么也做不了。读取线程用普通文件读(读时释放 GIL)始终领先解析位置至多 windowBytes 字节，
+    领先够了就等待，解析线程通过 advance 报告当前位置。读到的数据直接丢弃，只为让页缓存命中。
+    """
+
+    def __init__(self,fileName:str,windowBytes:int,blockBytes:int=4*1024*1024):
+        """
+        :param fileName: dump 文件名
+        :param windowBytes: 最多领先解析位置多少字节
+        :param blockBytes: 每次读多少字节
+        """
+        self.fileName=fileName
+        self.windowBytes=windowBytes
+        self.block=bytearray(min(blockBytes,max(windowBytes,1)))
+        self.consumerPos=0
+        self.readPos=0
+        self.bytesRead=0
+        self.stopped=False
+        self.wakeup=threading.Event()
+        self.thread=threading.Thread(target=self.run,daemon=True)
+
+    def start(self,pos:int=0):
+        self.consumerPos=pos
+        self.readPos=pos
+        self.thread.start()
+
+    def advance(self,pos:int):
+        """解析线程报告当前位置，读取线程落后或解析位置跳到别处时从这个位置重新开始"""
+        self.consumerPos=pos
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopped=True
+        self.wakeup.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        with open(self.fileName,"rb",buffering=0) as f:
+            while not self.stopped:
+                consumerPos=self.consumerPos
+                #落后于解析位置，或解析位置往回跳了(领先超过窗口)，都从解析位置重新开始
+                if self.readPos<consumerPos or self.readPos>consumerPos+self.windowBytes+len(self.block):
+                    self.readPos=consumerPos
+                if self.readPos>=consumerPos+self.windowBytes:
+                    self.wakeup.wait(1)
+                    self.wakeup.clear()
+                    continue
+                f.seek(self.readPos)
+                count=f.readinto(self.block)
+                if not count:
+                    #到文件尾，等解析线程跳回前面(按索引解析时表不一定按顺序)
+                    self.wakeup.wait(1)
+                    self.wakeup.clear()
+                    continue
+                self.readPos+=count
+                self.bytesRead+=count
+
+
+class BackgroundReader:
+    """读取线程: 在后台线程中按块读取(解压)输入流，解析线程从有界队列中取数据块
+
+    gzip/bz2/xz/zstd 解压时释放 GIL，解压和解析可以同时进行。队列满时读取线程等待，
+    内存中最多有 queueSize 个数据块。读取出错时在解析线程下一次 read 时抛出。
+    """
+
+    def __init__(self,read,blockBytes:int,queueSize:int):
+        """
+        :param read: 读取函数，参数为字节数，返回空字节串表示结束
+        :param blockBytes: 每次读多少字节
+        :param queueSize: 最多有多少块等待解析
+        """
+        self.readFunc=read
+        self.blockBytes=blockBytes
+        self.queue=queue.Queue(maxsize=max(1,queueSize))
+        self.stopped=False
+        self.finished=False
+        self.thread=threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            while not self.stopped:
+                data=self.readFunc(self.blockBytes)
+                self.queue.put(data)
+                if not data:
+                    return
+        except BaseException as e:
+            self.queue.put(e)
+
+    def read(self)->bytes:
+        """取下一块数据，返回空字节串表示结束"""
+        if self.finished:
+            return b''
+        data=self.queue.get()
+        if isinstance(data,BaseException):
+            self.finished=True
+            raise data
+        if not data:
+            self.finished=True
+        return data
+
+    def stop(self):
+        self.stopped=True
+        #取走队列中的数据，让等待放入的读取线程结束
+        while self.thread.is_alive():
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.thread.join()
+
+
+#输出压缩格式: 文件后缀
+COMPRESS_SUFFIXES={"gzip":".gz","zstd":".zst"}
+
+
+def compressSupported(compress:str)->bool:
+    """zstd 需要 Python 3.14 以上的标准库或安装 zstandard，gzip 标准库都支持"""
+    return compress!="zstd" or _stdZstd is not None or zstandard is not None
+
+
+def blockCompressor(compress:str,level:int=None)->Callable[[bytes],bytes]:
+    """取得把一块数据压缩成一个完整 gzip member / zstd frame 的函数
+
+    每块独立压缩，多块可以在不同线程中同时压缩，按顺序拼接起来就是合法的 .gz / .zst 文件
+    (gunzip、zstd -d 以及本程序读取时都会依次解压所有 member/frame)。块为 write-buffer-mb 大小，独立压缩对压缩率几乎没有影响。
+
+    :param compress: gzip 或 zstd
+    :param level: 压缩级别，None 表示默认(gzip 6，zstd 3)
+    """
+    if compress=="gzip":
+        level=6 if level is None else level
+        #wbits=31 输出带 gzip 文件头和校验的格式
+        return lambda data:zlib.compress(data,level,wbits=31)
+    level=3 if level is None else level
+    if _stdZstd is not None:
+        return lambda data:_stdZstd.compress(data,level)
+    #ZstdCompressor 不能在多个线程中同时使用，每个线程一个
+    local=threading.local()
+    def compressZstd(data:bytes)->bytes:
+        c=getattr(local,"compressor",None)
+        if c is None:
+            c=local.compressor=zstandard.ZstdCompressor(level=level)
+        return c.compress(data)
+    return compressZstd
+
+
+def openForWrite(fileName:str,resumeAt:int=None,buffering:int=-1):
+    """打开要写的二进制文件
+
+    :param resumeAt: 不为 None 时是断点续传，保留文件的前 resumeAt 字节，截断后面的内容，从这里接着写
+    """
+    if resumeAt is None:
+        return open(fileName,"wb",buffering=buffering)
+    f=open(fileName,"r+b",buffering=buffering)
+    f.truncate(resumeAt)
+    f.seek(resumeAt)
+    return f
+
+
+class CompressedFileWriter(io.RawIOBase):
+    """在调用线程中压缩后写文件，作为 io.BufferedWriter 的底层 raw 对象使用"""
+
+    def __init__(self,fileName:str,compressBlock:Callable[[bytes],bytes],resumeAt:int=None):
+        super().__init__()
+        self.file=openForWrite(fileName,resumeAt)
+        self.compressBlock=compressBlock
+
+    def writable(self)->bool:
+        return True
+
+    def write(self,data)->int:
+        self.file.write(self.compressBlock(data))
+        return len(data)
+
+    def sync(self)->int:
+        """写到磁盘，返回文件的字节数"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.file.close()
+        finally:
+            super().close()
+
+
+class QueuedFileWriter(io.RawIOBase):
+    """写入线程: 写文件的系统调用放到后台线程，解析线程只把数据块放进有界队列
+
+    作为 io.BufferedWriter 的底层 raw 对象使用，缓冲区满时整块交给队列。
+    队列满时 write 等待(背压)，内存中最多有 queueSize 个数据块。写入出错时在下一次 write 或 close 时抛出。
+    指定 compressBlock 时压缩也在后台进行(zlib/zstd 压缩时释放 GIL，不影响解析线程)，
+    compressThreads 大于1时多块数据由线程池同时压缩，写入线程按顺序写出。
+    """
+
+    def __init__(self,fileName:str,queueSize:int,compressBlock:Callable[[bytes],bytes]=None,compressThreads:int=1,resumeAt:int=None):
+        super().__init__()
+        self.file=openForWrite(fileName,resumeAt)
+        self.compressBlock=compressBlock
+        self.pool=None
+        if compressBlock is not None and compressThreads>1:
+            self.pool=ThreadPoolExecutor(max_workers=compressThreads)
+            #队列中的块才会同时压缩，至少要能放下每个线程一块
+            queueSize=max(queueSize,compressThreads)
+        self.queue=queue.Queue(maxsize=max(1,queueSize))
+        self.error:BaseException=None
+        self.thread=threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+
+    def writable(self)->bool:
+        return True
+
+    def write(self,data)->int:
+        if self.error is not None:
+            raise self.error
+        #BufferedWriter 会复用传入的缓冲区，必须复制一份
+        if self.pool is not None:
+            self.queue.put(self.pool.submit(self.compressBlock,bytes(data)))
+        else:
+            self.queue.put(bytes(data))
+        return len(data)
+
+    def run(self):
+        while True:
+            data=self.queue.get()
+            if data is None:
+                self.queue.task_done()
+                break
+            try:
+                if self.error is not None:
+                    #已经出错，只消费队列，避免解析线程一直阻塞
+                    continue
+                if isinstance(data,Future):
+                    data=data.result()
+                elif self.compressBlock is not None:
+                    data=self.compressBlock(data)
+                self.file.write(data)
+            except BaseException as e:
+                self.error=e
+            finally:
+                self.queue.task_done()
+
+    def sync(self)->int:
+        """等队列中的数据全部写完并写到磁盘，返回文件的字节数"""
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        if self.closed:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        if self.pool is not None:
+            self.pool.shutdown()
+        try:
+            self.file.close()
+        finally:
+            super().close()
+        if self.error is not None:
+            raise self.error
+
+
+def openOutputFile(fileName:str,bufferSize:int,queueSize:int,text:bool=True,compress:str=None,compressLevel:int=None,compressThreads:int=1,
+                   resumeAt:int=None):
+    """打开输出文件，queueSize 大于0时由后台线程(压缩和)写入
+
+    :param fileName: 文件名
+    :param bufferSize: 缓冲区字节数，攒够一块才写一次，0 表示默认大小
+    :param queueSize: 最多有多少块等待写入，0 表示在调用线程中直接写
+    :param text: True 时返回文本文件(系统默认编码)，否则返回二进制文件
+    :param compress: 压缩格式 gzip / zstd，None 或 none 表示不压缩
+    :param compressLevel: 压缩级别，None 表示默认
+    :param compressThreads: 后台写入时同时压缩的线程数
+    :param resumeAt: 断点续传时从文件的这个位置(syncOutputFile 的返回值)接着写，截断后面的内容
+    """
+    compressBlock=None
+    if compress is not None and compress!="none":
+        compressBlock=blockCompressor(compress,compressLevel)
+    if queueSize<=0 and compressBlock is None:
+        binary=openForWrite(fileName,resumeAt,bufferSize if bufferSize>0 else -1)
+    else:
+        if queueSize<=0:
+            raw=CompressedFileWriter(fileName,compressBlock,resumeAt)
+        else:
+            raw=QueuedFileWriter(fileName,queueSize,compressBlock,compressThreads,resumeAt)
+        binary=io.BufferedWriter(raw,buffer_size=bufferSize if bufferSize>0 else io.DEFAULT_BUFFER_SIZE)
+    if text:
+        return io.TextIOWrapper(binary)
+    return binary
+
+
+def syncOutputFile(f)->int:
+    """把 openOutputFile 打开的文件已写的内容全部写到磁盘(fsync)，用于断点续传的检查点
+
+    压缩输出时缓冲区中不满一块的数据也单独压缩写出，文件在返回的位置截断后仍是完整的压缩文件。
+
+    :return: 文件(压缩后)的字节数，续传时作为 openOutputFile 的 resumeAt
+    """
+    f.flush()
+    binary=f.buffer if isinstance(f,io.TextIOWrapper) else f
+    raw=binary.raw
+    if isinstance(raw,(QueuedFileWriter,CompressedFileWriter)):
+        return raw.sync()
+    os.fsync(raw.fileno())
+    return raw.tell()
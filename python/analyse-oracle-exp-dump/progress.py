@@ -0,0 +1,115 @@
+import logging
+import sys
+import time
+
+
+logger = logging.getLogger("progress")
+
+
+def formatDuration(seconds:float)->str:
+    seconds=int(seconds)
+    return "{:02d}:{:02d}:{:02d}".format(seconds//3600,seconds%3600//60,seconds%60)
+
+
+class Progress:
+    """解析进度输出: 当前表、行数、行/秒、MB/秒、已处理百分比和预计剩余时间
+
+    解析循环每 checkRows 行调用一次 update，update 只在距上次输出超过 interval 秒
+    或超过 rowStep 行时才输出一行(用 \\r 覆盖)，每行解析本身不做任何输出和日志。
+    """
+
+    def __init__(self,totalBytes:int,interval:float=0.5,rowStep:int=100000,out=sys.stdout):
+        """
+        :param totalBytes: 需要处理的总字节数，用于计算百分比和剩余时间，0 表示不知道(压缩文件)
+        :param interval: 两次输出的最短间隔秒数
+        :param rowStep: 最多每隔多少行输出一次
+        :param out: 输出目标，None 表示不输出到控制台，只在表结束时写日志
+        """
+        self.totalBytes=max(0,totalBytes)
+        #已完成的表的字节数
+        self.doneBytes=0
+        self.interval=interval
+        self.rowStep=rowStep
+        #解析循环每隔多少行调用一次 update，只在这时才读时钟
+        self.checkRows=max(1,min(rowStep,4096))
+        self.out=out
+        self.startTime=time.monotonic()
+        self.totalRows=0
+        self.tableName=""
+        self.tableOffset=0
+        self.tableStart=self.startTime
+        self.lastTime=self.startTime
+        self.lastRows=0
+
+    def beginTable(self,tableName:str,offset:int):
+        """
+        :param tableName: 表名
+        :param offset: 表第一条记录的文件位置
+        """
+        self.tableName=tableName
+        self.tableOffset=offset
+        self.tableStart=time.monotonic()
+        self.lastTime=self.tableStart
+        self.lastRows=0
+
+    def update(self,tableRows:int,offset:int,force:bool=False):
+        """
+        :param tableRows: 当前表已解析的行数
+        :param offset: 当前文件位置
+        :param force: 不管间隔多久都输出
+        """
+        now=time.monotonic()
+        if not force and now-self.lastTime<self.interval and tableRows-self.lastRows<self.rowStep:
+            return
+        self.lastTime=now
+        self.lastRows=tableRows
+        if self.out is None:
+            return
+        self.out.write("\r"+self.status(tableRows,offset,now)+"   ")
+        self.out.flush()
+
+    def status(self,tableRows:int,offset:int,now:float)->str:
+        elapsed=max(now-self.startTime,1e-6)
+        done=self.doneBytes+max(0,offset-self.tableOffset)
+        rows=self.totalRows+tableRows
+        byteRate=done/elapsed
+        text="表 {}: {} 行, 总计 {} 行, {:.0f} 行/秒, {:.1f} MB/秒".format(
+            self.tableName,tableRows,rows,rows/elapsed,byteRate/1024/1024)
+        if self.totalBytes==0:
+            return text
+        text+=", {:.1f}%".format(min(100.0,done*100.0/self.totalBytes))
+        if byteRate>0 and done<self.totalBytes:
+            text+=", 剩余 "+formatDuration((self.totalBytes-done)/byteRate)
+        return text
+
+    def endTable(self,tableRows:int,offset:int):
+        self.update(tableRows,offset,force=True)
+        self.totalRows+=tableRows
+        self.doneBytes+=max(0,offset-self.tableOffset)
+        elapsed=time.monotonic()-self.tableStart
+        message="表 {} 完成: {} 条记录, 用时 {:.1f} 秒".format(self.tableName,tableRows,elapsed)
+        if self.out is not None:
+            self.out.write("\n"+message+"\n")
+            self.out.flush()
+        logger.info(message)
+
+    def advance(self,rows:int,size:int,label:str):
+        """并行模式下每完成一个表分片调用一次
+
+        :param rows: 分片的记录数
+        :param size: 分片的字节数
+        :param label: 显示在进度中的名称
+        """
+        self.tableName=label
+        self.totalRows+=rows
+        self.doneBytes+=size
+        self.tableOffset=0
+        self.update(0,0)
+
+    def finish(self):
+        elapsed=time.monotonic()-self.startTime
+        message="全部完成: {} 条记录, 用时 {}".format(self.totalRows,formatDuration(elapsed))
+        if self.out is not None:
+            self.out.write(message+"\n")
+            self.out.flush()
+        logger.info(message)
@@ -0,0 +1,180 @@
+import json
+import os
+import time
+from typing import Dict
+
+from common.result import  Result
+from sinks import RowSink
+from tableschema import TableSchema
+
+
+#断点文件格式版本，格式变化时递增，旧断点不能续传
+RESUME_VERSION=2
+
+
+class ResumeState:
+    """断点续传的检查点: 解析到 dump 文件的哪个位置，以及此时输出文件的状态"""
+    #dump 文件中接着解析的位置: 在表中间时为下一条记录的起始位置，在两张表之间时为查找下一条 insert 语句的位置
+    offset:int
+    #检查点所在(或最后完成)的表在 dump 文件中的顺序号
+    tableSeq:int
+    #检查点所在的表，在两张表之间时都为 None
+    tableName:str=None
+    sql:str=None
+    insertOffset:int=None
+    schema:TableSchema=None
+    #检查点所在的表已输出的记录数
+    tableRows:int=0
+    #已输出的总记录数
+    totalRows:int=0
+    #sink.checkpointState()
+    output:Dict=None
+
+    def isInTable(self)->bool:
+        return self.schema is not None
+
+
+class ResumeCheckpointer:
+    """按时间间隔记录断点续传的检查点
+
+    记录检查点时先让 sink 把已输出的记录写到磁盘(fsync)，再把检查点写入断点文件(先写临时文件再替换)，
+    任何时候中断，断点文件中的检查点对应的输出都已经在磁盘上。续传时截断检查点之后的输出，
+    从检查点的位置接着解析，记录不会重复也不会缺少。
+    """
+
+    def __init__(self,fileName:str,interval:float,dumpFile:str,sink:RowSink,config:Dict,resumeState:ResumeState=None):
+        """
+        :param fileName: 断点文件名
+        :param interval: 两次检查点的最短间隔秒数
+        :param dumpFile: dump 文件名
+        :param sink: 输出，用它的 checkpointState 取得输出状态
+        :param config: 影响输出内容的配置，续传时必须一致
+        :param resumeState: 续传时为读到的检查点，已输出的记录数从这里接着算
+        """
+        self.fileName=fileName
+        self.interval=interval
+        self.dumpFile=dumpFile
+        self.sink=sink
+        self.config=config
+        self.nextTime=time.monotonic()+interval
+        self.totalRows=resumeState.totalRows if resumeState is not None else 0
+        self.tableSeq=0
+        self.tableName=None
+        self.sql=None
+        self.insertOffset=None
+        self.schema:TableSchema=None
+        self.startRows=0
+        #sink 不支持续传时只提示一次
+        self.warned=False
+
+    def beginTable(self,seq:int,sql:str,insertOffset:int,schema:TableSchema,startRows:int=0):
+        """
+        :param seq: 表在 dump 文件中的顺序号
+        :param sql: 表的 insert 语句
+        :param insertOffset: insert 语句的位置
+        :param schema: 表结构
+        :param startRows: 续传时表中已输出的记录数
+        """
+        self.tableSeq=seq
+        self.tableName=schema.tableName
+        self.sql=sql
+        self.insertOffset=insertOffset
+        self.schema=schema
+        self.startRows=startRows
+
+    def isDue(self)->bool:
+        return time.monotonic()>=self.nextTime
+
+    def saveRow(self,tableRows:int,offset:int):
+        """在表中间记录检查点
+
+        :param tableRows: 本次解析的记录数
+        :param offset: 下一条记录的起始位置
+        """
+        self.save(offset,self.startRows+tableRows,self.totalRows+tableRows,True)
+
+    def endTable(self,tableRows:int,offset:int):
+        """表结束，到了间隔时间时记录两张表之间的检查点
+
+        :param tableRows: 本次解析的记录数
+        :param offset: 表结束标记之后的位置
+        """
+        self.totalRows+=tableRows
+        if self.isDue():
+            self.save(offset,0,self.totalRows,False)
+
+    def save(self,offset:int,tableRows:int,totalRows:int,inTable:bool):
+        self.nextTime=time.monotonic()+self.interval
+        output=self.sink.checkpointState()
+        if output is None:
+            if inTable:
+                return
+            if not self.warned:
+                print("")
+                print("当前输出格式不支持断点续传，不记录检查点")
+                self.warned=True
+            return
+        st=os.stat(self.dumpFile)
+        data={
+            "version":RESUME_VERSION,
+            "dumpFile":os.path.abspath(self.dumpFile),
+            "size":st.st_size,
+            "mtime":st.st_mtime_ns,
+            "config":self.config,
+            "offset":offset,
+            "tableSeq":self.tableSeq,
+            "tableName":self.tableName if inTable else None,
+            "sql":self.sql if inTable else None,
+            "insertOffset":self.insertOffset if inTable else None,
+            "schema":self.schema.toDict() if inTable else None,
+            "tableRows":tableRows,
+            "totalRows":totalRows,
+            "output":output,
+            "time":time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        tmpName=self.fileName+".tmp"
+        with open(tmpName,'w',encoding='utf-8') as out:
+            json.dump(data,out,ensure_ascii=False)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmpName,self.fileName)
+
+    def finish(self):
+        """全部完成后删除断点文件"""
+        if os.path.exists(self.fileName):
+            os.remove(self.fileName)
+
+
+def loadResumeState(fileName:str,dumpFile:str,config:Dict)->Result:
+    """读取断点文件
+
+    dump 文件的路径、大小、修改时间或影响输出的配置与断点记录的不一致时不能续传。
+
+    :return: 结果，由Result包装，data 为 ResumeState
+    """
+    if not os.path.exists(fileName):
+        return Result.errorResult(msg="断点文件不存在:"+fileName)
+    try:
+        with open(fileName,'r',encoding='utf-8') as f:
+            data=json.load(f)
+    except (OSError,ValueError) as e:
+        return Result.errorResult(msg="断点文件读取失败:"+str(e))
+
+    st=os.stat(dumpFile)
+    if (data.get("version")!=RESUME_VERSION or data.get("dumpFile")!=os.path.abspath(dumpFile)
+            or data.get("size")!=st.st_size or data.get("mtime")!=st.st_mtime_ns):
+        return Result.errorResult(msg="断点文件与 dump 文件不一致，不能续传:"+fileName)
+    if data.get("config")!=config:
+        return Result.errorResult(msg="输出配置与断点文件记录的不一致，不能续传: "+json.dumps(data.get("config"),ensure_ascii=False))
+
+    state=ResumeState()
+    state.offset=data["offset"]
+    state.tableSeq=data["tableSeq"]
+    state.tableName=data["tableName"]
+    state.sql=data["sql"]
+    state.insertOffset=data["insertOffset"]
+    state.schema=TableSchema.fromDict(data["schema"]) if data["schema"] is not None else None
+    state.tableRows=data["tableRows"]
+    state.totalRows=data["totalRows"]
+    state.output=data["output"]
+    return Result.successResult(data=state)
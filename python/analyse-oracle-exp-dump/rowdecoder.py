@@ -0,0 +1,104 @@
+import struct
+from typing import Callable, List, Tuple
+
+from dumpformat import NULL_LEN, OracleField
+
+
+_I16 = struct.Struct('<h')
+
+
+#解码整行的函数: (buf, pos) -> (各字段值, 下一行起始位置)
+RowDecodeFunc = Callable[[memoryview, int], Tuple[List[str], int]]
+
+
+def compileRowDecoder(fields: List[OracleField], columns: List[int] = None, native: bool = False,
+                      numberType: str = "auto", dateType: str = "datetime") -> RowDecodeFunc:
+    """根据 readFieldTypes 得到的字段列表生成该表专用的整行解码函数
+
+    生成的函数把每个字段的 decodeAt 展开成顺序调用，字段的解码方法在生成时就已绑定，
+    解码一行时没有按字段的循环、多态查找、文件偏移计算和日志输出。
+    指定 columns 时只解码这些字段，其余字段只按长度前缀跳过。
+
+    :param fields: 表的字段列表
+    :param columns: 要输出的字段下标(从0开始)，按输出顺序排列，None 表示全部字段
+    :param native: 为 True 时用 decodeValueAt 解码成 Python 原生类型，整行返回 tuple；
+                   否则用 decodeAt 解码成 sql 字面值，整行返回 list
+    :param numberType: native 时 NUMBER 字段值的类型，见 numbercodec.NUMBER_CONVERTERS
+    :param dateType: native 时 DATE/TIMESTAMP 字段值的类型: datetime，或 raw 即原始字节(由 sink 按列批量转换)
+    :return: 整行解码函数
+    """
+    if columns is None:
+        columns = list(range(len(fields)))
+    selected = set(columns)
+    lines = ["def decodeRow(buf, pos):"]
+    for i in range(len(fields)):
+        if i in selected:
+            lines.append("    v" + str(i) + ", pos = d" + str(i) + "(buf, pos)")
+        else:
+            lines.append("    size = unpack(buf, pos)[0]")
+            lines.append("    pos += 2 if size == NULL_LEN else size + 2")
+    values = ", ".join("v" + str(i) for i in columns)
+    if native:
+        lines.append("    return (" + values + ("," if values else "") + "), pos")
+    else:
+        lines.append("    return [" + values + "], pos")
+
+    if native:
+        namespace = {"d" + str(i): fields[i].valueDecoder(numberType, dateType) for i in selected}
+    else:
+        namespace = {"d" + str(i): fields[i].decodeAt for i in selected}
+    namespace["unpack"] = _I16.unpack_from
+    namespace["NULL_LEN"] = NULL_LEN
+    exec("\n".join(lines), namespace)
+    return namespace["decodeRow"]
+
+
+def maxRowSize(colCount: int) -> int:
+    """一行记录最多占多少字节: 每个字段两字节长度前缀加至多 0x7fff 字节的值，再加行结束标记和其后的表结束标记"""
+    return colCount * (2 + 0x7fff) + 4
+
+
+#跳过整行的函数: (buf, pos) -> 下一行起始位置
+RowSkipFunc = Callable[[memoryview, int], int]
+
+
+def compileRowSkipper(colCount: int) -> RowSkipFunc:
+    """生成只按两字节长度前缀跳过一行的函数，不做任何字段值解码
+
+    :param colCount: 表的字段数
+    :return: 整行跳过函数
+    """
+    lines = ["def skipRow(buf, pos):"]
+    for i in range(colCount):
+        lines.append("    size = unpack(buf, pos)[0]")
+        lines.append("    pos += 2 if size == NULL_LEN else size + 2")
+    lines.append("    return pos")
+
+    namespace = {"unpack": _I16.unpack_from, "NULL_LEN": NULL_LEN}
+    exec("\n".join(lines), namespace)
+    return namespace["skipRow"]
+
+
+def compileRowVerifier(lengths: List[int]) -> RowSkipFunc:
+    """生成按长度前缀跳过一行并检查字段长度的函数，用于校验 dump 文件结构，不做任何字段值解码
+
+    各字段长度都不超过定义长度(或为 null)时返回下一行起始位置；
+    有字段超出定义长度或长度为负数(文件已损坏)时返回 -1，由调用方逐个字段检查这一行。
+
+    :param lengths: 各字段的定义长度
+    :return: 整行校验函数
+    """
+    lines = ["def verifyRow(buf, pos):"]
+    for length in lengths:
+        lines.append("    size = unpack(buf, pos)[0]")
+        lines.append("    if size == NULL_LEN:")
+        lines.append("        pos += 2")
+        lines.append("    elif 0 <= size <= " + str(length) + ":")
+        lines.append("        pos += size + 2")
+        lines.append("    else:")
+        lines.append("        return -1")
+    lines.append("    return pos")
+
+    namespace = {"unpack": _I16.unpack_from, "NULL_LEN": NULL_LEN}
+    exec("\n".join(lines), namespace)
+    return namespace["verifyRow"]
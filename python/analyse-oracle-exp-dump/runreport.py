@@ -0,0 +1,334 @@
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Sequence
+
+from dumpformat import OracleField
+from sinks import RowSink
+from sqltemplate import parseColumnNames
+
+
+#统计级别: stages 只统计各阶段用时; fields 另外统计每种字段类型的解码用时(开销较大，会拉长总用时)
+PROFILE_LEVELS=("off","stages","fields")
+
+
+class TableStats:
+    """一张表(或并行模式下的一个表分片)的统计"""
+
+    def __init__(self,tableName:str):
+        self.tableName=tableName
+        self.rows=0
+        self.bytes=0
+        self.seconds=0.0
+        #阶段名 -> 秒
+        self.stages:Dict[str,float]=collections.defaultdict(float)
+        #字段类型 -> [解码次数, 秒]
+        self.fieldTypes:Dict[str,List]=collections.defaultdict(lambda:[0,0.0])
+        #字段名 -> VARCHAR2/CHAR 解码缓存统计，见 TextDecodeCache.stats
+        self.textCache:Dict[str,Dict]={}
+
+    def toDict(self)->Dict:
+        return {
+            "table":self.tableName,
+            "rows":self.rows,
+            "bytes":self.bytes,
+            "seconds":round(self.seconds,6),
+            "stages":{k:round(v,6) for k,v in self.stages.items()},
+            "fieldTypes":{k:{"calls":v[0],"seconds":round(v[1],6)} for k,v in self.fieldTypes.items()},
+            "textCache":self.textCache,
+        }
+
+    @classmethod
+    def fromDict(cls,data:Dict)->"TableStats":
+        stats=cls(data["table"])
+        stats.rows=data["rows"]
+        stats.bytes=data["bytes"]
+        stats.seconds=data["seconds"]
+        stats.stages.update(data["stages"])
+        for k,v in data["fieldTypes"].items():
+            stats.fieldTypes[k]=[v["calls"],v["seconds"]]
+        stats.textCache.update(data.get("textCache",{}))
+        return stats
+
+
+class TimedSink(RowSink):
+    """包装另一个 sink，统计输出(格式化+写入)的用时"""
+
+    def __init__(self,sink:RowSink,stats:TableStats):
+        self.sink=sink
+        self.stats=stats
+        self.native=sink.native
+        self.numberType=sink.numberType
+        self.dateType=sink.dateType
+        self.concatenable=sink.concatenable
+        self.seconds=0.0
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        self.sink.beginTable(sql,fields,seq)
+
+    def writeRow(self,values:Sequence):
+        start=time.perf_counter()
+        self.sink.writeRow(values)
+        self.seconds+=time.perf_counter()-start
+
+    def endTable(self):
+        start=time.perf_counter()
+        self.sink.endTable()
+        self.stats.stages["write"]+=self.seconds+time.perf_counter()-start
+        self.seconds=0.0
+
+    def checkpointState(self)->Dict:
+        return self.sink.checkpointState()
+
+    def close(self):
+        self.sink.close()
+
+
+class _TimedField:
+    """只给 compileRowDecoder 用的字段代理，decodeAt/decodeValueAt 调用时累计该字段类型的用时"""
+
+    def __init__(self,field:OracleField,counter:List):
+        self.type=field.type
+        self.defineLen=field.defineLen
+        self.charset=field.charset
+        decodeAt=field.decodeAt
+        decodeValueAt=field.decodeValueAt
+        perf=time.perf_counter
+
+        def timedDecodeAt(buf,pos):
+            start=perf()
+            ret=decodeAt(buf,pos)
+            counter[0]+=1
+            counter[1]+=perf()-start
+            return ret
+
+        def timedDecodeValueAt(buf,pos):
+            start=perf()
+            ret=decodeValueAt(buf,pos)
+            counter[0]+=1
+            counter[1]+=perf()-start
+            return ret
+
+        self.decodeAt=timedDecodeAt
+        self.decodeValueAt=timedDecodeValueAt
+        self.field=field
+        self.counter=counter
+
+    def valueDecoder(self,numberType:str,dateType:str="datetime"):
+        decodeValueAt=self.field.valueDecoder(numberType,dateType)
+        counter=self.counter
+        perf=time.perf_counter
+
+        def timedDecodeValueAt(buf,pos):
+            start=perf()
+            ret=decodeValueAt(buf,pos)
+            counter[0]+=1
+            counter[1]+=perf()-start
+            return ret
+        return timedDecodeValueAt
+
+
+class RunReport:
+    """一次运行的分阶段用时和计数，结束时输出成 json 报告
+
+    bytesScanned 为解析经过的 dump 字节数，按表预扫描/并行时为所选各表记录的字节数。
+
+    阶段:
+      getInsertSql    查找 insert 语句
+      readFieldTypes  读取字段定义
+      scan            预扫描表位置
+      decode          解析记录(不含输出)
+      write           格式化并写入输出
+    """
+
+    def __init__(self,level:str="stages"):
+        self.level=level
+        self.startTime=time.time()
+        self.start=time.perf_counter()
+        self.dumpFile=None
+        self.bytesScanned=0
+        self.stages:Dict[str,float]=collections.defaultdict(float)
+        self.tables:List[TableStats]=[]
+        self.current:TableStats=None
+        #还没有开始的表之前的阶段用时(查找 insert 语句、读字段定义)，在 beginTable 时计入该表
+        self.pending:Dict[str,float]=collections.defaultdict(float)
+        self.sampler:"StackSampler"=None
+
+    def isEnabled(self)->bool:
+        return self.level!="off"
+
+    def addStage(self,stage:str,seconds:float):
+        """累计一个阶段的用时，同时计入当前表或下一张表"""
+        self.stages[stage]+=seconds
+        if self.current is not None:
+            self.current.stages[stage]+=seconds
+        else:
+            self.pending[stage]+=seconds
+
+    def timed(self,stage:str,func,*args,**kwargs):
+        """调用 func 并把用时计入 stage"""
+        start=time.perf_counter()
+        try:
+            return func(*args,**kwargs)
+        finally:
+            self.addStage(stage,time.perf_counter()-start)
+
+    def timedRun(self,stage:str,func,*args,**kwargs):
+        """调用 func 并把用时计入 stage，只计入整次运行，不属于任何一张表(如预扫描)"""
+        start=time.perf_counter()
+        try:
+            return func(*args,**kwargs)
+        finally:
+            self.stages[stage]+=time.perf_counter()-start
+
+    def beginTable(self,tableName:str)->TableStats:
+        self.current=TableStats(tableName)
+        self.current.stages.update(self.pending)
+        self.pending.clear()
+        self.tables.append(self.current)
+        return self.current
+
+    def wrapFields(self,fields:List[OracleField])->List:
+        """fields 级别时返回统计解码用时的字段代理，否则原样返回"""
+        if self.level!="fields" or self.current is None:
+            return fields
+        return [_TimedField(f,self.current.fieldTypes[f.type or "unknown"]) for f in fields]
+
+    def wrapSink(self,sink:RowSink)->RowSink:
+        if sink is None or self.current is None:
+            return sink
+        return TimedSink(sink,self.current)
+
+    def addTextCacheStats(self,sql:str,fields:List[OracleField]):
+        """记录当前表各 VARCHAR2/CHAR 字段解码缓存的命中情况"""
+        names=parseColumnNames(sql)
+        for i,field in enumerate(fields):
+            if field.textCache is not None:
+                name=names[i] if i<len(names) else "C"+str(i+1)
+                self.current.textCache[name]=field.textCache.stats()
+
+    def endTable(self,rows:int,size:int,seconds:float):
+        """
+        :param rows: 解析的记录数
+        :param size: 记录占用的字节数
+        :param seconds: 解析+输出的总用时，减去输出用时即为解码用时
+        """
+        stats=self.current
+        stats.rows=rows
+        stats.bytes=size
+        stats.seconds=seconds
+        decode=max(0.0,seconds-stats.stages.get("write",0.0))
+        stats.stages["decode"]+=decode
+        self.stages["decode"]+=decode
+        self.stages["write"]+=stats.stages.get("write",0.0)
+        self.current=None
+
+    def addTableStats(self,data:Dict):
+        """并入工作进程返回的分片统计"""
+        stats=TableStats.fromDict(data)
+        self.tables.append(stats)
+        for k,v in stats.stages.items():
+            self.stages[k]+=v
+
+    def startSampler(self,interval:float):
+        self.sampler=StackSampler(interval)
+        self.sampler.start()
+
+    def toDict(self)->Dict:
+        seconds=time.perf_counter()-self.start
+        rows=sum(t.rows for t in self.tables)
+        fieldTypes=collections.defaultdict(lambda:[0,0.0])
+        lookups=0
+        hits=0
+        disabled=0
+        for t in self.tables:
+            for k,v in t.fieldTypes.items():
+                fieldTypes[k][0]+=v[0]
+                fieldTypes[k][1]+=v[1]
+            for v in t.textCache.values():
+                lookups+=v["lookups"]
+                hits+=v["hits"]
+                disabled+=0 if v["enabled"] else 1
+        report={
+            "dumpFile":self.dumpFile,
+            "startTime":time.strftime("%Y-%m-%d %H:%M:%S",time.localtime(self.startTime)),
+            "profile":self.level,
+            "seconds":round(seconds,6),
+            "bytesScanned":self.bytesScanned,
+            "rows":rows,
+            "rowsPerSec":round(rows/seconds,1) if seconds>0 else 0,
+            "mbPerSec":round(self.bytesScanned/seconds/1024/1024,3) if seconds>0 else 0,
+            "stages":{k:round(v,6) for k,v in self.stages.items()},
+            "fieldTypes":{k:{"calls":v[0],"seconds":round(v[1],6),
+                             "perSec":round(v[0]/v[1],1) if v[1]>0 else 0} for k,v in fieldTypes.items()},
+            "textCache":{"lookups":lookups,"hits":hits,"hitRate":round(hits/lookups,4) if lookups>0 else 0,
+                         "disabledColumns":disabled},
+            "tables":[t.toDict() for t in self.tables],
+        }
+        if self.sampler is not None:
+            report["sampler"]=self.sampler.toDict()
+        return report
+
+    def save(self,fileName:str):
+        if self.sampler is not None:
+            self.sampler.stop()
+        with open(fileName,"w",encoding="utf-8") as out:
+            json.dump(self.toDict(),out,ensure_ascii=False,indent=2)
+        print("运行报告已保存到",os.path.abspath(fileName))
+
+
+class StackSampler:
+    """采样分析器: 后台线程每隔 interval 秒记录一次主线程的调用栈，统计各函数出现的次数
+
+    不需要额外安装，也不用 cProfile 那样给每次函数调用计时，对解析速度影响很小。
+    self 为函数在栈顶的次数，total 为函数在栈中任意位置的次数。
+    """
+
+    def __init__(self,interval:float=0.005,threadId:int=None):
+        self.interval=interval
+        self.threadId=threadId if threadId is not None else threading.main_thread().ident
+        self.samples=0
+        self.selfCounts=collections.Counter()
+        self.totalCounts=collections.Counter()
+        self.stopEvent=threading.Event()
+        self.thread=threading.Thread(target=self.run,daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopEvent.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        while not self.stopEvent.wait(self.interval):
+            frame=sys._current_frames().get(self.threadId)
+            if frame is None:
+                continue
+            self.samples+=1
+            self.selfCounts[self.frameName(frame)]+=1
+            seen=set()
+            while frame is not None:
+                name=self.frameName(frame)
+                if name not in seen:
+                    seen.add(name)
+                    self.totalCounts[name]+=1
+                frame=frame.f_back
+
+    @staticmethod
+    def frameName(frame)->str:
+        code=frame.f_code
+        return "{}:{}({})".format(os.path.basename(code.co_filename),code.co_name,code.co_firstlineno)
+
+    def toDict(self,top:int=30)->Dict:
+        return {
+            "interval":self.interval,
+            "samples":self.samples,
+            "top":[{"function":name,"self":count,"total":self.totalCounts[name]}
+                   for name,count in self.selfCounts.most_common(top)],
+            "topTotal":[{"function":name,"total":count} for name,count in self.totalCounts.most_common(top)],
+        }
@@ -0,0 +1,513 @@
+import io
+import os
+from typing import Dict, List, Sequence
+
+from common.properties import Properties
+from common.result import  Result
+from dumpformat import OracleField
+from numbercodec import NUMBER_TYPES
+from pipeline import COMPRESS_SUFFIXES, compressSupported, openOutputFile, syncOutputFile
+from sqltemplate import InsertSqlTemplate, parseTableName, splitInsertSql
+
+
+class RowSink:
+    """解析出的记录的输出目标
+
+    readFieldsData 在每张表开始时调用 beginTable，每行调用 writeRow，表结束时调用 endTable，
+    全部完成后由创建者调用 close。
+    """
+    #为 True 时 writeRow 收到的是 Python 原生类型值的 tuple，否则是 sql 字面值的 list
+    native:bool=False
+    #native 时 NUMBER 字段值的类型，见 numbercodec.NUMBER_CONVERTERS
+    numberType:str="auto"
+    #native 时 DATE/TIMESTAMP 字段值的类型: datetime，或 raw 即原始字节，由 sink 攒够一批后按列转换
+    dateType:str="datetime"
+    #并行分片的输出文件能否直接按字节顺序拼接成一个文件
+    concatenable:bool=True
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        """
+        :param sql: 表的 insert 语句(已按输出字段裁剪)
+        :param fields: 输出字段的定义，与 sql 中的字段一一对应
+        :param seq: 表在 dump 文件中的顺序号(从1开始)，每张表单独输出文件时用于文件名，
+                    串行和并行模式下同一张表的文件名相同；0 表示不知道，按 sink 收到的表依次编号
+        """
+        pass
+
+    def writeRow(self,values:Sequence):
+        pass
+
+    def endTable(self):
+        pass
+
+    def checkpointState(self)->Dict:
+        """断点续传的检查点: 把已收到的记录全部写到磁盘(fsync)，返回从这里接着输出需要的状态
+
+        创建 sink 时传入这个状态就能接着输出，检查点之后输出的内容会被截断。
+        :return: 可以写入 json 的输出状态，当前位置不能续传时返回 None
+        """
+        return None
+
+    def close(self):
+        pass
+
+
+class SqlSink(RowSink):
+    """每行输出一条 insert 语句到文本文件"""
+
+    def __init__(self,outfile:io.TextIOWrapper,closeFile:bool=False,output:"RotatingOutputFile"=None):
+        """
+        :param outfile: 输出文件
+        :param closeFile: close 时是否关闭 outfile
+        :param output: outfile 所属的 RotatingOutputFile，用于记录断点续传的检查点
+        """
+        self.outfile=outfile
+        self.closeFile=closeFile
+        self.output=output
+        self.template:InsertSqlTemplate=None
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        self.template=InsertSqlTemplate(sql)
+
+    def writeRow(self,values:Sequence):
+        self.outfile.write(self.template.render(values))
+
+    def checkpointState(self)->Dict:
+        if self.output is None:
+            return None
+        return self.output.checkpointState()
+
+    def close(self):
+        if self.closeFile:
+            self.outfile.close()
+
+
+class BatchSqlSink(RowSink):
+    """把多行合并成一条语句输出，减少导入时的语句数
+
+    insertMode 为 insert-all 时生成 Oracle 的 INSERT ALL INTO ... SELECT 1 FROM dual，
+    为 values 时生成 INSERT INTO ... VALUES (...), (...) 多行语句(PostgreSQL/MySQL 等)。
+    每条语句以 ; 结束，commitBatches 大于0时每输出这么多条语句加一个 COMMIT;
+    """
+
+    def __init__(self,outfile:"RotatingOutputFile",insertMode:str,batchSize:int,commitBatches:int=0,closeFile:bool=False):
+        """
+        :param outfile: 输出文件
+        :param insertMode: insert-all 或 values
+        :param batchSize: 每条语句包含的行数
+        :param commitBatches: 每多少条语句提交一次，0 表示不输出 COMMIT
+        :param closeFile: close 时是否关闭 outfile
+        """
+        self.outfile=outfile
+        self.insertMode=insertMode
+        self.batchSize=max(1,batchSize)
+        self.commitBatches=commitBatches
+        self.closeFile=closeFile
+        self.template:InsertSqlTemplate=None
+        self.singleTemplate:InsertSqlTemplate=None
+        self.head=""
+        self.rows:List[str]=[]
+        self.batchCount=0
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        parts=splitInsertSql(sql)
+        if parts is None:
+            #语句格式不认识时退回每行一条语句
+            self.template=None
+            self.singleTemplate=InsertSqlTemplate(sql)
+        else:
+            self.head,values=parts
+            self.template=InsertSqlTemplate(values)
+        self.rows=[]
+        self.batchCount=0
+
+    def writeRow(self,values:Sequence):
+        if self.template is None:
+            self.outfile.write(self.singleTemplate.render(values))
+            return
+        self.rows.append(self.template.render(values))
+        if len(self.rows)>=self.batchSize:
+            self.flush()
+
+    def flush(self):
+        if len(self.rows)==0:
+            return
+        if self.insertMode=="insert-all":
+            into="  INTO "+self.head[len("INSERT INTO "):].lstrip()+" VALUES "
+            self.outfile.write("INSERT ALL\n"+into+("\n"+into).join(self.rows)+"\nSELECT 1 FROM dual;\n",len(self.rows))
+        else:
+            self.outfile.write(self.head+" VALUES\n"+",\n".join(self.rows)+";\n",len(self.rows))
+        self.rows=[]
+        self.batchCount+=1
+        if self.commitBatches>0 and self.batchCount%self.commitBatches==0:
+            self.outfile.write("COMMIT;\n",0)
+
+    def endTable(self):
+        self.flush()
+        if self.commitBatches>0 and self.batchCount%self.commitBatches!=0:
+            self.outfile.write("COMMIT;\n",0)
+
+    def checkpointState(self)->Dict:
+        #没攒满的行提前输出成一条语句
+        self.flush()
+        return self.outfile.checkpointState()
+
+    def close(self):
+        if self.closeFile:
+            self.outfile.close()
+
+
+class TableSqlSink(RowSink):
+    """out-layout=table 时 sql 输出每张表一个文件: out-dir/序号-表名.sql"""
+
+    def __init__(self,options:"OutputOptions",resumeState:Dict=None):
+        """
+        :param options: 输出配置
+        :param resumeState: 断点续传时为检查点的 checkpointState
+        """
+        self.options=options
+        #当前表在 dump 文件中的顺序号
+        self.tableSeq=0
+        self.sink:RowSink=None
+        #检查点在表中间时，当前表的文件要接着写
+        self.resumeOutput:Dict=None
+        if resumeState is not None:
+            self.tableSeq=resumeState["tableSeq"]
+            self.resumeOutput=resumeState["output"]
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        if seq>0:
+            self.tableSeq=seq
+        elif self.resumeOutput is None:
+            self.tableSeq+=1
+        fileName=tableFileName(self.options.outDir,self.tableSeq,sinkTableName(sql,self.tableSeq),self.options.fileSuffix())
+        self.sink=createSqlSink(self.options,fileName,resumeState=self.resumeOutput)
+        self.resumeOutput=None
+        self.sink.beginTable(sql,fields,seq)
+        #直接调用当前表的 sink，每行不多一次转发
+        self.writeRow=self.sink.writeRow
+
+    def endTable(self):
+        self.sink.endTable()
+        self.sink.close()
+        self.sink=None
+
+    def checkpointState(self)->Dict:
+        return {"tableSeq":self.tableSeq,"output":self.sink.checkpointState() if self.sink is not None else None}
+
+
+class RotatingOutputFile:
+    """按大小或行数切换的 sql 输出文件: out.0001.sql.gz、out.0002.sql.gz ...
+
+    只在语句之间切换，每个文件都是完整的语句，可以单独导入。大小按写入的字符数(压缩前)计算。
+    不切换时只有一个文件，文件名不加序号。
+    """
+
+    def __init__(self,options:"OutputOptions",fileName:str,rotate:bool=True,resumeState:Dict=None):
+        """
+        :param options: 输出配置，out-file-max-mb / out-file-max-rows 为切换的上限
+        :param fileName: 输出文件名(已带压缩后缀)
+        :param rotate: 为 False 时不切换(并行模式的分片文件)
+        :param resumeState: 断点续传时为检查点的 checkpointState，接着写检查点时的文件
+        """
+        self.options=options
+        self.fileName=fileName
+        self.maxChars=options.outFileMaxMb*1024*1024 if rotate else 0
+        self.maxRows=options.outFileMaxRows if rotate else 0
+        self.fileNames:List[str]=[]
+        self.file:io.TextIOWrapper=None
+        self.chars=0
+        self.rows=0
+        if resumeState is None:
+            self.open()
+            return
+        self.fileNames=resumeState["files"]
+        self.chars=resumeState["chars"]
+        self.rows=resumeState["rows"]
+        if resumeState["position"] is not None:
+            self.file=openSqlFile(options,self.fileNames[-1],resumeState["position"])
+
+    def isRotating(self)->bool:
+        return self.maxChars>0 or self.maxRows>0
+
+    def nextFileName(self)->str:
+        if not self.isRotating():
+            return self.fileName
+        suffix=self.options.compressSuffix()
+        root=self.fileName[:len(self.fileName)-len(suffix)] if suffix else self.fileName
+        root,ext=os.path.splitext(root)
+        return "{}.{:04d}{}{}".format(root,len(self.fileNames)+1,ext,suffix)
+
+    def open(self):
+        fileName=self.nextFileName()
+        self.file=openSqlFile(self.options,fileName)
+        self.fileNames.append(fileName)
+        self.chars=0
+        self.rows=0
+
+    def write(self,text:str,rows:int=1):
+        """
+        :param text: 一条或多条完整的语句
+        :param rows: 语句包含的记录数
+        """
+        if self.file is None:
+            self.open()
+        self.file.write(text)
+        self.chars+=len(text)
+        self.rows+=rows
+        if (self.maxChars>0 and self.chars>=self.maxChars) or (self.maxRows>0 and self.rows>=self.maxRows):
+            #下一次写入时才打开新文件，最后一个文件不会是空的
+            self.file.close()
+            self.file=None
+
+    def checkpointState(self)->Dict:
+        return {"files":list(self.fileNames),"position":syncOutputFile(self.file) if self.file is not None else None,
+                "chars":self.chars,"rows":self.rows}
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file=None
+
+
+#insert 语句的生成方式
+INSERT_MODES=("row","insert-all","values")
+#sql 输出的文件布局: single(全部表写入 out-file) / table(每张表一个文件)
+OUT_LAYOUTS=("single","table")
+#可以压缩的输出格式，copy/sqlldr 的导入脚本要直接读取数据文件，不压缩
+COMPRESSIBLE_FORMATS=("sql","csv","tsv")
+
+
+class OutputOptions:
+    """输出相关配置，会传给并行模式的工作进程，所以只保存简单值"""
+    #输出格式: sql / parquet / arrow / csv / tsv / copy / sqlldr / db
+    format:str="sql"
+    outDir:str="out"
+    #列式输出每个 row group(record batch) 的行数
+    rowGroupSize:int=100000
+    #列式输出中 NUMBER 字段的 decimal 小数位数
+    numberScale:int=0
+    #文本输出攒够多少 MB 写一次文件
+    writeBufferMb:int=8
+    #sql/文本输出由后台线程写文件时最多有多少块(每块 write-buffer-mb)等待写入，0 表示在解析线程中直接写
+    writeQueueSize:int=4
+    #文本输出文件的编码
+    outEncoding:str="utf-8"
+    #csv/tsv 第一行是否输出字段名
+    csvHeader:bool=False
+    #sql 输出的语句生成方式: row(每行一条) / insert-all / values
+    insertMode:str="row"
+    #insert-all / values 方式每条语句包含的行数
+    insertBatchSize:int=100
+    #每多少条语句输出一个 COMMIT，0 表示不输出
+    commitBatches:int=0
+    #db 输出的目标数据库类型: oracle / sqlite
+    dbType:str="oracle"
+    #oracle 为 用户/密码@主机:端口/服务名，sqlite 为数据库文件名
+    dbDsn:str=None
+    #写入线程数，每个线程一个连接
+    dbPoolSize:int=4
+    #每次 executemany 的行数
+    dbBatchSize:int=1000
+    #每个连接执行多少批后提交一次，0 表示只在最后提交
+    dbCommitBatches:int=10
+    #解析线程和写入线程之间的队列最多缓存多少批
+    dbQueueSize:int=8
+    #db 输出时 NUMBER 字段绑定的值类型: auto / decimal / int / str
+    numberType:str="auto"
+    #sql 输出的文件布局: single / table
+    outLayout:str="single"
+    #sql/csv/tsv 输出的压缩格式: none / gzip / zstd
+    outCompress:str="none"
+    #压缩级别，None 表示默认
+    outCompressLevel:int=None
+    #同时压缩的线程数
+    compressThreads:int=2
+    #sql 输出文件写满多少 MB(压缩前)或多少行后切换到下一个文件，0 表示不切换
+    outFileMaxMb:int=0
+    outFileMaxRows:int=0
+
+    @classmethod
+    def fromProperties(cls,pros:Properties)->"OutputOptions":
+        options=cls()
+        options.format=pros.get("out-format",cls.format).lower()
+        options.outDir=pros.get("out-dir",cls.outDir)
+        options.rowGroupSize=int(pros.get("row-group-size",str(cls.rowGroupSize)))
+        options.numberScale=int(pros.get("number-scale",str(cls.numberScale)))
+        options.writeBufferMb=int(pros.get("write-buffer-mb",str(cls.writeBufferMb)))
+        options.writeQueueSize=int(pros.get("write-queue-size",str(cls.writeQueueSize)))
+        options.outEncoding=pros.get("out-encoding",cls.outEncoding)
+        options.csvHeader=pros.get("csv-header","false").lower()=="true"
+        options.insertMode=pros.get("insert-mode",cls.insertMode).lower()
+        options.insertBatchSize=int(pros.get("insert-batch-size",str(cls.insertBatchSize)))
+        options.commitBatches=int(pros.get("commit-batches",str(cls.commitBatches)))
+        options.dbType=pros.get("db-type",cls.dbType).lower()
+        options.dbDsn=pros.get("db-dsn",cls.dbDsn)
+        options.dbPoolSize=int(pros.get("db-pool-size",str(cls.dbPoolSize)))
+        options.dbBatchSize=int(pros.get("db-batch-size",str(cls.dbBatchSize)))
+        options.dbCommitBatches=int(pros.get("db-commit-batches",str(cls.dbCommitBatches)))
+        options.dbQueueSize=int(pros.get("db-queue-size",str(cls.dbQueueSize)))
+        options.numberType=pros.get("number-type",cls.numberType).lower()
+        options.outLayout=pros.get("out-layout",cls.outLayout).lower()
+        options.outCompress=pros.get("out-compress",cls.outCompress).lower()
+        level=pros.get("out-compress-level","")
+        options.outCompressLevel=int(level) if level!="" else None
+        options.compressThreads=int(pros.get("compress-threads",str(cls.compressThreads)))
+        options.outFileMaxMb=int(pros.get("out-file-max-mb",str(cls.outFileMaxMb)))
+        options.outFileMaxRows=int(pros.get("out-file-max-rows",str(cls.outFileMaxRows)))
+        return options
+
+    def fileSuffix(self)->str:
+        return _FILE_SUFFIXES.get(self.format,"."+self.format)+self.compressSuffix()
+
+    def compressSuffix(self)->str:
+        """压缩输出文件名的后缀，不压缩时为空"""
+        if self.format not in COMPRESSIBLE_FORMATS:
+            return ""
+        return COMPRESS_SUFFIXES.get(self.outCompress,"")
+
+    def compressedFileName(self,fileName:str)->str:
+        """out-file 按压缩格式加上后缀，已经带后缀时不变"""
+        suffix=self.compressSuffix()
+        if suffix=="" or fileName.endswith(suffix):
+            return fileName
+        return fileName+suffix
+
+    def isColumnar(self)->bool:
+        return self.format in ("parquet","arrow")
+
+    def isText(self)->bool:
+        return self.format in ("csv","tsv","copy","sqlldr")
+
+    def isDatabase(self)->bool:
+        return self.format=="db"
+
+    def isPerTable(self)->bool:
+        """是否每张表输出单独的文件"""
+        if self.format=="sql":
+            return self.outLayout=="table"
+        return not self.isDatabase()
+
+    def isConcatenable(self)->bool:
+        """并行分片的输出文件能否直接按字节顺序拼接"""
+        return not self.isColumnar() and not self.isDatabase()
+
+
+_FILE_SUFFIXES={
+    "copy":".copy",
+    "sqlldr":".dat",
+}
+
+
+def checkOutputOptions(options:OutputOptions)->Result:
+    """检查输出格式是否支持，以及需要的第三方库是否已安装"""
+    #各格式共用的选项先检查，后面的格式分支会提前返回
+    if options.numberType not in NUMBER_TYPES:
+        return Result.errorResult(msg="不支持的 number-type: "+options.numberType)
+    if options.outLayout not in OUT_LAYOUTS:
+        return Result.errorResult(msg="不支持的 out-layout: "+options.outLayout)
+    if options.outCompress!="none":
+        if options.outCompress not in COMPRESS_SUFFIXES:
+            return Result.errorResult(msg="不支持的 out-compress: "+options.outCompress)
+        if options.format not in COMPRESSIBLE_FORMATS:
+            return Result.errorResult(msg="out-compress 只支持 sql/csv/tsv 输出")
+        if not compressSupported(options.outCompress):
+            return Result.errorResult(msg="zstd 压缩输出需要先安装 zstandard: pip install zstandard")
+    if options.isColumnar():
+        import columnarsink
+        if columnarsink.pa is None:
+            return Result.errorResult(msg="parquet/arrow 输出需要先安装 pyarrow: pip install pyarrow")
+        return Result.successResult()
+    if options.isDatabase():
+        import dbsink
+        if options.dbType not in dbsink.DB_ADAPTERS:
+            return Result.errorResult(msg="不支持的 db-type: "+options.dbType)
+        if options.dbDsn is None:
+            return Result.errorResult(msg="db 输出需要设置 db-dsn")
+        if options.dbType=="oracle" and dbsink.cx_Oracle is None:
+            return Result.errorResult(msg="db 输出到 oracle 需要先安装 cx_Oracle: pip install cx_Oracle")
+        return Result.successResult()
+    if options.format!="sql" and not options.isText():
+        return Result.errorResult(msg="不支持的输出格式: "+options.format)
+    if options.insertMode not in INSERT_MODES:
+        return Result.errorResult(msg="不支持的 insert-mode: "+options.insertMode)
+    return Result.successResult()
+
+
+def tableFileName(outDir:str,seq:int,tableName:str,suffix:str)->str:
+    """每张表单独输出时的文件名: 序号-表名.后缀"""
+    return os.path.join(outDir,"{:04d}-{}{}".format(seq,tableName,suffix))
+
+
+def createSink(options:OutputOptions,outfileName:str,tableFile:str=None,firstPart:bool=True)->RowSink:
+    """创建只输出到一个文件的 sink，用于并行模式下每个表分片的输出，db 格式不使用文件名
+
+    :param options: 输出配置
+    :param outfileName: 输出文件名
+    :param tableFile: 分片最终合并成的表文件名
+    :param firstPart: 是否为表的第一个分片
+    """
+    if options.isColumnar():
+        from columnarsink import ColumnarSink
+        return ColumnarSink(options,fileName=outfileName)
+    if options.isText():
+        from textsink import TextSink
+        return TextSink(options,fileName=outfileName,tableFile=tableFile,firstPart=firstPart)
+    if options.isDatabase():
+        from dbsink import DbSink
+        return DbSink(options)
+    #分片文件最后要按顺序合并，不切换文件
+    return createSqlSink(options,outfileName,rotate=False)
+
+
+def createSerialSink(options:OutputOptions,outfileName:str,resumeState:Dict=None)->RowSink:
+    """创建串行模式的 sink
+
+    sql 格式全部表写入 out-file，没有配置 out-file 时不输出，out-layout=table 时每张表输出到 out-dir 下单独的文件；
+    其他格式每张表输出到 out-dir 下单独的文件。
+
+    :param resumeState: 断点续传时为检查点记录的 sink 的 checkpointState
+    """
+    if options.isPerTable():
+        os.makedirs(options.outDir,exist_ok=True)
+    if options.isColumnar():
+        from columnarsink import ColumnarSink
+        return ColumnarSink(options,resumeState=resumeState)
+    if options.isText():
+        from textsink import TextSink
+        return TextSink(options,resumeState=resumeState)
+    if options.isDatabase():
+        from dbsink import DbSink
+        return DbSink(options)
+    if options.outLayout=="table":
+        return TableSqlSink(options,resumeState)
+    if outfileName is None:
+        return None
+    return createSqlSink(options,options.compressedFileName(outfileName),resumeState=resumeState)
+
+
+def createSqlSink(options:OutputOptions,outfileName:str,rotate:bool=True,resumeState:Dict=None)->RowSink:
+    """
+    :param options: 输出配置
+    :param outfileName: 输出文件名(已带压缩后缀)
+    :param rotate: 是否按 out-file-max-mb / out-file-max-rows 切换文件
+    :param resumeState: 断点续传时为检查点的 checkpointState
+    """
+    output=RotatingOutputFile(options,outfileName,rotate,resumeState)
+    if options.insertMode=="row":
+        if not output.isRotating():
+            #不切换时直接写文件，每行省一次方法调用
+            return SqlSink(output.file,closeFile=True,output=output)
+        return SqlSink(output,closeFile=True,output=output)
+    return BatchSqlSink(output,options.insertMode,options.insertBatchSize,options.commitBatches,closeFile=True)
+
+
+def openSqlFile(options:OutputOptions,outfileName:str,resumeAt:int=None)->io.TextIOWrapper:
+    #用大缓冲区，避免每行一次系统调用
+    return openOutputFile(outfileName,options.writeBufferMb*1024*1024,options.writeQueueSize,
+                          compress=options.outCompress,compressLevel=options.outCompressLevel,
+                          compressThreads=options.compressThreads,resumeAt=resumeAt)
+
+
+def sinkTableName(sql:str,seq:int)->str:
+    return parseTableName(sql) or ("TABLE"+str(seq))
@@ -0,0 +1,92 @@
+import re
+from typing import List, Sequence
+
+
+#引号内的内容原样保留，只有引号外的 :N 才是占位符
+_TOKEN_PATTERN = re.compile(r'"[^"]*"|\'[^\']*\'|:(\d+)')
+
+
+class InsertSqlTemplate:
+    """由 getInsertSql 获取到的 insert 语句编译出的模板
+
+    语句只在每张表开始时解析一次，拆成字面片段和 :N 占位符，
+    之后每行数据用一次 format 拼出完整语句，不再对整条语句反复 replace。
+    按占位符编号取值，:1 不会误匹配 :10 的前缀。
+    """
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        fragments: List[str] = []
+        #各占位符对应的字段下标(从0开始)
+        self.slots: List[int] = []
+        last = 0
+        for m in _TOKEN_PATTERN.finditer(sql):
+            if m.group(1) is None:
+                continue
+            fragments.append(sql[last:m.start()])
+            self.slots.append(int(m.group(1)) - 1)
+            last = m.end()
+        fragments.append(sql[last:])
+        self.fragments = fragments
+
+        fmt = self.fragments[0].replace("{", "{{").replace("}", "}}")
+        for slot, fragment in zip(self.slots, self.fragments[1:]):
+            fmt += "{" + str(slot) + "}" + fragment.replace("{", "{{").replace("}", "}}")
+        self._format = fmt.format
+
+    def render(self, values: Sequence[str]) -> str:
+        """用一行的字段值生成完整的 insert 语句
+
+        :param values: 按字段顺序排列的值，下标对应 :1..:N
+        :return: insert 语句
+        """
+        return self._format(*values)
+
+
+_TABLE_NAME_PATTERN = re.compile(r'INSERT INTO\s+"([^"]+)"')
+
+
+def parseTableName(sql: str) -> str:
+    """从 insert 语句中取出表名，取不到时返回 None"""
+    m = _TABLE_NAME_PATTERN.search(sql)
+    if m is None:
+        return None
+    return m.group(1)
+
+
+_INSERT_PATTERN = re.compile(r'^(\s*INSERT INTO\s+"[^"]+"\s*)\((.*?)\)(\s*VALUES\s*)\((.*)\)(\s*)$', re.DOTALL)
+_COLUMN_NAME_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def parseColumnNames(sql: str) -> List[str]:
+    """从 insert 语句中取出字段名列表，取不到时返回空列表"""
+    m = _INSERT_PATTERN.match(sql)
+    if m is None:
+        return []
+    return _COLUMN_NAME_PATTERN.findall(m.group(2))
+
+
+def splitInsertSql(sql: str):
+    """把 insert 语句拆成 "INSERT INTO 表 (字段...)" 和 "(值...)" 两部分，用于拼多行语句
+
+    :return: (语句头, 值部分)，语句格式不认识时返回 None
+    """
+    m = _INSERT_PATTERN.match(sql)
+    if m is None:
+        return None
+    return m.group(1).rstrip() + " (" + m.group(2) + ")", "(" + m.group(4) + ")"
+
+
+def projectInsertSql(sql: str, columns: List[int]) -> str:
+    """生成只包含部分字段的 insert 语句，占位符重新从 :1 开始编号
+
+    :param sql: 原 insert 语句
+    :param columns: 保留的字段下标(从0开始)，按输出顺序排列
+    :return: 新的 insert 语句
+    """
+    m = _INSERT_PATTERN.match(sql)
+    if m is None:
+        return sql
+    names = _COLUMN_NAME_PATTERN.findall(m.group(2))
+    return (m.group(1) + "(" + ", ".join('"' + names[i] + '"' for i in columns) + ")" + m.group(3)
+            + "(" + ", ".join(":" + str(i + 1) for i in range(len(columns))) + ")" + m.group(5))
@@ -0,0 +1,68 @@
+import fnmatch
+from typing import Dict, List
+
+from common.properties import Properties
+
+
+class TableFilter:
+    """表和字段的选择条件
+
+    表名按通配符(fnmatch)匹配，不区分大小写。include 为空表示全部表，
+    再去掉 exclude 匹配到的表。columns 按表名指定只输出哪些字段。
+    """
+
+    def __init__(self, includes: List[str] = None, excludes: List[str] = None, columns: Dict[str, List[str]] = None):
+        self.includes = [p.upper() for p in (includes or [])]
+        self.excludes = [p.upper() for p in (excludes or [])]
+        self.columns = {}
+        for tableName, names in (columns or {}).items():
+            self.columns[tableName.upper()] = [n.upper() for n in names]
+
+    @classmethod
+    def fromProperties(cls, pros: Properties) -> "TableFilter":
+        """从配置中读取 tables、exclude-tables 和 columns.<表名>"""
+        columns = {}
+        for key, value in pros.properties.items():
+            if key.startswith("columns."):
+                columns[key[len("columns."):]] = splitNames(value)
+        return cls(splitNames(pros.get("tables", "")), splitNames(pros.get("exclude-tables", "")), columns)
+
+    def hasTableFilter(self) -> bool:
+        return len(self.includes) > 0 or len(self.excludes) > 0
+
+    def accept(self, tableName: str) -> bool:
+        name = tableName.upper()
+        if len(self.includes) > 0 and not any(fnmatch.fnmatchcase(name, p) for p in self.includes):
+            return False
+        return not any(fnmatch.fnmatchcase(name, p) for p in self.excludes)
+
+    def acceptColumns(self, tableName: str, columnNames: List[str]) -> bool:
+        """columns.<表名> 中的字段在表中一个都不存在时返回 False，这张表没有可输出的字段，应当跳过，
+        否则会输出没有字段的 insert 语句或空行"""
+        names = self.columns.get(tableName.upper())
+        if names is None:
+            return True
+        upperNames = {c.upper() for c in columnNames}
+        if any(name in upperNames for name in names):
+            return True
+        print("表", tableName, "指定的字段", ",".join(names), "都不存在,跳过这张表")
+        return False
+
+    def columnIndexes(self, tableName: str, columnNames: List[str]) -> List[int]:
+        """取得表要输出的字段下标，没有指定字段时返回 None 表示全部字段"""
+        names = self.columns.get(tableName.upper())
+        if names is None:
+            return None
+        upperNames = [c.upper() for c in columnNames]
+        indexes = []
+        for name in names:
+            if name in upperNames:
+                indexes.append(upperNames.index(name))
+            else:
+                print("表", tableName, "没有字段", name, ",忽略")
+        return indexes
+
+
+def splitNames(value: str) -> List[str]:
+    """把逗号分隔的名称拆成列表"""
+    return [n.strip() for n in value.split(",") if n.strip() != ""]
@@ -0,0 +1,74 @@
+from typing import Dict, List
+
+from dumpformat import OracleField, createField
+from sqltemplate import parseColumnNames, parseTableName
+
+
+class ColumnSpec:
+    """一个字段的定义: insert 语句中的字段名，加上字段定义中的类型码、长度和字符集
+
+    只保存定义，不带解码状态，可以在进程间传递和写入索引文件。
+    """
+    __slots__=("name","typeCode","type","length","charset","nullable")
+
+    def __init__(self,name:str,typeCode:bytes,type:str,length:int,charset:str=None,nullable:bool=True):
+        self.name=name
+        self.typeCode=typeCode
+        #varchar2 / number / date / timestamp，CHAR 字段也是 varchar2
+        self.type=type
+        self.length=length
+        #VARCHAR2/CHAR 的字符集，其他类型为 None
+        self.charset=charset
+        #dump 的字段定义中没有是否可为空的信息，都按可为空处理
+        self.nullable=nullable
+
+    def createField(self)->OracleField:
+        return createField(self.typeCode,self.length,self.charset)
+
+    def toDict(self)->Dict:
+        return {"name":self.name,"typeCode":self.typeCode.hex(),"type":self.type,
+                "length":self.length,"charset":self.charset,"nullable":self.nullable}
+
+    @classmethod
+    def fromDict(cls,data:Dict)->"ColumnSpec":
+        return cls(data["name"],bytes.fromhex(data["typeCode"]),data["type"],data["length"],data["charset"],data["nullable"])
+
+    def __repr__(self)->str:
+        return "{} {}({})".format(self.name,self.type,self.length)
+
+
+class TableSchema:
+    """一张表的结构，读取字段定义时生成一次，之后只读
+
+    随表索引保存到 .dmpidx，并随表分片传给并行的工作进程，工作进程用 createFields 生成解码用的字段，
+    不用再回到 dump 文件中读字段定义。
+    """
+    __slots__=("tableName","columns")
+
+    def __init__(self,tableName:str,columns:List[ColumnSpec]):
+        self.tableName=tableName
+        self.columns=columns
+
+    @classmethod
+    def fromFields(cls,sql:str,fields:List[OracleField],tableName:str=None)->"TableSchema":
+        """由 insert 语句和 readFieldTypes 读出的字段生成，insert 语句中取不到字段名时按 C1、C2... 命名"""
+        names=parseColumnNames(sql)
+        if len(names)!=len(fields):
+            names=["C"+str(i+1) for i in range(len(fields))]
+        columns=[ColumnSpec(name,field.typeCode,field.type,field.defineLen,field.charset)
+                 for name,field in zip(names,fields)]
+        return cls(tableName or parseTableName(sql) or "",columns)
+
+    def names(self)->List[str]:
+        return [c.name for c in self.columns]
+
+    def createFields(self)->List[OracleField]:
+        """生成解码用的字段，每次调用都是新的对象(字段带有各自的解码缓存)"""
+        return [c.createField() for c in self.columns]
+
+    def toDict(self)->Dict:
+        return {"tableName":self.tableName,"columns":[c.toDict() for c in self.columns]}
+
+    @classmethod
+    def fromDict(cls,data:Dict)->"TableSchema":
+        return cls(data["tableName"],[ColumnSpec.fromDict(c) for c in data["columns"]])
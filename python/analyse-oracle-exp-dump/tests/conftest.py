@@ -0,0 +1,5 @@
+import os
+import sys
+
+#各模块按脚本目录互相导入(from dumpformat import ...)，测试时把脚本目录加入搜索路径
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
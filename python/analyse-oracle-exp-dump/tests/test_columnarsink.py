@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+import pytest
+
+pq=pytest.importorskip("pyarrow.parquet")
+
+from columnarsink import ColumnarSink
+from dumpformat import createField
+from sinks import OutputOptions
+
+
+SQL='INSERT INTO "T" ("N") VALUES (:1)\n'
+
+
+def writeNumbers(tmp_path,numberScale:int,values):
+    options=OutputOptions()
+    options.format="parquet"
+    options.numberScale=numberScale
+    fileName=str(tmp_path/"t.parquet")
+    sink=ColumnarSink(options,fileName)
+    sink.beginTable(SQL,[createField(b'\x02\x00',22)])
+    for v in values:
+        sink.writeRow((v,))
+    sink.endTable()
+    sink.close()
+    return pq.read_table(fileName).column("N").to_pylist()
+
+
+def test_number_38_digits(tmp_path):
+    #超过默认 decimal 上下文的28位精度
+    value=Decimal("12345678901234567890123456789012345678")
+    assert writeNumbers(tmp_path,0,[value,None,Decimal("-1.5")])==[value,None,Decimal("-2")]
+
+
+def test_number_scale_rounding(tmp_path):
+    values=writeNumbers(tmp_path,4,[Decimal("12345678901234567890123456.78"),Decimal("0.123456")])
+    assert values==[Decimal("12345678901234567890123456.7800"),Decimal("0.1235")]
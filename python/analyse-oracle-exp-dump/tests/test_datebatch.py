@@ -0,0 +1,56 @@
+import datetime
+
+import pytest
+
+import columnarsink
+from datebatch import decodeDateValues
+from dumpformat import createField
+from dumpgen import encodeDate, encodeTimestamp
+from sinks import OutputOptions
+
+
+VALID_DATE=encodeDate(datetime.datetime(2024,2,29,23,59,58))
+VALID_TIMESTAMP=encodeTimestamp(datetime.datetime(1999,12,31,0,0,1,5000))
+#2月30日、月份为0、小时字节为0
+INVALID_DATES=[b'\x78\x7c\x02\x1e\x01\x01\x01',b'\x78\x7c\x00\x01\x01\x01\x01',b'\x78\x7c\x01\x01\x00\x01\x01']
+#纳秒超过 999999999
+INVALID_TIMESTAMP=b'\x78\x7c\x01\x01\x01\x01\x01'+(1000000000).to_bytes(4,"big")
+
+DATES=[VALID_DATE,None]+INVALID_DATES
+TIMESTAMPS=[VALID_TIMESTAMP,None,VALID_DATE,INVALID_TIMESTAMP,INVALID_DATES[0]]
+
+
+def test_decode_date_values():
+    assert decodeDateValues(DATES)==[datetime.datetime(2024,2,29,23,59,58),None,None,None,None]
+    assert decodeDateValues(TIMESTAMPS)==[datetime.datetime(1999,12,31,0,0,1,5000),None,datetime.datetime(2024,2,29,23,59,58),None,None]
+
+
+def test_numpy_matches_per_value():
+    np=pytest.importorskip("numpy")
+    from datebatch import decodeDateColumn
+    for values,unit,width in ((DATES,"s",7),(TIMESTAMPS,"us",11)):
+        array,mask=decodeDateColumn(values,unit,width)
+        converted=[None if m else v.astype("datetime64[us]").item() for v,m in zip(array,mask)]
+        assert converted==decodeDateValues(values)
+
+
+def writeDates(fileName:str):
+    options=OutputOptions()
+    options.format="parquet"
+    sink=columnarsink.ColumnarSink(options,fileName)
+    sink.beginTable('INSERT INTO "T" ("D", "TS") VALUES (:1, :2)\n',[createField(b'\x0c\x00',7),createField(b'\xb4\x00',11)])
+    for row in zip(DATES,TIMESTAMPS):
+        sink.writeRow(row)
+    sink.endTable()
+    sink.close()
+    return columnarsink.pq.read_table(fileName).to_pylist()
+
+
+def test_columnar_same_with_and_without_numpy(tmp_path,monkeypatch):
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("numpy")
+    withNumpy=writeDates(str(tmp_path/"np.parquet"))
+    monkeypatch.setattr(columnarsink,"np",None)
+    withoutNumpy=writeDates(str(tmp_path/"py.parquet"))
+    assert withNumpy==withoutNumpy
+    assert [r["D"] for r in withNumpy]==decodeDateValues(DATES)
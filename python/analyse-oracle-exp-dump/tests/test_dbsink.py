@@ -0,0 +1,79 @@
+import datetime
+import sqlite3
+import sys
+from decimal import Decimal
+
+import pytest
+
+from dbsink import DbAdapter, DbSink, SqliteAdapter
+from dumpapi import iterRows, iterTables
+from dumpgen import DEFAULT_COLUMNS, generate, parseColumnMix
+from sinks import OutputOptions
+
+
+ROWS=[500,0,1234]
+
+
+def sqliteValue(value):
+    """与 SqliteAdapter 注册的转换一致"""
+    if isinstance(value,datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value,Decimal):
+        return str(value)
+    return value
+
+
+@pytest.fixture
+def dumpFile(tmp_path):
+    fileName=str(tmp_path/"gen.dmp")
+    generate(fileName,len(ROWS),parseColumnMix(DEFAULT_COLUMNS),ROWS,decimals=True)
+    return fileName
+
+
+def test_adapter_is_abstract():
+    with pytest.raises(TypeError):
+        DbAdapter()
+
+
+def test_sqlite_prepare_sql():
+    adapter=SqliteAdapter(":memory:")
+    assert adapter.prepareSql('INSERT INTO "T" ("A:1", "B") VALUES (:1, :2)\n')=='INSERT INTO "T" ("A:1", "B") VALUES (?1, ?2)'
+
+
+def test_extract_to_sqlite(dumpFile,tmp_path,monkeypatch):
+    dbFile=str(tmp_path/"out.db")
+    monkeypatch.chdir(tmp_path)
+    with open("app.properties","w",encoding="utf-8") as pros:
+        pros.write("dump-file="+dumpFile+"\nout-format=db\ndb-type=sqlite\ndb-dsn="+dbFile+"\n"
+                   "db-pool-size=1\ndb-batch-size=100\ndb-commit-batches=2\nresume-interval=0\n")
+    monkeypatch.setattr(sys,"argv",["dump_analyse.py"])
+    #dump_analyse 导入时在当前目录下创建日志文件
+    import dump_analyse
+    dump_analyse.main()
+
+    conn=sqlite3.connect(dbFile)
+    try:
+        for table in iterTables(dumpFile):
+            expected=[tuple(sqliteValue(v) for v in row) for row in iterRows(table)]
+            rows=conn.execute('SELECT * FROM "'+table.name+'" ORDER BY rowid').fetchall()
+            assert len(rows)==ROWS[table.seq-1]
+            #一个写入线程时按解析顺序写入
+            assert rows[:5]==expected[:5]
+            assert rows[-1:]==expected[-1:]
+    finally:
+        conn.close()
+
+
+def test_db_sink_reports_write_error(tmp_path):
+    options=OutputOptions()
+    options.format="db"
+    options.dbType="sqlite"
+    options.dbDsn=str(tmp_path/"err.db")
+    options.dbPoolSize=1
+    options.dbBatchSize=1
+    sink=DbSink(options)
+    sink.beginTable('INSERT INTO "T" ("A") VALUES (:1)\n',[])
+    #字段数与语句不一致，executemany 出错
+    sink.writeRow((1,2))
+    with pytest.raises(sqlite3.Error):
+        sink.close()
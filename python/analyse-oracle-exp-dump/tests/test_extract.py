@@ -0,0 +1,93 @@
+import csv
+import glob
+import gzip
+import os
+import shutil
+import sys
+
+import pytest
+
+from dumpformat import readDumpHeader
+from dumpgen import DEFAULT_COLUMNS, generate, parseColumnMix
+from dumpindex import scanTables
+from dumpreader import DumpReader
+
+
+ROWS=[300,0,200,150]
+
+
+@pytest.fixture
+def dumpFile(tmp_path):
+    fileName=str(tmp_path/"gen.dmp")
+    generate(fileName,len(ROWS),parseColumnMix(DEFAULT_COLUMNS),ROWS)
+    return fileName
+
+
+def runMain(tmp_path,monkeypatch,properties:str,*args:str):
+    """在 tmp_path 下按指定配置运行一次 dump_analyse"""
+    monkeypatch.chdir(tmp_path)
+    with open("app.properties","w",encoding="utf-8") as pros:
+        pros.write(properties+"resume-interval=0\nread-ahead-mb=0\n")
+    monkeypatch.setattr(sys,"argv",["dump_analyse.py"]+list(args))
+    #dump_analyse 导入时在当前目录下创建日志文件
+    import dump_analyse
+    dump_analyse.main()
+
+
+@pytest.mark.parametrize("properties",["out-layout=table\n","out-format=csv\n"])
+def test_table_files_named_by_dump_seq(dumpFile,tmp_path,monkeypatch,properties):
+    names={}
+    for parallel in ("0","3"):
+        outDir=str(tmp_path/("out"+parallel))
+        runMain(tmp_path,monkeypatch,"dump-file="+dumpFile+"\nout-dir="+outDir+"\n"+properties,"-t","T0002,T0004","-p",parallel)
+        names[parallel]=sorted(os.listdir(outDir))
+    assert names["0"]==names["3"]
+    assert [n.split(".")[0] for n in names["0"]]==["0002-T0002","0004-T0004"]
+
+
+def rowOffset(dumpFile:str,seq:int,rowNo:int)->int:
+    """第 seq 张表第 rowNo 条记录(从0开始)的起始位置"""
+    with DumpReader(dumpFile) as f:
+        charsetName=readDumpHeader(f,printDetail=False).data
+        entry=scanTables(f,charsetName,checkpointRows=rowNo).data[seq-1]
+    return dict((n,o) for o,n in entry.checkpoints)[rowNo]
+
+
+def csvRows(fileName:str)->int:
+    with open(fileName,encoding="utf-8",newline="") as f:
+        return sum(1 for row in csv.reader(f))
+
+
+def test_row_index_with_table_filter(dumpFile,tmp_path,monkeypatch):
+    outDir=str(tmp_path/"out")
+    rowIndex=hex(rowOffset(dumpFile,3,50))
+    runMain(tmp_path,monkeypatch,"dump-file="+dumpFile+"\nout-dir="+outDir+"\nout-format=csv\n","-t","T0003,T0004","-r",rowIndex)
+    assert csvRows(os.path.join(outDir,"0003-T0003.csv"))==ROWS[2]-50
+    assert csvRows(os.path.join(outDir,"0004-T0004.csv"))==ROWS[3]
+
+
+def test_row_index_outside_first_table(dumpFile,tmp_path,monkeypatch):
+    outDir=str(tmp_path/"out")
+    rowIndex=hex(rowOffset(dumpFile,1,50))
+    runMain(tmp_path,monkeypatch,"dump-file="+dumpFile+"\nout-dir="+outDir+"\nout-format=csv\n","-t","T0003","-r",rowIndex)
+    assert not os.path.exists(outDir) or os.listdir(outDir)==[]
+
+
+def test_serial_parallel_gzip_same_output(dumpFile,tmp_path,monkeypatch):
+    gzFile=dumpFile+".gz"
+    with open(dumpFile,"rb") as src, gzip.open(gzFile,"wb") as dst:
+        shutil.copyfileobj(src,dst)
+    outputs={}
+    for name,fileName,args in (("serial",dumpFile,[]),("gzip",gzFile,[]),("parallel",dumpFile,["-p","3"])):
+        outDir=str(tmp_path/name)
+        #行数多的表切成多个分片
+        runMain(tmp_path,monkeypatch,"dump-file="+fileName+"\nout-file="+outDir+".sql\nout-dir="+outDir+"\n"
+                "checkpoint-rows=40\nshard-rows=80\nuse-index=false\n",*args)
+        parts=sorted(glob.glob(os.path.join(outDir,"*.sql"))) if name=="parallel" else [outDir+".sql"]
+        outputs[name]=b""
+        for part in parts:
+            with open(part,"rb") as f:
+                outputs[name]+=f.read()
+    assert outputs["serial"].count(b"INSERT INTO")==sum(ROWS)
+    assert outputs["gzip"]==outputs["serial"]
+    assert outputs["parallel"]==outputs["serial"]
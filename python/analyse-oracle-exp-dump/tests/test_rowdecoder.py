@@ -0,0 +1,86 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from dumpformat import NULL_LEN, createField
+from dumpgen import encodeDate, encodeNumber, encodeTimestamp
+from numbercodec import decodeNumber
+from rowdecoder import compileRowDecoder
+
+
+NUMBERS=[0,1,-1,99,-99,100,-100,101,-101,10**18,-(10**18),123456789,-123456789,10**37+1,
+         Decimal("0.05"),Decimal("-0.05"),Decimal("3.14159"),Decimal("-1234.5678"),
+         Decimal("1E-100"),Decimal("-1E-100"),Decimal("1E+100"),Decimal("-1E+100"),Decimal("9.99E+125"),
+         #指数字节为 0x80(正数)和 0x7f(负数)的最小指数
+         Decimal("1E-130"),Decimal("-1E-130"),Decimal("1.2345E-129")]
+
+FIELDS=[createField(b'\x01\x00',20,"utf-8"),createField(b'\x02\x00',22),createField(b'\x0c\x00',7),
+        createField(b'\xb4\x00',11),createField(b'\x60\x00',1,"utf-8")]
+DATE=datetime.datetime(2024,2,29,23,59,58)
+TIMESTAMP=datetime.datetime(1999,12,31,0,0,1,5000)
+ROWS=[("ab\n中文",Decimal("-12.5"),DATE,TIMESTAMP,"Y"),
+      (None,None,None,None,None),
+      ("x",10**18,DATE,DATE,"N")]
+
+
+def encodeRow(row)->memoryview:
+    data=b''
+    for value,encode in zip(row,(lambda v:v.encode("utf-8"),encodeNumber,encodeDate,encodeTimestamp,lambda v:v.encode("utf-8"))):
+        if value is None:
+            data+=NULL_LEN.to_bytes(2,"little",signed=True)
+            continue
+        value=encode(value)
+        data+=len(value).to_bytes(2,"little")+value
+    return memoryview(data)
+
+
+@pytest.mark.parametrize("value",NUMBERS)
+def test_number_round_trip(value):
+    data=encodeNumber(value)
+    text=decodeNumber(memoryview(data),0,len(data))
+    assert Decimal(text)==Decimal(value)
+
+
+def test_number_smallest_exponent():
+    assert encodeNumber(Decimal("1E-130"))==b'\x80\x02'
+    assert decodeNumber(memoryview(b'\x80\x02'),0,2)=="0."+"0"*129+"1"
+    assert decodeNumber(memoryview(b'\x80'),0,1)=="0"
+
+
+def test_number_invalid():
+    assert decodeNumber(memoryview(b''),0,0) is None
+    #只有指数字节没有尾数
+    assert decodeNumber(memoryview(b'\xc2'),0,1) is None
+
+
+@pytest.mark.parametrize("row",ROWS)
+def test_native_row(row):
+    buf=encodeRow(row)
+    values,pos=compileRowDecoder(FIELDS,native=True)(buf,0)
+    assert values==row
+    assert pos==len(buf)
+
+
+def test_sql_row():
+    buf=encodeRow(ROWS[0])
+    values,pos=compileRowDecoder(FIELDS)(buf,0)
+    assert values==["'ab\n中文'","-12.5","to_date('2024-02-29 23:59:58', 'yyyy-MM-dd HH24:MI:ss')",
+                    "to_timestamp('1999-12-31 00:00:01.005', 'yyyy-MM-dd HH24:MI:ss.ff')","'Y'"]
+    assert pos==len(buf)
+    buf=encodeRow(ROWS[1])
+    assert compileRowDecoder(FIELDS)(buf,0)==(["null"]*5,len(buf))
+
+
+def test_columns_skip_others():
+    buf=encodeRow(ROWS[0])
+    values,pos=compileRowDecoder(FIELDS,[3,0],native=True,numberType="str")(buf,0)
+    assert values==(TIMESTAMP,ROWS[0][0])
+    assert pos==len(buf)
+
+
+def test_number_types():
+    buf=encodeRow(ROWS[0])
+    for numberType,expected in (("str","-12.5"),("decimal",Decimal("-12.5")),("int",-12)):
+        values,pos=compileRowDecoder(FIELDS,[1],native=True,numberType=numberType)(buf,0)
+        assert values==(expected,)
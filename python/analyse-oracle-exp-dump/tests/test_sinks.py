@@ -0,0 +1,39 @@
+from sinks import OutputOptions, checkOutputOptions
+
+
+def dbOptions()->OutputOptions:
+    options=OutputOptions()
+    options.format="db"
+    options.dbType="sqlite"
+    options.dbDsn=":memory:"
+    return options
+
+
+def test_db_number_type_checked():
+    options=dbOptions()
+    options.numberType="float"
+    ret=checkOutputOptions(options)
+    assert ret.isError()
+    assert "number-type" in ret.msg
+
+
+def test_db_options_ok():
+    assert checkOutputOptions(dbOptions()).isSuccess()
+
+
+def test_compress_checked_for_all_formats():
+    options=OutputOptions()
+    options.format="parquet"
+    options.outCompress="bogus"
+    assert "out-compress" in checkOutputOptions(options).msg
+    options.outCompress="gzip"
+    assert "out-compress" in checkOutputOptions(options).msg
+    options=dbOptions()
+    options.outCompress="gzip"
+    assert checkOutputOptions(options).isError()
+
+
+def test_layout_checked_for_all_formats():
+    options=dbOptions()
+    options.outLayout="bogus"
+    assert "out-layout" in checkOutputOptions(options).msg
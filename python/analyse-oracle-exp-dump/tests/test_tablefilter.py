@@ -0,0 +1,16 @@
+from tablefilter import TableFilter
+
+
+def test_column_indexes():
+    tableFilter=TableFilter(columns={"t1":["c", "a", "missing"]})
+    assert tableFilter.columnIndexes("T1",["A","B","C"])==[2,0]
+    assert tableFilter.columnIndexes("T2",["A"]) is None
+
+
+def test_accept_columns():
+    tableFilter=TableFilter(columns={"T1":["X","Y"],"T2":["a"]})
+    #指定的字段都不存在
+    assert not tableFilter.acceptColumns("t1",["A","B"])
+    assert tableFilter.acceptColumns("T2",["A","B"])
+    #没有指定字段的表输出全部字段
+    assert tableFilter.acceptColumns("T3",["A"])
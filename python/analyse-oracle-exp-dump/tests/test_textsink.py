@@ -0,0 +1,30 @@
+import csv
+import os
+
+from dumpformat import createField
+from sinks import OutputOptions
+from textsink import TextSink
+
+
+ROWS=[("a\nb","1"),("c\r\nd",None),("e","2")]
+
+
+def test_sqlldr_value_with_newline(tmp_path):
+    options=OutputOptions()
+    options.format="sqlldr"
+    options.outDir=str(tmp_path)
+    sink=TextSink(options)
+    sink.beginTable('INSERT INTO "T" ("S", "N") VALUES (:1, :2)\n',[createField(b'\x01\x00',10),createField(b'\x02\x00',22)])
+    for row in ROWS:
+        sink.writeRow(row)
+    sink.endTable()
+
+    dataFile=str(tmp_path/"0001-T.dat")
+    with open(os.path.splitext(dataFile)[0]+".ctl",encoding="utf-8") as ctl:
+        assert "INFILE '0001-T.dat' \"str X'1E0A'\"\n" in ctl.read()
+    with open(dataFile,"rb") as f:
+        records=f.read().decode("utf-8").split("\x1e\n")
+    #最后一条记录之后也有结束符
+    assert records[-1]==""
+    assert len(records)==len(ROWS)+1
+    assert [tuple(next(csv.reader([r]))) for r in records[:-1]]==[(s,n or "") for s,n in ROWS]
@@ -0,0 +1,64 @@
+import gzip
+
+import pytest
+
+from dumpformat import readDumpHeader
+from dumpgen import DEFAULT_COLUMNS, generate, parseColumnMix
+from dumpreader import openDumpReader
+from verify import verifyDump
+
+
+ROWS=[300,0,200]
+
+
+def verifyFile(fileName:str):
+    with openDumpReader(fileName) as f:
+        charsetName=readDumpHeader(f,printDetail=False).data
+        return verifyDump(f,fileName,charsetName)
+
+
+@pytest.fixture
+def dumpData(tmp_path)->bytes:
+    fileName=str(tmp_path/"full.dmp")
+    generate(fileName,len(ROWS),parseColumnMix(DEFAULT_COLUMNS),ROWS)
+    with open(fileName,"rb") as f:
+        return f.read()
+
+
+def writeFile(tmp_path,name:str,data:bytes,compress:bool=False)->str:
+    fileName=str(tmp_path/name)
+    with (gzip.open if compress else open)(fileName,"wb") as f:
+        f.write(data)
+    return fileName
+
+
+@pytest.mark.parametrize("compress",[False,True])
+def test_intact(tmp_path,dumpData,compress):
+    report=verifyFile(writeFile(tmp_path,"ok.dmp",dumpData,compress))
+    assert report.isOk()
+    assert [t.rowCount for t in report.tables]==ROWS
+    assert report.tables[1].endOffset==report.tables[1].dataOffset+2
+
+
+@pytest.mark.parametrize("compress",[False,True])
+def test_truncated_between_tables(tmp_path,dumpData,compress):
+    #在第三张表之前截断，前两张表都是完整的
+    cut=dumpData.index(b'CREATE TABLE "T0003"')
+    report=verifyFile(writeFile(tmp_path,"cut.dmp",dumpData[:cut],compress))
+    assert not report.isOk()
+    assert [t.rowCount for t in report.tables]==ROWS[:2]
+    assert report.errorOffset==report.tables[-1].endOffset
+
+
+def test_no_trailer(tmp_path):
+    fileName=str(tmp_path/"notrailer.dmp")
+    generate(fileName,2,parseColumnMix(DEFAULT_COLUMNS),[10],trailer=False)
+    report=verifyFile(fileName)
+    assert not report.isOk()
+    assert len(report.tables)==2
+
+
+def test_truncated_in_table(tmp_path,dumpData):
+    report=verifyFile(writeFile(tmp_path,"short.dmp",dumpData[:len(dumpData)//2]))
+    assert not report.isOk()
+    assert report.errorTable is not None
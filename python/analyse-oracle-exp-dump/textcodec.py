@@ -0,0 +1,75 @@
+import codecs
+from typing import Callable, Dict
+
+
+#每个字段最多缓存多少个不同的值，满了以后新的值不再加入缓存
+CACHE_SIZE=4096
+#每查找这么多次检查一次命中率
+CACHE_WINDOW=8192
+#命中率低于这个值时停用缓存(字段值基本不重复，缓存只会多一次查找)
+CACHE_MIN_HIT_RATE=0.5
+
+#这些字符集用 str() 按名称解码时 CPython 有内置的快速路径，纯 ASCII 的内容直接复制，
+#其他字符集(如 gbk)按名称解码时每次都要查找编解码器，改为预先取得解码函数
+_BUILTIN_CHARSETS=("utf-8","ascii","latin-1")
+
+
+def textDecoder(charset:str)->Callable[[memoryview],str]:
+    """取得把字节解码成字符串的函数，无法解码的字节忽略
+
+    :param charset: 字符集名称，见 dumpformat.oracleCharsetCodeMapDict
+    """
+    if charset in _BUILTIN_CHARSETS:
+        return lambda data:str(data,charset,'ignore')
+    decode=codecs.getdecoder(charset)
+    return lambda data:decode(data,'ignore')[0]
+
+
+class TextDecodeCache:
+    """一个 VARCHAR2/CHAR 字段的解码缓存: 原始字节 -> 字符串
+
+    状态码、地区名这类取值很少的字段同样的字节会解码几百万次，查缓存比解码快。
+    用 dump 缓冲区的 memoryview 切片直接查找(与 bytes 的哈希和比较相同)，只有没命中时才复制成 bytes 作为键。
+    每 CACHE_WINDOW 次查找检查一次命中率，低于 CACHE_MIN_HIT_RATE 时清空并停用缓存，之后直接解码。
+    """
+
+    def __init__(self,charset:str,maxSize:int=CACHE_SIZE,window:int=CACHE_WINDOW,minHitRate:float=CACHE_MIN_HIT_RATE):
+        rawDecode=textDecoder(charset)
+        values:Dict[bytes,str]={}
+        get=values.get
+        lookups=0
+        misses=0
+        nextCheck=window
+        enabled=maxSize>0
+
+        def decode(data:memoryview)->str:
+            nonlocal lookups,misses,nextCheck,enabled
+            if not enabled:
+                return rawDecode(data)
+            lookups+=1
+            value=get(data)
+            if value is not None:
+                return value
+            misses+=1
+            value=rawDecode(data)
+            if len(values)<maxSize:
+                values[bytes(data)]=value
+            #只在没命中时检查，命中率高时不会走到这里
+            if lookups>=nextCheck:
+                nextCheck=lookups+window
+                if lookups-misses<lookups*minHitRate:
+                    enabled=False
+                    values.clear()
+            return value
+
+        def stats()->Dict:
+            return {
+                "lookups":lookups,
+                "hits":lookups-misses,
+                "hitRate":round((lookups-misses)/lookups,4) if lookups>0 else 0,
+                "size":len(values),
+                "enabled":enabled,
+            }
+
+        self.decode=decode
+        self.stats=stats
@@ -0,0 +1,158 @@
+import csv
+import io
+import os
+from typing import Dict, List, Sequence
+
+from dumpformat import OracleField
+from pipeline import openOutputFile, syncOutputFile
+from sinks import OutputOptions, RowSink, sinkTableName, tableFileName
+from sqltemplate import parseColumnNames
+
+
+#PostgreSQL COPY 文本格式需要转义的字符
+_COPY_ESCAPE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+#SQL*Loader 控制文件中的字符集名称
+_SQLLDR_CHARSETS = {
+    "utf-8": "UTF8",
+    "gbk": "ZHS16GBK",
+    "ascii": "US7ASCII",
+}
+
+#SQL*Loader 数据文件的记录结束符: 字段值中可能有换行，csv 会把换行原样放在引号内，
+#默认的按行分记录会把这种记录拆开，所以用数据中不会出现的 \x1e(记录分隔符)加换行作为记录结束符
+_SQLLDR_TERMINATOR = "\x1e\n"
+
+#SQL*Loader 控制文件中日期类型字段的格式
+_SQLLDR_TYPES = {
+    "date": ' DATE "YYYY-MM-DD HH24:MI:SS"',
+    "timestamp": ' TIMESTAMP "YYYY-MM-DD HH24:MI:SS.FF"',
+}
+
+
+class TextSink(RowSink):
+    """把记录的原始值(不加 sql 引号)写成文本数据文件，每张表一个文件
+
+    支持的格式:
+      csv    - 逗号分隔，需要时加双引号，null 为空
+      tsv    - 制表符分隔，其余同 csv
+      copy   - PostgreSQL COPY 文本格式，null 为 \\N，同时生成 psql 的 \\copy 导入脚本
+      sqlldr - Oracle SQL*Loader 数据文件(同 csv，但每条记录以 \x1e 加换行结束，字段值中可以有换行)，同时生成 .ctl 控制文件
+    行先攒在内存中，达到 write-buffer-mb 后编码成字节一次写出。
+    """
+    native=True
+    #NUMBER 直接取十进制字符串，不转换成 int/Decimal
+    numberType="str"
+
+    def __init__(self,options:OutputOptions,fileName:str=None,tableFile:str=None,firstPart:bool=True,resumeState:Dict=None):
+        """
+        :param options: 输出配置
+        :param fileName: 指定时所有记录都写入这个文件(并行模式下的一个表分片)，
+                         否则每张表在 options.outDir 下单独生成文件
+        :param tableFile: 分片合并后的表文件名，导入脚本/控制文件按这个名字引用数据文件
+        :param firstPart: 是否为表的第一个分片，只有第一个分片输出表头和导入脚本
+        :param resumeState: 断点续传时为检查点的 checkpointState
+        """
+        self.options=options
+        self.fileName=fileName
+        self.tableFile=tableFile
+        self.firstPart=firstPart
+        #当前表在 dump 文件中的顺序号
+        self.tableSeq=0
+        self.outfile=None
+        self.buffer=io.StringIO()
+        self.writer=None
+        self.flushChars=options.writeBufferMb*1024*1024
+        #检查点在表中间时，当前表的文件从这个位置接着写
+        self.resumeAt:int=None
+        if resumeState is not None:
+            self.tableSeq=resumeState["tableSeq"]
+            self.resumeAt=resumeState["position"]
+
+    def beginTable(self,sql:str,fields:List[OracleField],seq:int=0):
+        resumeAt=self.resumeAt
+        self.resumeAt=None
+        if seq>0:
+            self.tableSeq=seq
+        elif resumeAt is None:
+            self.tableSeq+=1
+        fileName=self.fileName
+        if fileName is None:
+            fileName=tableFileName(self.options.outDir,self.tableSeq,sinkTableName(sql,self.tableSeq),self.options.fileSuffix())
+        tableFile=self.tableFile or fileName
+        #数据已经攒成大块，文件用默认大小的缓冲区即可
+        self.outfile=openOutputFile(fileName,0,self.options.writeQueueSize,text=False,compress=self.options.outCompress,
+                                    compressLevel=self.options.outCompressLevel,compressThreads=self.options.compressThreads,
+                                    resumeAt=resumeAt)
+        self.buffer=io.StringIO()
+
+        fmt=self.options.format
+        if fmt=="csv":
+            self.writer=csv.writer(self.buffer,lineterminator="\n")
+        elif fmt=="sqlldr":
+            self.writer=csv.writer(self.buffer,lineterminator=_SQLLDR_TERMINATOR)
+        elif fmt=="tsv":
+            self.writer=csv.writer(self.buffer,delimiter="\t",lineterminator="\n")
+        else:
+            self.writer=None
+
+        names=parseColumnNames(sql)
+        #续传时表头和导入脚本已经输出过
+        if not self.firstPart or resumeAt is not None:
+            return
+        if self.options.csvHeader and fmt in ("csv","tsv"):
+            self.writer.writerow(names)
+        if fmt=="copy":
+            self.writeCopyScript(tableFile,sql,names)
+        elif fmt=="sqlldr":
+            self.writeControlFile(tableFile,sql,names,fields)
+
+    def writeRow(self,values:Sequence):
+        if self.writer is not None:
+            self.writer.writerow(values)
+        else:
+            self.buffer.write("\t".join("\\N" if v is None else str(v).translate(_COPY_ESCAPE) for v in values))
+            self.buffer.write("\n")
+        if self.buffer.tell()>=self.flushChars:
+            self.flush()
+
+    def flush(self):
+        data=self.buffer.getvalue()
+        if len(data)>0:
+            self.outfile.write(data.encode(self.options.outEncoding))
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+    def endTable(self):
+        self.flush()
+        self.outfile.close()
+        self.outfile=None
+
+    def checkpointState(self)->Dict:
+        position=None
+        if self.outfile is not None:
+            self.flush()
+            position=syncOutputFile(self.outfile)
+        return {"tableSeq":self.tableSeq,"position":position}
+
+    def writeCopyScript(self,tableFile:str,sql:str,names:List[str]):
+        """生成 psql 导入脚本: psql -f xxx.load.sql"""
+        tableName=sinkTableName(sql,self.tableSeq)
+        with open(os.path.splitext(tableFile)[0]+".load.sql","w",encoding="utf-8") as script:
+            script.write('\\copy "'+tableName+'" ('+", ".join('"'+n+'"' for n in names)+") FROM '"
+                         +os.path.basename(tableFile)+"' WITH (FORMAT text, ENCODING '"+self.options.outEncoding+"')\n")
+
+    def writeControlFile(self,tableFile:str,sql:str,names:List[str],fields:List[OracleField]):
+        """生成 SQL*Loader 控制文件: sqlldr control=xxx.ctl"""
+        tableName=sinkTableName(sql,self.tableSeq)
+        columns=[]
+        for name,field in zip(names,fields):
+            columns.append('  "'+name+'"'+_SQLLDR_TYPES.get(field.type,""))
+        with open(os.path.splitext(tableFile)[0]+".ctl","w",encoding="utf-8") as ctl:
+            ctl.write("LOAD DATA\n")
+            ctl.write("CHARACTERSET "+_SQLLDR_CHARSETS.get(self.options.outEncoding.lower(),self.options.outEncoding)+"\n")
+            ctl.write("INFILE '"+os.path.basename(tableFile)+"' \"str X'"+_SQLLDR_TERMINATOR.encode("ascii").hex().upper()+"'\"\n")
+            ctl.write('APPEND INTO TABLE "'+tableName+'"\n')
+            ctl.write("FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"'\n")
+            ctl.write("TRAILING NULLCOLS\n")
+            ctl.write("(\n"+",\n".join(columns)+"\n)\n")
@@ -0,0 +1,279 @@
+import json
+import os
+import struct
+import time
+from typing import Dict, List
+
+from common.result import  Result
+from dumpformat import DUMP_END_MSG, NULL_LEN, getInsertSql, readFieldTypes
+from dumpreader import DumpReader
+from progress import Progress
+from rowdecoder import compileRowVerifier, maxRowSize
+from sqltemplate import parseTableName
+from tableschema import TableSchema
+
+
+_I16=struct.Struct('<h')
+
+#没有进度输出时，每校验多少行报告一次预读位置
+VERIFY_CHECK_ROWS=4096
+
+
+class ColumnOverflow:
+    """实际长度超出定义长度的字段"""
+
+    def __init__(self,index:int,name:str,type:str,defineLen:int):
+        #字段下标，从0开始
+        self.index=index
+        self.name=name
+        self.type=type
+        self.defineLen=defineLen
+        #超出定义长度的值的个数
+        self.count=0
+        self.maxLen=0
+        #第一个超出的值(长度前缀)的文件位置
+        self.firstOffset:int=None
+
+    def add(self,size:int,offset:int):
+        self.count+=1
+        if size>self.maxLen:
+            self.maxLen=size
+        if self.firstOffset is None:
+            self.firstOffset=offset
+
+    def toDict(self)->Dict:
+        return {"index":self.index,"name":self.name,"type":self.type,"defineLen":self.defineLen,
+                "count":self.count,"maxLen":self.maxLen,"firstOffset":hex(self.firstOffset)}
+
+
+class TableVerifyResult:
+    """一张表的校验结果"""
+
+    def __init__(self,seq:int,sql:str,insertOffset:int):
+        #表在 dump 文件中的顺序号，从1开始
+        self.seq=seq
+        self.sql=sql
+        self.tableName=parseTableName(sql) or ("TABLE"+str(seq))
+        self.insertOffset=insertOffset
+        self.schema:TableSchema=None
+        #第一条记录的起始位置
+        self.dataOffset:int=None
+        #表数据结束标记 \xff\xff 之后的位置
+        self.endOffset:int=None
+        #完整的记录数，出错时为出错之前的记录数
+        self.rowCount=0
+        #字段下标: 超出定义长度的情况
+        self.overflows:Dict[int,ColumnOverflow]={}
+
+    def addOverflow(self,index:int,size:int,offset:int):
+        overflow=self.overflows.get(index)
+        if overflow is None:
+            column=self.schema.columns[index]
+            overflow=self.overflows[index]=ColumnOverflow(index,column.name,column.type,column.length)
+        overflow.add(size,offset)
+
+    def toDict(self)->Dict:
+        return {
+            "seq":self.seq,
+            "tableName":self.tableName,
+            "insertOffset":hex(self.insertOffset),
+            "dataOffset":hex(self.dataOffset) if self.dataOffset is not None else None,
+            "endOffset":hex(self.endOffset) if self.endOffset is not None else None,
+            "rowCount":self.rowCount,
+            "dataBytes":self.endOffset-self.dataOffset if self.endOffset is not None else None,
+            "columns":self.schema.toDict()["columns"] if self.schema is not None else None,
+            "overLength":[o.toDict() for o in sorted(self.overflows.values(),key=lambda o:o.index)],
+        }
+
+
+class VerifyReport:
+    """整个 dump 文件的校验结果，也可以当作 dump 文件内容(表、行数、字段定义)的清单"""
+
+    def __init__(self,fileName:str,charsetName:str):
+        self.fileName=fileName
+        self.charsetName=charsetName
+        self.tables:List[TableVerifyResult]=[]
+        #第一个损坏的位置，没有损坏时为 None
+        self.errorOffset:int=None
+        #损坏所在记录的起始位置(也就是最后一条完整记录之后的位置)
+        self.errorRowOffset:int=None
+        self.errorTable:str=None
+        self.errorMsg:str=None
+        self.bytesVerified=0
+        self.startTime=time.monotonic()
+        self.seconds=0.0
+
+    def isOk(self)->bool:
+        return self.errorOffset is None
+
+    def fail(self,table:TableVerifyResult,offset:int,msg:str,rowOffset:int=None):
+        self.errorOffset=offset
+        self.errorRowOffset=rowOffset
+        self.errorTable=table.tableName if table is not None else None
+        self.errorMsg=msg
+
+    def totalRows(self)->int:
+        return sum(t.rowCount for t in self.tables)
+
+    def toDict(self)->Dict:
+        st=os.stat(self.fileName)
+        return {
+            "dumpFile":os.path.abspath(self.fileName),
+            "size":st.st_size,
+            "mtime":st.st_mtime_ns,
+            "charset":self.charsetName,
+            "ok":self.isOk(),
+            "error":None if self.isOk() else {
+                "offset":hex(self.errorOffset),
+                "rowOffset":hex(self.errorRowOffset) if self.errorRowOffset is not None else None,
+                "table":self.errorTable,
+                "msg":self.errorMsg,
+            },
+            "tableCount":len(self.tables),
+            "rows":self.totalRows(),
+            "bytesVerified":self.bytesVerified,
+            "seconds":round(self.seconds,3),
+            "mbPerSec":round(self.bytesVerified/self.seconds/1024/1024,3) if self.seconds>0 else 0,
+            "tables":[t.toDict() for t in self.tables],
+        }
+
+    def save(self,fileName:str):
+        with open(fileName,"w",encoding="utf-8") as out:
+            json.dump(self.toDict(),out,ensure_ascii=False,indent=2)
+        print("校验报告已保存到",os.path.abspath(fileName))
+
+
+def inspectRow(buf:memoryview,pos:int,base:int,table:TableVerifyResult)->Result:
+    """逐个字段检查一行记录，记录超出定义长度的字段
+
+    :return: 结果，由Result包装，data 为下一行起始位置；字段长度为负数时返回错误，data 为该字段的位置
+    """
+    for i,column in enumerate(table.schema.columns):
+        size=_I16.unpack_from(buf,pos)[0]
+        if size==NULL_LEN:
+            pos+=2
+            continue
+        if size<0:
+            return Result.errorResult(data=pos,msg="字段 "+column.name+" 长度不正确: "+str(size)+"，file offset="+hex(base+pos))
+        if size>column.length:
+            table.addOverflow(i,size,base+pos)
+        pos+=size+2
+    return Result.successResult(data=pos)
+
+
+def verifyTableRows(f:DumpReader,table:TableVerifyResult,report:VerifyReport,progress:Progress=None)->bool:
+    """只按长度前缀、记录中止标记 \\x00\\x00 和表结束标记 \\xff\\xff 校验一张表的全部记录，不解码字段值
+
+    结束后文件位置停在表结束标记之后，出错时把损坏的位置记入 report。
+
+    :param f: dump 文件，位置在第一条记录处
+    :param table: 表的校验结果，schema 已设置
+    :param report: 整个文件的校验结果
+    :param progress: 进度输出
+    :return: 是否完整
+    """
+    verifyRow=compileRowVerifier([c.length for c in table.schema.columns])
+    rowBytes=maxRowSize(len(table.schema.columns))
+    limit=f.fill(rowBytes)
+    buf=f.buf
+    pos=f.pos
+    base=f.base
+    end=len(buf)
+    rowCount=0
+    readAhead=f.readAhead
+    checkRows=progress.checkRows if progress is not None else VERIFY_CHECK_ROWS
+    nextCheck=checkRows
+    rowStart=pos
+    try:
+        if buf[pos:pos+2]==b'\xff\xff':
+            #finally 中按 pos 设置文件位置
+            pos+=2
+            return True
+
+        while True:
+            if pos>limit:
+                f.pos=pos
+                limit=f.fill(rowBytes)
+                buf=f.buf
+                pos=f.pos
+                base=f.base
+                end=len(buf)
+            rowStart=pos
+            pos=verifyRow(buf,pos)
+            if pos<0:
+                row_ret=inspectRow(buf,rowStart,base,table)
+                if row_ret.isError():
+                    report.fail(table,base+row_ret.data,row_ret.msg,base+rowStart)
+                    return False
+                pos=row_ret.data
+            if pos+2>end:
+                report.fail(table,base+min(pos,end),"记录长度超出文件范围，file offset="+hex(base+pos),base+rowStart)
+                return False
+            if buf[pos:pos+2]!=b'\x00\x00':
+                report.fail(table,base+pos,"没有记录中止标记，file offset="+hex(base+pos),base+rowStart)
+                return False
+            pos+=2
+            rowCount+=1
+            if buf[pos:pos+2]==b'\xff\xff':
+                pos+=2
+                return True
+            if rowCount==nextCheck:
+                if progress is not None:
+                    progress.update(rowCount,base+pos)
+                if readAhead is not None:
+                    readAhead.advance(pos)
+                nextCheck+=checkRows
+    except struct.error:
+        report.fail(table,base+end,"记录长度超出文件范围，file offset="+hex(base+end),base+rowStart)
+        return False
+    finally:
+        table.rowCount=rowCount
+        f.pos=min(pos,end)
+
+
+def verifyDump(f:DumpReader,fileName:str,charsetName:str,progress:Progress=None)->VerifyReport:
+    """从当前位置开始校验所有表的结构，遇到第一个损坏的位置就停止
+
+    只读字段定义和每个字段的长度前缀，检查记录中止标记、表结束标记以及字段长度是否超出定义长度，
+    不做任何字段值解码和字符串拼接。最后一张表之后必须有文件末尾的 EXIT，否则文件在表之间被截断了。
+
+    :param f: dump 文件，位置在 readDumpHeader 之后或 insert-sql-index 处
+    :param fileName: dump 文件名
+    :param charsetName: dump 文件字符集
+    :param progress: 进度输出
+    :return: 校验结果
+    """
+    report=VerifyReport(fileName,charsetName)
+    startPos=f.tell()
+    ret=getInsertSql(f,charsetName,printError=False)
+    while ret.isSuccess():
+        sdata=ret.data
+        table=TableVerifyResult(len(report.tables)+1,sdata.sql,sdata.startidx)
+        report.tables.append(table)
+        try:
+            ft_ret=readFieldTypes(f)
+        except struct.error:
+            report.fail(table,f.tell(),"字段定义超出文件范围，file offset="+hex(f.tell()))
+            break
+        if ft_ret.isError():
+            report.fail(table,f.tell(),ft_ret.msg)
+            break
+        table.schema=TableSchema.fromFields(sdata.sql,ft_ret.data,table.tableName)
+        table.dataOffset=f.tell()
+        if progress is not None:
+            progress.beginTable(table.tableName,table.dataOffset)
+        if not verifyTableRows(f,table,report,progress):
+            break
+        table.endOffset=f.tell()
+        if progress is not None:
+            progress.endTable(table.rowCount,table.endOffset)
+        ret=getInsertSql(f,charsetName,printError=False)
+
+    if report.isOk() and ret.msg!=DUMP_END_MSG:
+        #没有读到文件末尾的 EXIT，文件在两张表之间被截断
+        lastEnd=report.tables[-1].endOffset if len(report.tables)>0 else startPos
+        report.fail(None,lastEnd,"最后一张表之后没有 EXIT 结束标记，文件可能在表之后被截断，file offset="+hex(lastEnd),lastEnd)
+
+    report.bytesVerified=f.tell()-startPos
+    report.seconds=time.monotonic()-report.startTime
+    return report